@@ -0,0 +1,433 @@
+"""
+Offline हैंडलर बेंचमार्क
+
+नेटवर्क के बिना main.py के हैंडलर्स को synthetic updates और एक fake Bot के साथ चलाता है,
+जो API कॉल्स को सिर्फ गिनता है। हर स्टेट साइज़ (डिफ़ॉल्ट 10k, 100k, 1M यूजर्स) के लिए
+throughput, latency percentiles और प्रति ऑपरेशन डिस्क पर लिखे गए बाइट्स रिपोर्ट करता है।
+
+Usage:
+    python benchmark.py
+    python benchmark.py --sizes 10000,100000 --iterations 100 --json bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.25   # धीमा होने पर exit code 1
+    python benchmark.py --recovery --sizes 100000,1000000        # snapshot लिखने / recovery का समय
+"""
+import argparse
+import asyncio
+import atexit
+import collections
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# main को import करने से पहले लॉग और डेटा फाइलें अस्थायी फोल्डर में भेजें
+WORK_DIR = tempfile.mkdtemp(prefix="numinfo-bench-")
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ.setdefault("LOG_FILE", os.path.join(WORK_DIR, "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# हर ऑपरेशन के save की पूरी कीमत नापें, debounce से टली हुई नहीं
+os.environ.setdefault("SAVE_DEBOUNCE", "0")
+
+import main  # noqa: E402
+
+BASE_USER_ID = 1_000_000_000
+ADMIN_ID = main.ADMIN_ID or 1
+
+
+# --- Fake Telegram objects ---
+
+class FakeBot:
+    """API कॉल्स को नेटवर्क पर भेजने के बजाय गिनता है"""
+
+    username = "bench_bot"
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        self._message_id = 0
+
+    def _message(self, chat_id: int, text: str) -> "FakeMessage":
+        self._message_id += 1
+        return FakeMessage(self, chat_id, text, self._message_id)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls["sendMessage"] += 1
+        return self._message(chat_id, text)
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls["getChatMember"] += 1
+        return SimpleNamespace(status="member")
+
+    async def set_my_commands(self, commands, **kwargs):
+        self.calls["setMyCommands"] += 1
+        return True
+
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot, chat_id: int, text: str = "", message_id: int = 0):
+        self._bot = bot
+        self.chat_id = chat_id
+        self.text = text
+        self.message_id = message_id
+
+    async def reply_text(self, text, **kwargs):
+        return await self._bot.send_message(self.chat_id, text, **kwargs)
+
+    async def edit_text(self, text, **kwargs):
+        self._bot.calls["editMessageText"] += 1
+        self.text = text
+        return self
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot: FakeBot, user, data: str):
+        self._bot = bot
+        self.from_user = user
+        self.data = data
+        self.message = FakeMessage(bot, user.id)
+
+    async def answer(self, *args, **kwargs):
+        self._bot.calls["answerCallbackQuery"] += 1
+        return True
+
+    async def edit_message_text(self, text, **kwargs):
+        return await self.message.edit_text(text, **kwargs)
+
+
+class UpdateFactory:
+    """Synthetic Update / Context ऑब्जेक्ट्स बनाएं"""
+
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+        self._update_id = 0
+
+    def _user(self, user_id: int):
+        return SimpleNamespace(id=user_id, first_name=f"user{user_id}", is_bot=False)
+
+    def command(self, user_id: int, *args: str):
+        self._update_id += 1
+        user = self._user(user_id)
+        update = SimpleNamespace(
+            update_id=self._update_id,
+            effective_user=user,
+            message=FakeMessage(self.bot, user_id),
+            callback_query=None,
+        )
+        return update, SimpleNamespace(bot=self.bot, args=list(args))
+
+    def callback(self, user_id: int, data: str):
+        self._update_id += 1
+        user = self._user(user_id)
+        update = SimpleNamespace(
+            update_id=self._update_id,
+            effective_user=user,
+            message=None,
+            callback_query=FakeCallbackQuery(self.bot, user, data),
+        )
+        return update, SimpleNamespace(bot=self.bot, args=[])
+
+
+# --- State setup and persistence accounting ---
+
+class PersistMeter:
+    """save_data / save_banned_users को लपेटकर लिखे गए बाइट्स गिनें"""
+
+    def __init__(self):
+        self.bytes_written = 0
+        self.saves = 0
+        self._originals = {}
+
+    def install(self) -> None:
+        for name, path_attr in (("save_data", "DATA_FILE"), ("save_banned_users", "BANNED_USERS_FILE")):
+            original = getattr(main, name)
+            self._originals[name] = original
+
+            def wrapper(_original=original, _path_attr=path_attr):
+                _original()
+                self.saves += 1
+                path = getattr(main, _path_attr)
+                if os.path.exists(path):
+                    self.bytes_written += os.path.getsize(path)
+
+            setattr(main, name, wrapper)
+
+    def reset(self) -> None:
+        self.bytes_written = 0
+        self.saves = 0
+
+
+def populate_state(size: int) -> None:
+    """दिए गए साइज़ का realistic स्टेट main के ग्लोबल्स में भरें"""
+    user_ids = range(BASE_USER_ID, BASE_USER_ID + size)
+    main.USERS = set(user_ids)
+    main.USER_CREDITS = {uid: (uid % 7) for uid in user_ids}
+    # लगभग 10% यूजर्स किसी के रेफरल से आए, रेफरर्स पहले 1% यूजर्स में से
+    referrers = max(size // 100, 1)
+    main.REFERRED_TRACKER = {
+        (BASE_USER_ID + (uid % referrers), uid) for uid in range(BASE_USER_ID, BASE_USER_ID + size, 10)
+    }
+    now = time.time()
+    main.UNLIMITED_USERS = {
+        uid: ("forever" if uid % 2 else now + 86400 * (uid % 30 + 1))
+        for uid in range(BASE_USER_ID, BASE_USER_ID + size, 100)
+    }
+    main.BANNED_USERS = set(range(BASE_USER_ID + 3, BASE_USER_ID + size, 1000))
+    main.USER_SEARCH_HISTORY = {
+        uid: [{"number": "9876543210", "timestamp": "2024-01-01T00:00:00"}] * 5
+        for uid in range(BASE_USER_ID, BASE_USER_ID + size, 20)
+    }
+    main.DAILY_STATS = {"searches": 0, "new_users": 0, "referrals": 0}
+    main.BANNED_AT = {uid: int(now) - (uid % 10_000) for uid in main.BANNED_USERS}
+    main._LAZY_SECTIONS.clear()  # पिछली recovery के pending raw हिस्से इस स्टेट को न ढकें
+    main.USER_PROFILES = {}
+    main._backfill_profiles()
+    main.rebuild_indexes()
+
+
+# --- Scenarios ---
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(name: str, make_call, iterations: int, time_budget: float, meter: PersistMeter, bot: FakeBot) -> dict:
+    """एक ही ऑपरेशन को बार-बार चलाकर latency और persistence नापें"""
+    meter.reset()
+    calls_before = sum(bot.calls.values())
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        handler, update, context = make_call(i)
+        t0 = time.perf_counter()
+        await handler(update, context)
+        latencies.append(time.perf_counter() - t0)
+        # बहुत धीमे ऑपरेशन (जैसे 1M पर full save) के लिए कम से कम 3 सैंपल के बाद रुकें
+        if i >= 2 and time.perf_counter() - started > time_budget:
+            break
+    elapsed = time.perf_counter() - started
+    ops = len(latencies)
+    return {
+        "scenario": name,
+        "ops": ops,
+        "throughput_ops_s": ops / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "bytes_persisted_per_op": meter.bytes_written / ops,
+        "saves_per_op": meter.saves / ops,
+        "api_calls_per_op": (sum(bot.calls.values()) - calls_before) / ops,
+    }
+
+
+def build_scenarios(size: int, factory: UpdateFactory) -> list:
+    """(नाम, (handler, update, context) बनाने वाला फंक्शन, iterations override) की लिस्ट"""
+    def existing_user(i: int) -> int:
+        # बैन यूजर्स (BASE + 3 + 1000k) से बचें
+        return BASE_USER_ID + (i * 7919) % size // 10 * 10
+
+    new_user_counter = iter(range(BASE_USER_ID + size, BASE_USER_ID + 2 * size + 10_000_000))
+
+    def start_existing(i):
+        update, context = factory.command(existing_user(i))
+        return main.start_command, update, context
+
+    def start_new(i):
+        update, context = factory.command(next(new_user_counter))
+        return main.start_command, update, context
+
+    def button(data: str, admin: bool = False):
+        def make(i):
+            update, context = factory.callback(ADMIN_ID if admin else existing_user(i), data)
+            return main.button_handler, update, context
+        return make
+
+    def stats(i):
+        update, context = factory.command(ADMIN_ID)
+        return main.stats_command, update, context
+
+    def broadcast(i):
+        update, context = factory.command(ADMIN_ID, "benchmark", "message")
+        return main.broadcast_command, update, context
+
+    return [
+        ("start_command (existing user)", start_existing, None),
+        ("start_command (new user)", start_new, None),
+        ("button: main_menu", button("main_menu"), None),
+        ("button: show_credits", button("show_credits"), None),
+        ("button: my_referrals", button("my_referrals"), None),
+        ("button: admin_top_users", button("admin_top_users", admin=True), None),
+        ("button: admin_credits_list", button("admin_credits_list", admin=True), None),
+        ("button: credits page (cursor)", button(f"pg|c|n|-3|{BASE_USER_ID + size // 2}", admin=True), None),
+        ("stats_command", stats, None),
+        ("broadcast_command", broadcast, 1),
+    ]
+
+
+async def run_size(size: int, iterations: int, time_budget: float) -> list:
+    main.DATA_FILE = os.path.join(WORK_DIR, f"bot_data_{size}.json")
+    main.BANNED_USERS_FILE = os.path.join(WORK_DIR, f"banned_users_{size}.json")
+    main.BROADCAST_BATCH_DELAY = 0
+
+    populate_state(size)
+    main.save_data()
+    main.save_banned_users()
+
+    bot = FakeBot()
+    factory = UpdateFactory(bot)
+    meter = PersistMeter()
+    meter.install()
+
+    results = []
+    for name, make_call, override in build_scenarios(size, factory):
+        result = await run_scenario(name, make_call, override or iterations, time_budget, meter, bot)
+        result["users"] = size
+        results.append(result)
+        print_row(result)
+
+    for name, original in meter._originals.items():
+        setattr(main, name, original)
+    return results
+
+
+def measure(name: str, fn, iterations: int, time_budget: float, bytes_per_call: int = 0) -> dict:
+    """sync ऑपरेशन (snapshot write / load) का समय run_scenario जैसे फॉर्मेट में नापें"""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+        if i >= 2 and time.perf_counter() - started > time_budget:
+            break
+    elapsed = time.perf_counter() - started
+    ops = len(latencies)
+    return {
+        "scenario": name,
+        "ops": ops,
+        "throughput_ops_s": ops / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "bytes_persisted_per_op": bytes_per_call,
+        "saves_per_op": 1.0 if bytes_per_call else 0.0,
+        "api_calls_per_op": 0.0,
+    }
+
+
+def run_recovery(size: int, iterations: int, time_budget: float) -> list:
+    """snapshot write और startup recovery (newest valid lazy/eager, torn newest -> पिछली generation, legacy JSON) नापें"""
+    main.DATA_FILE = os.path.join(WORK_DIR, f"recovery_{size}.json")
+    main.BANNED_USERS_FILE = os.path.join(WORK_DIR, f"recovery_banned_{size}.json")
+    populate_state(size)
+    main.save_banned_users()
+    main.save_data()
+
+    results = [measure("snapshot write (fsync)", main.save_data, iterations, time_budget,
+                       os.path.getsize(main.DATA_FILE))]
+    results.append(measure("recovery: newest valid", main.load_data, iterations, time_budget))
+    # LAZY_LOAD बंद: हिस्ट्री/रेफरल्स भी startup पर ही parse हों
+    lazy_load, main.LAZY_LOAD = main.LAZY_LOAD, False
+    results.append(measure("recovery: newest valid (eager)", main.load_data, iterations, time_budget))
+    main.LAZY_LOAD = lazy_load
+
+    # आखिरी write बीच में कटा हो: checksum फेल, पिछली generation से लोड
+    with open(main.DATA_FILE, "r+b") as f:
+        f.truncate(os.path.getsize(main.DATA_FILE) // 2)
+    main.logger.disabled = True  # हर iteration पर "invalid snapshot" लॉग न छपे
+    results.append(measure("recovery: torn newest -> .1", main.load_data, iterations, time_budget))
+    main.logger.disabled = False
+
+    legacy_path = os.path.join(WORK_DIR, f"recovery_legacy_{size}.json")
+    with open(legacy_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "credits": main.USER_CREDITS,
+            "users": list(main.USERS),
+            "referrals": [list(x) for x in main.REFERRED_TRACKER],
+            "unlimited": main.UNLIMITED_USERS,
+            "search_history": main.USER_SEARCH_HISTORY,
+            "daily_stats": main.DAILY_STATS,
+        }, f, indent=2, ensure_ascii=False)
+    main.DATA_FILE = legacy_path
+    results.append(measure("recovery: legacy JSON", main.load_data, iterations, time_budget))
+
+    for result in results:
+        result["users"] = size
+        print_row(result)
+    return results
+
+
+def print_header() -> None:
+    print(f"{'users':>9}  {'scenario':<32} {'ops':>6} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'bytes/op':>12} {'api/op':>8}")
+    print("-" * 116)
+
+
+def print_row(r: dict) -> None:
+    print(
+        f"{r['users']:>9}  {r['scenario']:<32} {r['ops']:>6} {r['throughput_ops_s']:>10.1f} "
+        f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+        f"{r['bytes_persisted_per_op']:>12.0f} {r['api_calls_per_op']:>8.1f}",
+        flush=True,
+    )
+
+
+def compare_with_baseline(results: list, baseline_path: str, tolerance: float) -> list:
+    """Baseline JSON से p50 latency और bytes/op की तुलना करें"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["users"], r["scenario"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for r in results:
+        old = baseline.get((r["users"], r["scenario"]))
+        if not old:
+            continue
+        for metric in ("p50_ms", "bytes_persisted_per_op"):
+            if old[metric] > 0 and r[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{r['users']} users / {r['scenario']}: {metric} {old[metric]:.2f} -> {r[metric]:.2f}")
+    return regressions
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description="Offline handler benchmarks for main.py")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated user counts")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per scenario")
+    parser.add_argument("--time-budget", type=float, default=15.0, help="max seconds per scenario (min 3 calls)")
+    parser.add_argument("--json", dest="json_out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="previous --json output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--recovery", action="store_true", help="benchmark snapshot writes and startup recovery instead of handlers")
+    args = parser.parse_args()
+    main.start_logging()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    print_header()
+    results = []
+    for size in sizes:
+        if args.recovery:
+            results.extend(run_recovery(size, args.iterations, args.time_budget))
+        else:
+            results.extend(asyncio.run(run_size(size, args.iterations, args.time_budget)))
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"  • {line}")
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
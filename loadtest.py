@@ -0,0 +1,748 @@
+"""
+End-to-end लोड टेस्ट (पूरी तरह offline)
+
+एक लोकल fake Telegram Bot API सर्वर चलाता है (getUpdates, sendMessage, editMessageText,
+answerCallbackQuery, getChatMember और स्टार्टअप वाले मेथड्स), असली main.py को
+BOT_API_BASE_URL के ज़रिए उस पर पॉइंट करता है और polling या webhook mode में
+updates/sec और broadcast पूरा होने का समय नापता है।
+
+Usage:
+    python loadtest.py updates --mode polling --updates 2000 --kind start
+    python loadtest.py updates --mode webhook --updates 2000 --kind menu --latency-ms 30
+    python loadtest.py broadcast --users 10000 --forbidden-rate 0.05 --retry-after-rate 0.01
+    python loadtest.py updates --mode webhook --updates 4000 --workers 4   # sharded multi-worker mode
+    python loadtest.py failover --users 10000 --updates 500   # primary बंद, standby takeover का समय
+    python loadtest.py boot --users 100000 --boots 5          # process start से पहले जवाब तक का समय
+    python loadtest.py serve --port 8081        # सिर्फ fake सर्वर, मैन्युअल टेस्टिंग के लिए
+"""
+import argparse
+import atexit
+import collections
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_TOKEN = "123456:LOADTEST"
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot",
+            "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+ADMIN_ID = 42
+BASE_USER_ID = 5_000_000_000
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# --- Fake Bot API ---
+
+class FakeBotAPI:
+    """Bot API का इन-मेमोरी स्टैंड-इन, latency / 429 / 403 injection के साथ"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 retry_after_rate: float = 0.0, retry_after: int = 1, forbidden_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.forbidden_rate = forbidden_rate
+
+        self.lock = threading.Condition()
+        self.pending = collections.deque()
+        self.next_update_id = 1
+        self.next_message_id = 1
+        self.calls = collections.Counter()
+        self.injected = collections.Counter()
+        self.webhook_url = None
+        self.webhook_secret = None
+        self.first_poll = threading.Event()
+        self.webhook_set = threading.Event()
+        # हर पेंडिंग update का "कब भेजा", chat_id के हिसाब से
+        self.waiting_chats = {}
+        self.latencies = []
+        self.completed = 0
+        self.done = threading.Event()
+        self.expected = 0
+        self.message_listeners = []
+
+    # -- update generation --
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+    def make_command(self, user_id: int, text: str) -> dict:
+        with self.lock:
+            update_id = self.next_update_id
+            self.next_update_id += 1
+        command = text.split()[0]
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+            },
+        }
+
+    def make_callback(self, user_id: int, data: str) -> dict:
+        with self.lock:
+            update_id = self.next_update_id
+            self.next_update_id += 1
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "chat_instance": "loadtest",
+                "data": data,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "text": "menu",
+                },
+            },
+        }
+
+    def track(self, update: dict) -> None:
+        """update के जवाब का इंतज़ार दर्ज करें ताकि latency नापी जा सके"""
+        message = update["callback_query"]["message"] if "callback_query" in update else update["message"]
+        with self.lock:
+            self.waiting_chats[message["chat"]["id"]] = time.perf_counter()
+
+    def enqueue(self, update: dict) -> None:
+        """Polling mode: update को getUpdates के लिए रखें"""
+        with self.lock:
+            self.pending.append(update)
+            self.lock.notify_all()
+
+    def _complete(self, started: float) -> None:
+        self.latencies.append(time.perf_counter() - started)
+        self.completed += 1
+        if self.expected and self.completed >= self.expected:
+            self.done.set()
+
+    # -- API methods --
+
+    def _message(self, chat_id, text: str) -> dict:
+        with self.lock:
+            message_id = self.next_message_id
+            self.next_message_id += 1
+        return {"message_id": message_id, "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"}, "from": BOT_USER, "text": text or ""}
+
+    def _maybe_fail(self, method: str):
+        if self.retry_after_rate and random.random() < self.retry_after_rate:
+            self.injected["429"] += 1
+            return 429, {"ok": False, "error_code": 429,
+                         "description": f"Too Many Requests: retry after {self.retry_after}",
+                         "parameters": {"retry_after": self.retry_after}}
+        if method == "sendMessage" and self.forbidden_rate and random.random() < self.forbidden_rate:
+            self.injected["403"] += 1
+            return 403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+        return None
+
+    def handle(self, method: str, params: dict):
+        with self.lock:
+            self.calls[method] += 1
+
+        if method == "getUpdates":
+            return 200, {"ok": True, "result": self.get_updates(params)}
+
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+        if method in ("sendMessage", "editMessageText", "answerCallbackQuery"):
+            failure = self._maybe_fail(method)
+            if failure:
+                return failure
+
+        if method == "getMe":
+            return 200, {"ok": True, "result": BOT_USER}
+        if method == "setWebhook":
+            self.webhook_url = params.get("url")
+            self.webhook_secret = params.get("secret_token")
+            self.webhook_set.set()
+            return 200, {"ok": True, "result": True}
+        if method == "getChatMember":
+            return 200, {"ok": True, "result": {"status": "member", "user": self._user(int(params.get("user_id", 0)))}}
+        if method in ("sendMessage", "editMessageText"):
+            chat_id = params.get("chat_id")
+            text = params.get("text", "")
+            with self.lock:
+                started = self.waiting_chats.pop(int(chat_id), None) if chat_id is not None else None
+                if started is not None:
+                    self._complete(started)
+            for listener in self.message_listeners:
+                listener(method, chat_id, text)
+            return 200, {"ok": True, "result": self._message(chat_id or 0, text)}
+        # deleteWebhook, setMyCommands, close वगैरह
+        return 200, {"ok": True, "result": True}
+
+    def get_updates(self, params: dict) -> list:
+        self.first_poll.set()
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while self.pending and self.pending[0]["update_id"] < offset:
+                self.pending.popleft()
+            while not self.pending and time.monotonic() < deadline:
+                self.lock.wait(deadline - time.monotonic())
+            while self.pending and self.pending[0]["update_id"] < offset:
+                self.pending.popleft()
+            return list(self.pending)[:limit]
+
+
+class _APIRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # keep-alive पर headers और body अलग लिखे जाते हैं, Nagle से हर कॉल पर ~40ms जुड़ जाते
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self._dispatch()
+
+    def do_GET(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        api: FakeBotAPI = self.server.api
+        method = self.path.rstrip("/").rsplit("/", 1)[-1].split("?")[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, payload = api.handle(method, self._parse(body))
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _parse(self, body: bytes) -> dict:
+        if not body:
+            return {}
+        content_type = self.headers.get("Content-Type", "")
+        if "application/json" in content_type:
+            return json.loads(body)
+        params = {}
+        for key, values in parse_qs(body.decode(), keep_blank_values=True).items():
+            value = values[0]
+            try:
+                params[key] = json.loads(value) if key != "text" else value
+            except ValueError:
+                params[key] = value
+        return params
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_server(api: FakeBotAPI, port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _APIRequestHandler)
+    server.daemon_threads = True
+    server.api = api
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- Bot process ---
+
+def write_state(path: str, users: int, history_every: int = 0) -> None:
+    """broadcast टेस्ट के लिए पहले से भरा हुआ डेटा फाइल लिखें (history_every>0: हर N-वें यूजर की सर्च हिस्ट्री भी)"""
+    user_ids = list(range(BASE_USER_ID, BASE_USER_ID + users))
+    history = [{"number": "9876543210", "timestamp": "2024-01-01T00:00:00"}] * 5
+    data = {
+        "credits": {str(uid): 3 for uid in user_ids},
+        "users": user_ids,
+        "referrals": [[uid - 1, uid] for uid in user_ids[1::10]],
+        "unlimited": {},
+        "search_history": {str(uid): history for uid in user_ids[::history_every]} if history_every else {},
+        "daily_stats": {"searches": 0, "new_users": 0, "referrals": 0},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def start_bot(server: ThreadingHTTPServer, work_dir: str, mode: str, extra_env: dict = None,
+              log_name: str = "bot.stdout") -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "ADMIN_ID": str(ADMIN_ID),
+        "BOT_API_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/bot",
+        "BOT_API_FILE_URL": f"http://127.0.0.1:{server.server_address[1]}/file/bot",
+        "DATA_FILE": os.path.join(work_dir, "bot_data.json"),
+        "BANNED_USERS_FILE": os.path.join(work_dir, "banned_users.json"),
+        "LOG_FILE": os.path.join(work_dir, "bot.log"),
+        "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+    })
+    env.pop("WEBHOOK_URL", None)
+    if mode == "webhook":
+        port = free_port()
+        env.update({
+            "WEBHOOK_URL": f"http://127.0.0.1:{port}/webhook",
+            "WEBHOOK_LISTEN": "127.0.0.1",
+            "PORT": str(port),
+            "WEBHOOK_SECRET": "loadtest-secret",
+        })
+    env.update(extra_env or {})
+    log = open(os.path.join(work_dir, log_name), "w")
+    return subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "main.py")], env=env,
+                            stdout=log, stderr=subprocess.STDOUT, cwd=work_dir)
+
+
+def stop_bot(proc: subprocess.Popen, sig: int = signal.SIGINT) -> None:
+    if proc.poll() is None:
+        proc.send_signal(sig)
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def wait_ready(api: FakeBotAPI, proc: subprocess.Popen, mode: str, timeout: float = 30.0, workers: int = 1) -> None:
+    event = api.webhook_set if mode == "webhook" else api.first_poll
+    deadline = time.monotonic() + timeout
+    # हर worker initialize में getMe कॉल करता है; सब तैयार होने पर ही नापना शुरू करें
+    while not event.wait(0.1) or api.calls["getMe"] < workers:
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("Bot did not become ready, see bot.stdout in the work dir")
+    if mode == "webhook":
+        # setWebhook सर्वर शुरू होने से पहले भी आ सकता है, पोर्ट खुलने तक रुकें
+        address = urlparse(api.webhook_url)
+        while True:
+            try:
+                socket.create_connection((address.hostname, address.port), timeout=1).close()
+                break
+            except OSError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("Webhook server did not start, see bot.stdout in the work dir")
+                time.sleep(0.05)
+
+
+class WebhookPusher:
+    """Webhook mode: updates को बॉट के webhook पर कई threads से POST करें"""
+
+    def __init__(self, api: FakeBotAPI, concurrency: int):
+        self.api = api
+        self.queue = collections.deque()
+        self.cond = threading.Condition()
+        self.errors = 0
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(concurrency)]
+        for t in self.threads:
+            t.start()
+
+    def push(self, update: dict) -> None:
+        with self.cond:
+            self.queue.append(update)
+            self.cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                update = self.queue.popleft()
+            request = urllib.request.Request(
+                self.api.webhook_url, data=json.dumps(update).encode(), method="POST",
+                headers={"Content-Type": "application/json",
+                         "X-Telegram-Bot-Api-Secret-Token": self.api.webhook_secret or ""})
+            try:
+                urllib.request.urlopen(request, timeout=30).read()
+            except Exception:
+                self.errors += 1
+
+
+def inject(api: FakeBotAPI, pusher, updates: list, rate: float) -> None:
+    """updates को तय rate (0 = जितना तेज़ हो सके) से भेजें"""
+    interval = 1.0 / rate if rate > 0 else 0.0
+    started = time.perf_counter()
+    for i, update in enumerate(updates):
+        if interval:
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        api.track(update)
+        if pusher:
+            pusher.push(update)
+        else:
+            api.enqueue(update)
+
+
+# --- Scenarios ---
+
+def make_work_dir(args) -> str:
+    """हर scenario की अस्थायी डायरेक्टरी; --keep-work-dir न हो तो exit पर हटा दी जाती है"""
+    work_dir = tempfile.mkdtemp(prefix="numinfo-load-")
+    if not args.keep_work_dir:
+        atexit.register(shutil.rmtree, work_dir, ignore_errors=True)
+    return work_dir
+
+
+def run_updates(args) -> dict:
+    api = FakeBotAPI(args.latency_ms, args.jitter_ms, args.retry_after_rate, args.retry_after, args.forbidden_rate)
+    server = start_fake_server(api)
+    work_dir = make_work_dir(args)
+    if args.kind == "menu":
+        write_state(os.path.join(work_dir, "bot_data.json"), args.updates)
+    proc = start_bot(server, work_dir, args.mode, _bot_env(args))
+    try:
+        wait_ready(api, proc, args.mode, workers=args.workers)
+        pusher = WebhookPusher(api, args.concurrency) if args.mode == "webhook" else None
+
+        if args.kind == "start":
+            updates = [api.make_command(BASE_USER_ID + i, "/start") for i in range(args.updates)]
+        else:
+            updates = [api.make_callback(BASE_USER_ID + i, "main_menu") for i in range(args.updates)]
+
+        api.expected = len(updates)
+        started = time.perf_counter()
+        threading.Thread(target=inject, args=(api, pusher, updates, args.rate), daemon=True).start()
+        api.done.wait(args.timeout)
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_bot(proc)
+        server.shutdown()
+
+    return {
+        "scenario": f"updates/{args.kind}",
+        "mode": args.mode,
+        "workers": args.workers,
+        "sent": len(updates),
+        "completed": api.completed,
+        "elapsed_s": round(elapsed, 3),
+        "updates_per_s": round(api.completed / elapsed, 1) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(api.latencies, 50) * 1000, 2),
+        "latency_p95_ms": round(percentile(api.latencies, 95) * 1000, 2),
+        "latency_p99_ms": round(percentile(api.latencies, 99) * 1000, 2),
+        "latency_mean_ms": round(statistics.fmean(api.latencies) * 1000, 2) if api.latencies else 0.0,
+        "api_calls": dict(api.calls),
+        "injected_errors": dict(api.injected),
+        "webhook_errors": pusher.errors if pusher else 0,
+        "work_dir": work_dir,
+    }
+
+
+def run_broadcast(args) -> dict:
+    api = FakeBotAPI(args.latency_ms, args.jitter_ms, args.retry_after_rate, args.retry_after, args.forbidden_rate)
+    server = start_fake_server(api)
+    work_dir = make_work_dir(args)
+    write_state(os.path.join(work_dir, "bot_data.json"), args.users)
+    proc = start_bot(server, work_dir, args.mode, _bot_env(args))
+
+    finished = threading.Event()
+    sends_before = collections.Counter()
+
+    def on_message(method, chat_id, text):
+        if method == "editMessageText" and chat_id is not None and int(chat_id) == ADMIN_ID and "Broadcast Complete" in text:
+            finished.set()
+
+    api.message_listeners.append(on_message)
+    try:
+        wait_ready(api, proc, args.mode, workers=args.workers)
+        pusher = WebhookPusher(api, 1) if args.mode == "webhook" else None
+        sends_before.update(api.calls)
+        started = time.perf_counter()
+        inject(api, pusher, [api.make_command(ADMIN_ID, "/broadcast load test message")], 0)
+        completed = finished.wait(args.timeout)
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_bot(proc)
+        server.shutdown()
+
+    sends = api.calls["sendMessage"] - sends_before["sendMessage"]
+    return {
+        "scenario": "broadcast",
+        "mode": args.mode,
+        "workers": args.workers,
+        "users": args.users,
+        "completed": completed,
+        "elapsed_s": round(elapsed, 3),
+        "sends": sends,
+        "sends_per_s": round(sends / elapsed, 1) if elapsed else 0.0,
+        # status मैसेज के edits (आखिरी summary समेत); PROGRESS_EDIT_INTERVAL से सीमित
+        "progress_edits": api.calls["editMessageText"] - sends_before["editMessageText"],
+        "api_calls": dict(api.calls),
+        "injected_errors": dict(api.injected),
+        "work_dir": work_dir,
+    }
+
+
+def wait_for_log(path: str, marker: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                if marker in f.read():
+                    return
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError(f"{marker!r} never appeared in {path}")
+        time.sleep(0.1)
+
+
+def run_failover(args) -> dict:
+    """primary पर लोड, फिर उसे बंद करके standby के takeover का समय और state की पूर्णता नापें"""
+    api = FakeBotAPI(args.latency_ms, args.jitter_ms, args.retry_after_rate, args.retry_after, args.forbidden_rate)
+    server = start_fake_server(api)
+    work_dir = make_work_dir(args)
+    write_state(os.path.join(work_dir, "bot_data.json"), args.users)
+    ha_env = _bot_env(args)
+    ha_env.update({
+        "STATE_JOURNAL_FILE": os.path.join(work_dir, "state.journal"),
+        "LEASE_FILE": os.path.join(work_dir, "bot.lease"),
+        "LEASE_TTL": str(args.lease_ttl),
+        "LOG_LEVEL": "INFO",
+    })
+    primary = start_bot(server, work_dir, "polling", dict(ha_env, ROLE="primary",
+                        LOG_FILE=os.path.join(work_dir, "primary.log")), "primary.stdout")
+    standby = None
+    stats_replies = []
+
+    def on_message(method, chat_id, text):
+        if chat_id is not None and int(chat_id) == ADMIN_ID and "Bot Statistics" in text:
+            stats_replies.append((time.perf_counter(), text))
+
+    api.message_listeners.append(on_message)
+    try:
+        wait_ready(api, primary, "polling")
+        standby_log = os.path.join(work_dir, "standby.log")
+        standby = start_bot(server, work_dir, "polling", dict(ha_env, ROLE="standby", LOG_FILE=standby_log),
+                            "standby.stdout")
+        wait_for_log(standby_log, "Standby: following", standby)
+
+        # standby चलते समय primary पर नए यूजर्स, ताकि उसे journal से ही पकड़ना पड़े
+        updates = [api.make_command(BASE_USER_ID + args.users + i, "/start") for i in range(args.updates)]
+        api.expected = len(updates)
+        inject(api, None, updates, args.rate)
+        api.done.wait(args.timeout)
+        handled_by_primary = api.completed
+
+        stopped = time.perf_counter()
+        stop_bot(primary, signal.SIGKILL if args.kill else signal.SIGINT)
+        exited = time.perf_counter()
+        inject(api, None, [api.make_command(ADMIN_ID, "/stats")], 0)
+        deadline = time.monotonic() + args.timeout
+        while not stats_replies and time.monotonic() < deadline and standby.poll() is None:
+            time.sleep(0.01)
+    finally:
+        stop_bot(primary)
+        if standby:
+            stop_bot(standby)
+        server.shutdown()
+
+    answered_at, stats_text = stats_replies[0] if stats_replies else (None, "")
+    users_line = next((line for line in stats_text.splitlines() if "Total Users" in line), "")
+    standby_users = int(users_line.rsplit(" ", 1)[-1]) if users_line else None
+    return {
+        "scenario": "failover",
+        "completed": standby_users == args.users + args.updates,
+        "stop": "SIGKILL" if args.kill else "SIGINT",
+        "lease_ttl_s": args.lease_ttl,
+        "updates_on_primary": handled_by_primary,
+        "primary_exit_s": round(exited - stopped, 3),
+        "failover_s": round(answered_at - exited, 3) if answered_at else None,
+        "expected_users": args.users + args.updates,
+        "standby_users": standby_users,
+        "work_dir": work_dir,
+    }
+
+
+def import_profile(env: dict, work_dir: str, top: int = 8) -> dict:
+    """`python -X importtime` से main का कुल import समय और उसके सबसे महंगे सीधे imports"""
+    code = f"import sys; sys.path.insert(0, {ROOT_DIR!r}); import main"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, cwd=work_dir,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=120)
+    # importtime पहले बच्चे छापता है फिर parent; इंडेंट 2 स्पेस प्रति लेवल
+    children, total_us = [], 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == "main":
+                total_us = int(cumulative)
+                break
+            children = []
+    children.sort(reverse=True)
+    return {
+        "main_ms": round(total_us / 1000, 1),
+        "top": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in children[:top]],
+    }
+
+
+def run_boot(args) -> dict:
+    """बार-बार cold start: spawn से पहले से कतार में रखे /start के जवाब तक का समय और बॉट के अपने phase timings"""
+    work_dir = make_work_dir(args)
+    write_state(os.path.join(work_dir, "bot_data.json"), args.users, args.history_every)
+    boot_env = dict(_bot_env(args), LOG_LEVEL="INFO")
+    samples, phases = [], []
+    # पहला boot सिर्फ warmup: नए यूजर के /start से पुरानी JSON फाइल snapshot फॉर्मेट में लिखी जाती है
+    for run in range(args.boots + 1):
+        api = FakeBotAPI(args.latency_ms, args.jitter_ms, args.retry_after_rate, args.retry_after, args.forbidden_rate)
+        server = start_fake_server(api)
+        user_id = BASE_USER_ID + args.users + 1 if run == 0 else BASE_USER_ID + run
+        log_file = os.path.join(work_dir, f"boot{run}.log")
+        replied = threading.Event()
+        api.message_listeners.append(lambda method, chat_id, text, uid=user_id:
+                                     chat_id is not None and int(chat_id) == uid and replied.set())
+        api.enqueue(api.make_command(user_id, "/start"))
+        spawned = time.perf_counter()
+        proc = start_bot(server, work_dir, "polling", dict(boot_env, LOG_FILE=log_file), f"boot{run}.stdout")
+        try:
+            if not replied.wait(args.timeout):
+                raise RuntimeError(f"boot {run}: no reply, rerun with --keep-work-dir and see boot{run}.stdout in {work_dir}")
+            elapsed = time.perf_counter() - spawned
+            wait_for_log(log_file, "Startup timings", proc, args.timeout)
+        finally:
+            stop_bot(proc)
+            server.shutdown()
+        if run == 0:
+            continue
+        samples.append(elapsed)
+        with open(log_file, encoding="utf-8") as f:
+            line = next(line for line in f if "Startup timings" in line)
+        phases.append(json.loads(line.split("Startup timings: ", 1)[1]))
+
+    profile_env = dict(os.environ, **boot_env, BOT_TOKEN=BOT_TOKEN,
+                       DATA_FILE=os.path.join(work_dir, "bot_data.json"), LOG_FILE=os.path.join(work_dir, "import.log"))
+    return {
+        "scenario": "boot",
+        "completed": len(samples) == args.boots,
+        "users": args.users,
+        "boots": len(samples),
+        "first_reply_p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "first_reply_max_ms": round(max(samples) * 1000, 1) if samples else 0.0,
+        # बॉट के अंदर से, process boot के बाद सेकंड (हर phase का median)
+        "phases_s": {phase: round(statistics.median(p[phase] for p in phases if phase in p), 4)
+                     for phase in (phases[0] if phases else {})},
+        "imports": import_profile(profile_env, work_dir),
+        "work_dir": work_dir,
+    }
+
+
+def run_serve(args) -> None:
+    api = FakeBotAPI(args.latency_ms, args.jitter_ms, args.retry_after_rate, args.retry_after, args.forbidden_rate)
+    server = start_fake_server(api, args.port)
+    print(f"Fake Bot API on http://127.0.0.1:{server.server_address[1]}/bot  (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(dict(api.calls), flush=True)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def _bot_env(args) -> dict:
+    env = {"WORKERS": str(getattr(args, "workers", 1))}
+    if getattr(args, "broadcast_delay", None) is not None:
+        env["BROADCAST_BATCH_DELAY"] = str(args.broadcast_delay)
+    for item in args.env or []:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test for main.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(p, with_mode=True):
+        if with_mode:
+            p.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+            p.add_argument("--timeout", type=float, default=300.0, help="max seconds to wait for completion")
+            p.add_argument("--env", action="append", help="extra KEY=VALUE for the bot process")
+            p.add_argument("--workers", type=int, default=1, help="WORKERS for the bot (>1 = sharded mode)")
+        p.add_argument("--latency-ms", type=float, default=0.0, help="added latency per API call")
+        p.add_argument("--jitter-ms", type=float, default=0.0)
+        p.add_argument("--retry-after-rate", type=float, default=0.0, help="fraction of sends answered with 429")
+        p.add_argument("--retry-after", type=int, default=1, help="retry_after seconds in injected 429s")
+        p.add_argument("--forbidden-rate", type=float, default=0.0, help="fraction of sendMessage answered with 403")
+        p.add_argument("--json", dest="json_out", help="write the result to this JSON file")
+        p.add_argument("--keep-work-dir", action="store_true", help="keep the temporary work dir (logs, snapshots) on exit")
+
+    p_updates = sub.add_parser("updates", help="sustained updates/sec")
+    add_common(p_updates)
+    p_updates.add_argument("--updates", type=int, default=1000)
+    p_updates.add_argument("--kind", choices=("start", "menu"), default="start",
+                           help="start = /start from new users, menu = main_menu button from existing users")
+    p_updates.add_argument("--rate", type=float, default=0.0, help="target updates/sec (0 = as fast as possible)")
+    p_updates.add_argument("--concurrency", type=int, default=8, help="webhook POST threads")
+
+    p_broadcast = sub.add_parser("broadcast", help="broadcast completion time")
+    add_common(p_broadcast)
+    p_broadcast.add_argument("--users", type=int, default=1000)
+    p_broadcast.add_argument("--broadcast-delay", type=float, default=None,
+                             help="override BROADCAST_BATCH_DELAY for the bot")
+
+    p_failover = sub.add_parser("failover", help="hot-standby takeover time (polling mode)")
+    add_common(p_failover, with_mode=False)
+    p_failover.add_argument("--timeout", type=float, default=120.0, help="max seconds to wait for each phase")
+    p_failover.add_argument("--env", action="append", help="extra KEY=VALUE for both bot processes")
+    p_failover.add_argument("--users", type=int, default=1000, help="users in the snapshot before start")
+    p_failover.add_argument("--updates", type=int, default=200, help="/start from new users sent to the primary")
+    p_failover.add_argument("--rate", type=float, default=0.0, help="updates/sec to the primary (0 = as fast as possible)")
+    p_failover.add_argument("--lease-ttl", type=float, default=10.0)
+    p_failover.add_argument("--kill", action="store_true", help="SIGKILL the primary (lease must expire) instead of SIGINT")
+
+    p_boot = sub.add_parser("boot", help="cold start to first reply, with the bot's phase timings (polling mode)")
+    add_common(p_boot, with_mode=False)
+    p_boot.add_argument("--timeout", type=float, default=120.0, help="max seconds to wait for each boot")
+    p_boot.add_argument("--env", action="append", help="extra KEY=VALUE for the bot process")
+    p_boot.add_argument("--users", type=int, default=100000, help="users in the snapshot")
+    p_boot.add_argument("--history-every", type=int, default=10, help="every Nth user gets search history (0 = none)")
+    p_boot.add_argument("--boots", type=int, default=5, help="measured boots (plus one warmup)")
+
+    p_serve = sub.add_parser("serve", help="only run the fake Bot API server")
+    add_common(p_serve, with_mode=False)
+    p_serve.add_argument("--port", type=int, default=8081)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        run_serve(args)
+        return 0
+
+    runners = {"updates": run_updates, "broadcast": run_broadcast, "failover": run_failover, "boot": run_boot}
+    result = runners[args.command](args)
+    print(json.dumps(result, indent=2))
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    # updates में completed एक गिनती है: कुछ भी timeout हुआ तो run फेल
+    if args.command == "updates":
+        return 0 if result["completed"] >= result["sent"] else 1
+    return 0 if result["completed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
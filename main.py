@@ -1,31 +1,228 @@
+import time
+_BOOT_STARTED = time.perf_counter()  # स्टार्टअप टाइमिंग्स (imports समेत) यहीं से नापी जाती हैं
 import os
-import requests
 import logging
+import logging.handlers
 import json
 import asyncio
+import atexit
+import bisect
+import contextvars
+import argparse
+import csv
+import fcntl
+import functools
+import hashlib
+import heapq
+import io
+import itertools
+import multiprocessing
+import queue
+import random
+import re
+import resource
+import signal
+import socket
+import sys
+import threading
+import tracemalloc
+import gc
+from array import array
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlparse
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
-from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler, MessageHandler, filters
+from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler, MessageHandler, TypeHandler, filters
 from telegram.error import TelegramError, Forbidden, BadRequest
 from telegram.constants import ParseMode
+from telegram.helpers import escape_markdown
+from telegram.request import HTTPXRequest
+import httpx
+import requests
 from dotenv import load_dotenv
 
-# Logging सेटअप
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
-
 # .env फ़ाइल लोड करें
 load_dotenv()
 
+STARTUP_TIMINGS = {}  # {phase: process boot से सेकंड}
+
+def mark_startup(phase: str) -> None:
+    STARTUP_TIMINGS[phase] = round(time.perf_counter() - _BOOT_STARTED, 4)
+
+mark_startup("imports")
+
+# --- LOGGING ---
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # साइज़ पर रोटेशन (0 = बंद)
+LOG_ROTATE_SECONDS = int(os.getenv("LOG_ROTATE_SECONDS", str(24 * 3600)))  # समय पर रोटेशन (0 = बंद)
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() in ("1", "true", "yes")
+# Category sampling, जैसे: LOG_SAMPLE_RATES="broadcast_failure=0.01,membership_error=0.1" (setup_logging में पढ़ा जाता है)
+LOG_SAMPLE_RATES = {}
+
+# हर update के लिए update_id / user_id / handler, ताकि लॉग लाइन्स में जुड़ सकें
+LOG_CONTEXT = contextvars.ContextVar("log_context", default={})
+_LOG_QUEUE = queue.SimpleQueue()
+_LOG_SAMPLED_OUT = {}  # {category: कितने रिकॉर्ड छोड़े गए}
+
+
+class _LogContextFilter(logging.Filter):
+    """Event loop thread पर ही context जोड़ें और category sampling लागू करें"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        category = getattr(record, "category", None)
+        rate = LOG_SAMPLE_RATES.get(category) if category else None
+        if rate is not None and rate < 1.0:
+            if random.random() >= rate:
+                _LOG_SAMPLED_OUT[category] = _LOG_SAMPLED_OUT.get(category, 0) + 1
+                return False
+            # पिछली बार से कितने रिकॉर्ड छोड़े गए, ताकि वॉल्यूम का अंदाज़ा रहे
+            record.suppressed = _LOG_SAMPLED_OUT.pop(category, 0)
+        
+        ctx = LOG_CONTEXT.get()
+        record.update_id = ctx.get("update_id")
+        record.user_id = ctx.get("user_id")
+        record.handler = ctx.get("handler")
+        return True
+
+
+class _TextFormatter(logging.Formatter):
+    """सादा लाइन; sampling से छूटे रिकॉर्ड्स की गिनती आखिर में"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} suppressed)" if suppressed else text
+
+
+class _JsonLineFormatter(logging.Formatter):
+    """हर रिकॉर्ड को एक JSON लाइन में लिखें"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("update_id", "user_id", "handler", "category", "suppressed"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """साइज़ या समय, जो पहले पूरा हो, उस पर लॉग फाइल रोटेट करें"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, rotate_seconds: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.rotate_seconds = rotate_seconds
+        self.rollover_at = time.time() + rotate_seconds
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rotate_seconds > 0 and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_seconds
+
+
+def parse_sample_rates(value: str) -> dict:
+    """LOG_SAMPLE_RATES ("category=rate,...") पढ़ें; गलत एंट्री पर साफ़ ValueError"""
+    rates = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, sep, rate = item.partition("=")
+        try:
+            parsed = float(rate)
+        except ValueError:
+            parsed = None
+        if not sep or not name.strip() or parsed is None or not 0 <= parsed <= 1:
+            raise ValueError(f"LOG_SAMPLE_RATES: {item.strip()!r} is not category=rate with rate between 0 and 1")
+        rates[name.strip()] = parsed
+    return rates
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Queue-based logging: डिस्क I/O अलग listener thread पर होता है, event loop पर नहीं
+
+    import पर नहीं, main() / cli() / worker की शुरुआत में चलता है; गलत LOG_SAMPLE_RATES पर ValueError।
+    """
+    global LOG_SAMPLE_RATES
+    LOG_SAMPLE_RATES = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+    text_formatter = _TextFormatter(LOG_FORMAT)
+    
+    file_handler = _SizeAndTimeRotatingFileHandler(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_SECONDS)
+    file_handler.setFormatter(_JsonLineFormatter() if LOG_JSON else text_formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(text_formatter)
+    
+    queue_handler = logging.handlers.QueueHandler(_LOG_QUEUE)
+    queue_handler.addFilter(_LogContextFilter())
+    
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # httpx हर API कॉल पर INFO लाइन लिखता है, ब्रॉडकास्ट में यह लाखों लाइन्स बन जाती हैं
+    logging.getLogger("httpx").setLevel(os.getenv("HTTPX_LOG_LEVEL", "WARNING").upper())
+    
+    listener = logging.handlers.QueueListener(_LOG_QUEUE, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def with_log_context(callback):
+    """हैंडलर को update_id / user_id / handler नाम वाले लॉग context में चलाएं"""
+    @functools.wraps(callback)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = getattr(update, "effective_user", None)
+        token = LOG_CONTEXT.set({
+            "update_id": getattr(update, "update_id", None),
+            "user_id": user.id if user else None,
+            "handler": callback.__name__,
+        })
+        try:
+            return await callback(update, context)
+        finally:
+            LOG_CONTEXT.reset(token)
+            if "first_update" not in STARTUP_TIMINGS:
+                mark_startup("first_update")
+                logger.info(f"⏱ Startup timings: {json.dumps(STARTUP_TIMINGS)}")
+    return wrapper
+
+
+def start_logging() -> None:
+    """main() / cli() से: logging चालू करें, गलत सेटिंग पर traceback के बजाय साफ़ error के साथ बाहर"""
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        return
+    try:
+        _LOG_LISTENER = setup_logging()
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        sys.exit(1)
+
+
+_LOG_LISTENER = None  # start_logging() के बाद QueueListener
+logger = logging.getLogger(__name__)
+
 # --- CONFIGURATION ---
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Bot API सर्वर (लोकल Bot API सर्वर या loadtest.py के fake सर्वर के लिए बदलें)
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL", "https://api.telegram.org/bot")
+BOT_API_FILE_URL = os.getenv("BOT_API_FILE_URL", "https://api.telegram.org/file/bot")
+# WEBHOOK_URL सेट हो तो polling के बजाय webhook mode चलेगा
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+PORT = int(os.getenv("PORT", "8443"))
 # ⭐ नया और सही API यहाँ लगाया गया है ⭐
 API_BASE_URL = os.getenv("API_BASE_URL", "https://meowmeow.rf.gd/gand/mobile.php?num=")
 # ⭐ दूसरा API यहाँ जोड़ा गया है ⭐
@@ -45,8 +242,55 @@ SUPPORT_CHANNEL_USERNAME = "narzoxbot"
 SUPPORT_CHANNEL_LINK = "https://t.me/narzoxbot"
 # ⭐ यहां नया Owner Username जोड़ा गया है ⭐
 ADMIN_USERNAME_FOR_ACCESS = "Narzoceo" 
-DATA_FILE = "bot_data.json"
-BANNED_USERS_FILE = "banned_users.json"
+DATA_FILE = os.getenv("DATA_FILE", "bot_data.json")
+BANNED_USERS_FILE = os.getenv("BANNED_USERS_FILE", "banned_users.json")
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "30"))  # इतने मैसेज के बाद रुकें
+BROADCAST_BATCH_DELAY = float(os.getenv("BROADCAST_BATCH_DELAY", "1"))  # सेकंड
+
+# Memory settings
+MEMORY_SOFT_LIMIT_MB = int(os.getenv("MEMORY_SOFT_LIMIT_MB", "0"))  # 0 = बंद; Render free plan पर ~400 रखें
+MEMORY_CHECK_INTERVAL = int(os.getenv("MEMORY_CHECK_INTERVAL", "60"))  # सेकंड
+MEMORY_CHECK_MAX_INTERVAL = int(os.getenv("MEMORY_CHECK_MAX_INTERVAL", "3600"))  # compaction से कुछ न बचे तो यहाँ तक धीमा
+MEMORY_ALERT_COOLDOWN = int(os.getenv("MEMORY_ALERT_COOLDOWN", "1800"))  # सेकंड
+COMPACT_HISTORY_LIMIT = int(os.getenv("COMPACT_HISTORY_LIMIT", "0"))  # watchdog में प्रति यूजर सर्च; 0 = हिस्ट्री न काटें
+COMPACT_CHUNK_SIZE = int(os.getenv("COMPACT_CHUNK_SIZE", "5000"))  # इतने आइटम के बाद event loop को मौका दें
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "0"))  # >0 हो तो स्टार्ट से ही tracemalloc चालू
+
+# Bot API HTTP pools: API कॉल्स और getUpdates long-poll के लिए अलग-अलग
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "32"))
+API_POOL_TIMEOUT = float(os.getenv("API_POOL_TIMEOUT", "5"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "10"))
+API_WRITE_TIMEOUT = float(os.getenv("API_WRITE_TIMEOUT", "10"))
+API_KEEPALIVE_EXPIRY = float(os.getenv("API_KEEPALIVE_EXPIRY", "30"))
+UPDATES_POOL_SIZE = int(os.getenv("UPDATES_POOL_SIZE", "2"))
+UPDATES_POOL_TIMEOUT = float(os.getenv("UPDATES_POOL_TIMEOUT", "5"))
+UPDATES_READ_TIMEOUT = float(os.getenv("UPDATES_READ_TIMEOUT", "15"))  # long-poll timeout के ऊपर
+UPDATES_KEEPALIVE_EXPIRY = float(os.getenv("UPDATES_KEEPALIVE_EXPIRY", "60"))
+UPDATES_MAX_BACKOFF = float(os.getenv("UPDATES_MAX_BACKOFF", "30"))  # router getUpdates की लगातार विफलता पर अधिकतम इंतज़ार (सेकंड)
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(5 * 1024 * 1024)))  # /bulk फाइल की अधिकतम साइज़
+BULK_NOTIFY_RATE = float(os.getenv("BULK_NOTIFY_RATE", "20"))  # /bulk नोटिफिकेशन प्रति सेकंड
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "0"))  # 0 = एक-एक करके, >1 = इतने updates साथ में
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "20"))  # एडमिन लिस्ट्स में प्रति पेज एंट्रीज़
+WORKERS = int(os.getenv("WORKERS", "1"))  # >1 = इतने worker processes, यूजर id के हिसाब से sharded
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "64"))  # hash ring पर प्रति worker virtual nodes
+SHARD_CALL_TIMEOUT = float(os.getenv("SHARD_CALL_TIMEOUT", "30"))  # दूसरे shard से जवाब का इंतज़ार (सेकंड)
+SHARD_BROADCAST_TIMEOUT = float(os.getenv("SHARD_BROADCAST_TIMEOUT", "21600"))  # sharded broadcast की ऊपरी सीमा (सेकंड)
+# journal और standby सिर्फ़ WORKERS=1 में; WORKERS>1 के साथ सेट करने पर बॉट स्टार्ट नहीं होगा
+STATE_JOURNAL_FILE = os.getenv("STATE_JOURNAL_FILE", "")  # खाली = journal और standby बंद
+STATE_JOURNAL_MAX_BYTES = int(os.getenv("STATE_JOURNAL_MAX_BYTES", str(64 * 1024 * 1024)))  # इसके बाद snapshot पर नई journal
+ROLE = os.getenv("ROLE", "primary").lower()  # primary / standby
+LEASE_FILE = os.getenv("LEASE_FILE", "bot.lease")
+LEASE_TTL = float(os.getenv("LEASE_TTL", "10"))  # सेकंड; primary हर TTL/3 पर renew करता है
+STANDBY_POLL_INTERVAL = float(os.getenv("STANDBY_POLL_INTERVAL", "0.2"))  # सेकंड
+SNAPSHOT_GENERATIONS = int(os.getenv("SNAPSHOT_GENERATIONS", "3"))  # मौजूदा + पुरानी .1 … .K-1 फाइलें
+SNAPSHOT_FSYNC = os.getenv("SNAPSHOT_FSYNC", "true").lower() in ("1", "true", "yes")
+# सेकंड; इतने समय में हुए saves एक ही write बनते हैं और फाइल I/O event loop से बाहर होता है (0 = हर save तुरंत)।
+# crash पर journal के बिना आखिरी इतने सेकंड के बदलाव जा सकते हैं
+SAVE_DEBOUNCE = float(os.getenv("SAVE_DEBOUNCE", "1"))
+LAZY_LOAD = os.getenv("LAZY_LOAD", "true").lower() in ("1", "true", "yes")  # हिस्ट्री / रेफरल / बैन लिस्ट पहली ज़रूरत पर parse
+LAZY_WARMUP_DELAY = float(os.getenv("LAZY_WARMUP_DELAY", "30"))  # इतने सेकंड बाद बाकी lazy हिस्से background में (0 = बंद)
+PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", "3"))  # लंबे जॉब्स का status मैसेज इससे जल्दी edit नहीं होता (सेकंड)
 # ---------------------
 
 # --- GLOBAL STORAGE ---
@@ -57,59 +301,569 @@ UNLIMITED_USERS = {}  # {user_id: expiry_timestamp or "forever"}
 BANNED_USERS = set()
 USER_SEARCH_HISTORY = {}  # {user_id: [searches]}
 DAILY_STATS = {"searches": 0, "new_users": 0, "referrals": 0}
+BANNED_AT = {}  # {user_id: ban timestamp}
+BAN_REASONS = {}  # {user_id: बैन का कारण}, BANNED_AT के साथ बैन फाइल में
+USER_PROFILES = {}  # {user_id: UserProfile} जॉइन / आखिरी गतिविधि / रेफरर / रेफरल गिनती
+JOURNAL_SEQ = 0  # आखिरी लिखी / लागू की गई journal एंट्री
+_JOURNAL = None  # primary पर append के लिए खुली journal फाइल
 # -----------------------------------------------------------------
 
-def load_data():
-    """JSON फाइल से डेटा लोड करें"""
-    global USER_CREDITS, USERS, REFERRED_TRACKER, UNLIMITED_USERS, USER_SEARCH_HISTORY, DAILY_STATS
+# --- SORTED INDEXES (एडमिन लिस्ट्स की pagination के लिए) ---
+
+FOREVER_KEY = 2 ** 62  # "forever" अनलिमिटेड को expiry index में सबसे आखिर में रखें
+
+class SortedIndex:
+    """(key, user_id) जोड़ियों का sorted index: O(log n) खोज और O(page size) पेज
+
+    दो parallel arrays में रखा जाता है (8 बाइट प्रति वैल्यू), ताकि 1M यूजर्स पर भी
+    tuples की तुलना में मेमोरी कम लगे।
+    """
+
+    def __init__(self):
+        self._keys = array('q')
+        self._ids = array('q')
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _position(self, key: int, user_id: int, right: bool = False) -> int:
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key, lo)
+        return (bisect.bisect_right if right else bisect.bisect_left)(self._ids, user_id, lo, hi)
+
+    def add(self, key: int, user_id: int) -> None:
+        pos = self._position(key, user_id)
+        self._keys.insert(pos, key)
+        self._ids.insert(pos, user_id)
+
+    def remove(self, key: int, user_id: int) -> None:
+        pos = self._position(key, user_id)
+        if pos < len(self._ids) and self._keys[pos] == key and self._ids[pos] == user_id:
+            del self._keys[pos]
+            del self._ids[pos]
+
+    def rebuild(self, pairs) -> None:
+        ordered = sorted(pairs)
+        self._keys = array('q', (key for key, _ in ordered))
+        self._ids = array('q', (user_id for _, user_id in ordered))
+
+    def page(self, cursor, size: int, backwards: bool = False):
+        """cursor (key, user_id) के बाद (या पहले) के size एंट्रीज़, साथ में start position"""
+        if backwards:
+            end = self._position(*cursor) if cursor else len(self._ids)
+            start = max(0, end - size)
+        else:
+            start = self._position(*cursor, right=True) if cursor else 0
+            end = min(len(self._ids), start + size)
+        return list(zip(self._keys[start:end], self._ids[start:end])), start
+
+UNLIMITED_INDEX = SortedIndex()  # expiry के हिसाब से, जल्दी खत्म होने वाले पहले
+BANNED_INDEX = SortedIndex()  # ban time के हिसाब से, नए पहले
+CREDITS_INDEX = SortedIndex()  # क्रेडिट्स के हिसाब से, ज़्यादा वाले पहले
+
+def _expiry_key(expiry) -> int:
+    if expiry == "forever":
+        return FOREVER_KEY
+    return int(expiry) if isinstance(expiry, (int, float)) else -1
+
+def _ban_key(user_id: int) -> int:
+    return -int(BANNED_AT.get(user_id, 0))
+
+def _credits_key(credits) -> int:
+    return -int(credits)
+
+def rebuild_indexes() -> None:
+    """लोड के बाद सभी sorted indexes दोबारा बनाएं"""
+    UNLIMITED_INDEX.rebuild((_expiry_key(expiry), uid) for uid, expiry in UNLIMITED_USERS.items())
+    if "banned" not in _LAZY_SECTIONS:
+        # बैन समय अभी parse नहीं हुए तो index _load_banned बनाएगा
+        BANNED_INDEX.rebuild((_ban_key(uid), uid) for uid in BANNED_USERS)
+    CREDITS_INDEX.rebuild((_credits_key(credits), uid) for uid, credits in USER_CREDITS.items())
+
+def set_credits(user_id: int, credits: int) -> None:
+    """यूजर के क्रेडिट्स सेट करें (index के साथ)"""
+    if user_id in USER_CREDITS:
+        CREDITS_INDEX.remove(_credits_key(USER_CREDITS[user_id]), user_id)
+    USER_CREDITS[user_id] = credits
+    CREDITS_INDEX.add(_credits_key(credits), user_id)
+    journal("credits", user_id, credits)
+
+def clear_credits(user_id: int) -> None:
+    """यूजर की क्रेडिट एंट्री पूरी हटाएं (index के साथ)"""
+    if user_id in USER_CREDITS:
+        CREDITS_INDEX.remove(_credits_key(USER_CREDITS.pop(user_id)), user_id)
+        journal("credits", user_id, None)
+
+def grant_unlimited(user_id: int, expiry) -> None:
+    """अनलिमिटेड एक्सेस सेट करें (index के साथ)"""
+    if user_id in UNLIMITED_USERS:
+        UNLIMITED_INDEX.remove(_expiry_key(UNLIMITED_USERS[user_id]), user_id)
+    UNLIMITED_USERS[user_id] = expiry
+    UNLIMITED_INDEX.add(_expiry_key(expiry), user_id)
+    journal("unlimited", user_id, expiry)
+
+def revoke_unlimited(user_id: int) -> bool:
+    """अनलिमिटेड एक्सेस हटाएं (index के साथ)"""
+    if user_id not in UNLIMITED_USERS:
+        return False
+    UNLIMITED_INDEX.remove(_expiry_key(UNLIMITED_USERS.pop(user_id)), user_id)
+    journal("unlimited", user_id, None)
+    return True
+
+def ban_user(user_id: int, banned_at: int = None, reason: str = None) -> None:
+    """यूजर को बैन लिस्ट में जोड़ें (index के साथ); सब कुछ बैन फाइल में, ताकि एक बैन = एक write"""
+    ban_times()  # index की keys बैन समय से बनती हैं, इसलिए पहले वे parse हों
+    if user_id in banned_users():
+        BANNED_INDEX.remove(_ban_key(user_id), user_id)
+    banned_users().add(user_id)
+    ban_times()[user_id] = int(banned_at if banned_at is not None else datetime.now().timestamp())
+    if reason is None:
+        ban_reasons().pop(user_id, None)
+    else:
+        ban_reasons()[user_id] = reason
+    BANNED_INDEX.add(_ban_key(user_id), user_id)
+    journal("ban", user_id, ban_times()[user_id], reason)
+
+def unban_user(user_id: int) -> bool:
+    """यूजर को बैन लिस्ट से हटाएं (index के साथ)"""
+    if user_id not in banned_users():
+        return False
+    ban_times()
+    BANNED_INDEX.remove(_ban_key(user_id), user_id)
+    banned_users().discard(user_id)
+    ban_times().pop(user_id, None)
+    ban_reasons().pop(user_id, None)
+    journal("unban", user_id)
+    return True
+
+# --- User Profiles ---
+
+class UserProfile:
+    """एक यूजर का रिकॉर्ड जो बाकी dicts में नहीं है; /user इसी से O(1) में बनता है"""
+
+    __slots__ = ("joined", "last_seen", "referrer", "referrals")
+
+    def __init__(self, joined=None, last_seen=None, referrer=None, referrals=0):
+        self.joined = joined  # timestamp; पुराने यूजर्स के लिए None (अज्ञात)
+        self.last_seen = last_seen
+        self.referrer = referrer
+        self.referrals = referrals
+
+    @classmethod
+    def from_list(cls, values) -> "UserProfile":
+        # पहले की लिस्ट्स में पाँचवाँ फील्ड (बैन का कारण) भी था; वह अब बैन फाइल में है
+        return cls(*values[:4])
+
+    def to_list(self) -> list:
+        return [self.joined, self.last_seen, self.referrer, self.referrals]
+
+def update_profile(user_id: int, **fields) -> UserProfile:
+    """प्रोफाइल के फील्ड्स बदलें (न हो तो बनाएं) और journal करें"""
+    profile = USER_PROFILES.get(user_id)
+    if profile is None:
+        profile = USER_PROFILES[user_id] = UserProfile()
+    for name, value in fields.items():
+        setattr(profile, name, value)
+    journal("profile", user_id, profile.to_list())
+    return profile
+
+def touch_user(user_id: int) -> None:
+    """आखिरी गतिविधि का समय (हर update पर, इसलिए journal नहीं; अगले snapshot में सेव होता है)"""
+    profile = USER_PROFILES.get(user_id)
+    if profile is None:
+        profile = USER_PROFILES[user_id] = UserProfile()
+    profile.last_seen = int(time.time())
+
+def referral_count(user_id: int) -> int:
+    profile = USER_PROFILES.get(user_id)
+    return profile.referrals if profile else 0
+
+def _load_profiles(value) -> None:
+    global USER_PROFILES
+    USER_PROFILES = {int(k): UserProfile.from_list(v) for k, v in value.items()}
+
+def _backfill_profiles() -> None:
+    """पुरानी फाइल (बिना profiles) से रेफरर और रेफरल गिनती एक बार बनाएं"""
+    for referrer_id, referred_id in referral_tracker():
+        USER_PROFILES.setdefault(referrer_id, UserProfile()).referrals += 1
+        if referred_id in USERS:
+            USER_PROFILES.setdefault(referred_id, UserProfile()).referrer = referrer_id
+    logger.info(f"✅ Built {len(USER_PROFILES)} user profiles from referral data")
+
+# --- Crash-safe Snapshots ---
+
+SNAPSHOT_FORMAT = "numinfo-snapshot/1"
+SNAPSHOT_HEADER_MAX_BYTES = 64 * 1024  # header इससे लंबा नहीं होता; लंबी पहली लाइन = पुराना फॉर्मेट
+
+def _fsync_directory(path: str) -> None:
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
     try:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                USER_CREDITS = {int(k): v for k, v in data.get('credits', {}).items()}
-                USERS = set(data.get('users', []))
-                REFERRED_TRACKER = set(tuple(int(item) for item in x) if isinstance(x, (list, tuple)) else tuple(x) for x in data.get('referrals', []))
-                UNLIMITED_USERS = {int(k): v for k, v in data.get('unlimited', {}).items()}
-                USER_SEARCH_HISTORY = {int(k): v for k, v in data.get('search_history', {}).items()}
-                DAILY_STATS = data.get('daily_stats', {"searches": 0, "new_users": 0, "referrals": 0})
-                logger.info(f"✅ Data loaded: {len(USERS)} users, {len(UNLIMITED_USERS)} unlimited users")
-    except Exception as e:
-        logger.error(f"❌ Error loading data: {e}")
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+_SNAPSHOT_LOCK = threading.Lock()  # एक process में एक समय पर एक ही write, ताकि rotation बीच में न टूटे
+_SNAPSHOT_VERSIONS = {}  # {path: आखिरी लिखा गया version}; पुराना encode नए के ऊपर न लिखे
+_SNAPSHOT_VERSION = itertools.count(1)
+
+def encode_snapshot(sections: dict) -> tuple:
+    """sections को body में बदलें: (version, नाम, body); event loop पर ही, ताकि डेटा उसी पल का रहे"""
+    # bytes = अभी parse न हुआ lazy हिस्सा, उसे जैसा है वैसा लिखें
+    body = b"".join(
+        (value if isinstance(value, bytes) else json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")) + b"\n"
+        for value in sections.values()
+    )
+    return next(_SNAPSHOT_VERSION), list(sections), body
+
+def write_encoded_snapshot(path: str, encoded: tuple, meta: dict = None) -> int:
+    """encode हो चुका snapshot लिखें (worker thread से भी); उससे नया version लिखा जा चुका हो तो कुछ नहीं"""
+    version, names, body = encoded
+    with _SNAPSHOT_LOCK:
+        if version < _SNAPSHOT_VERSIONS.get(path, 0):
+            return 0
+        _SNAPSHOT_VERSIONS[path] = version
+        # अगली generation डिस्क से, process के cache से नहीं: takeover के बाद standby का पहला write
+        # primary की नई फाइलों से नीचे नहीं जाना चाहिए
+        generation = max(map(_snapshot_generation, snapshot_files(path)), default=0) + 1
+        header = {
+            "format": SNAPSHOT_FORMAT,
+            "generation": generation,
+            "checksum": hashlib.sha256(body).hexdigest(),
+            "sections": names,
+            "written_at": datetime.now().isoformat(),
+            **(meta or {}),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(body)
+            f.flush()
+            if SNAPSHOT_FSYNC:
+                os.fsync(f.fileno())
+        
+        for i in range(SNAPSHOT_GENERATIONS - 1, 0, -1):
+            older = path if i == 1 else f"{path}.{i - 1}"
+            if os.path.exists(older):
+                os.replace(older, f"{path}.{i}")
+        os.replace(tmp_path, path)
+        if SNAPSHOT_FSYNC:
+            _fsync_directory(path)
+    return len(body)
+
+def write_snapshot(path: str, sections: dict, meta: dict = None) -> int:
+    """temp फाइल में लिखें, fsync करें, पुरानी generations .1 … .K-1 पर खिसकाएं और atomic rename करें
+
+    `meta` header में जुड़ता है (जैसे shard layout), ताकि उसे पूरी फाइल पढ़े बिना जांचा जा सके।
+    """
+    return write_encoded_snapshot(path, encode_snapshot(sections), meta)
+
+def _read_snapshot_header(f):
+    """header लाइन (या पुराने फॉर्मेट पर None); पुरानी फाइल की बड़ी पहली लाइन पूरी नहीं पढ़ी जाती"""
+    first_line = f.readline(SNAPSHOT_HEADER_MAX_BYTES)
+    if not first_line.endswith(b"\n"):
+        return None
+    try:
+        header = json.loads(first_line)
+    except ValueError:
+        return None
+    return header if isinstance(header, dict) and header.get("format") == SNAPSHOT_FORMAT else None
+
+def read_snapshot(path: str, lazy=()) -> dict:
+    """एक snapshot पढ़ें और checksum जाँचें; अधूरी / खराब फाइल पर ValueError। `lazy` वाले sections raw bytes रहते हैं"""
+    with open(path, "rb") as f:
+        header = _read_snapshot_header(f)
+        if header is None:
+            # पुराना फॉर्मेट: पूरी फाइल एक JSON डॉक्यूमेंट
+            f.seek(0)
+            return {"generation": 0, "sections": json.load(f)}
+        body = f.read()
+    
+    if hashlib.sha256(body).hexdigest() != header["checksum"]:
+        raise ValueError("checksum mismatch (torn or corrupted write)")
+    lines = body.split(b"\n")[:-1]
+    if len(lines) != len(header["sections"]):
+        raise ValueError(f"expected {len(header['sections'])} sections, found {len(lines)}")
+    return {
+        "generation": header["generation"],
+        "sections": {name: line if name in lazy else json.loads(line) for name, line in zip(header["sections"], lines)},
+    }
+
+def snapshot_header(path: str):
+    """सिर्फ header लाइन; फाइल न हो, पुराना फॉर्मेट हो या header खराब हो तो None"""
+    try:
+        with open(path, "rb") as f:
+            return _read_snapshot_header(f)
+    except OSError:
+        return None
 
-def save_data():
-    """JSON फाइल में डेटा सेव करें"""
+def _snapshot_generation(path: str) -> int:
+    """सिर्फ header पढ़कर generation; पुराना फॉर्मेट या खराब header = 0"""
+    header = snapshot_header(path)
     try:
-        data = {
-            'credits': USER_CREDITS,
-            'users': list(USERS),
-            'referrals': [list(x) for x in REFERRED_TRACKER], 
-            'unlimited': UNLIMITED_USERS,
-            'search_history': USER_SEARCH_HISTORY,
-            'daily_stats': DAILY_STATS,
-            'last_updated': datetime.now().isoformat()
+        return int(header["generation"]) if header else 0
+    except (ValueError, TypeError, KeyError):
+        return 0
+
+def snapshot_files(path: str) -> list:
+    """डिस्क पर मौजूद सभी generations (path, path.1, path.2 …), SNAPSHOT_GENERATIONS बदला हो तब भी"""
+    directory, name = os.path.split(os.path.abspath(path))
+    pattern = re.compile(re.escape(name) + r"(\.\d+)?$")
+    return [os.path.join(os.path.dirname(path), entry) for entry in sorted(os.listdir(directory)) if pattern.fullmatch(entry)]
+
+def retire_snapshot(path: str, tag: str) -> list:
+    """सभी generations का नाम बदलें ताकि load_snapshot उन्हें फिर कभी न उठाए (डेटा backup के रूप में बचा रहता है)"""
+    retired = []
+    for candidate in snapshot_files(path):
+        os.replace(candidate, f"{candidate}.{tag}")
+        retired.append(f"{candidate}.{tag}")
+    return retired
+
+def load_snapshot(path: str, lazy=()):
+    """सबसे नई valid generation का डेटा; कोई फाइल न हो तो None, फाइलें हों पर सब खराब तो RuntimeError"""
+    candidates = [path] + [f"{path}.{i}" for i in range(1, SNAPSHOT_GENERATIONS)]
+    found = [candidate for candidate in candidates if os.path.exists(candidate)]
+    # नई generation पहले; पूरी फाइल सिर्फ तब तक पढ़ें जब तक एक valid न मिल जाए
+    for candidate in sorted(found, key=_snapshot_generation, reverse=True):
+        try:
+            snapshot = read_snapshot(candidate, lazy)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"❌ Snapshot {candidate} is invalid: {e}")
+            continue
+        if candidate != path:
+            logger.warning(f"⚠️ Recovered {path} from {candidate} (generation {snapshot['generation']})")
+        return snapshot["sections"]
+    
+    if found:
+        # खाली स्टेट से शुरू करना सबके क्रेडिट्स मिटा देगा, इसलिए रुक जाएं
+        raise RuntimeError(f"No valid snapshot among {found}, refusing to start with empty state")
+    return None
+
+# --- Lazy Sections ---
+
+_LAZY_SECTIONS = {}  # {name: raw JSON bytes (या bytes की dict)} जो अभी parse नहीं हुए
+
+def _load_referrals(value) -> None:
+    global REFERRED_TRACKER
+    REFERRED_TRACKER = set(tuple(int(item) for item in x) if isinstance(x, (list, tuple)) else tuple(x) for x in value)
+
+def _load_search_history(value) -> None:
+    global USER_SEARCH_HISTORY
+    USER_SEARCH_HISTORY = {int(k): v for k, v in value.items()}
+
+def _load_banned(value) -> None:
+    global BANNED_USERS, BANNED_AT, BAN_REASONS
+    # पुराना फॉर्मेट: सिर्फ IDs की लिस्ट
+    if isinstance(value, list):
+        value = {"users": value}
+    if "users" in value:  # lazy लोड में IDs पहले ही (load_banned_users में) आ चुके होते हैं
+        BANNED_USERS = set(int(uid) for uid in value["users"])
+    BANNED_AT = {int(k): v for k, v in value.get("banned_at", {}).items()}
+    BAN_REASONS = {int(k): v for k, v in value.get("reasons", {}).items()}
+    BANNED_INDEX.rebuild((_ban_key(uid), uid) for uid in BANNED_USERS)
+
+_LAZY_LOADERS = {
+    "referrals": _load_referrals,
+    "search_history": _load_search_history,
+    "banned": _load_banned,
+}
+
+def _set_section(name: str, value) -> None:
+    """raw bytes हों तो बाद के लिए रखें, वरना तुरंत लोड करें"""
+    pending = isinstance(value, bytes) or (isinstance(value, dict) and any(isinstance(v, bytes) for v in value.values()))
+    if pending:
+        _LAZY_SECTIONS[name] = value
+    else:
+        _LAZY_SECTIONS.pop(name, None)
+        _LAZY_LOADERS[name](value)
+
+def _materialize(name: str) -> None:
+    pending = _LAZY_SECTIONS.pop(name)
+    started = time.perf_counter()
+    if isinstance(pending, dict):
+        value = {key: json.loads(raw) if isinstance(raw, bytes) else raw for key, raw in pending.items()}
+    else:
+        value = json.loads(pending)
+    _LAZY_LOADERS[name](value)
+    logger.info(f"⏱ Lazy-loaded {name} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+def referral_tracker() -> set:
+    """REFERRED_TRACKER (पहली बार ज़रूरत पड़ने पर snapshot से parse)"""
+    if "referrals" in _LAZY_SECTIONS:
+        _materialize("referrals")
+    return REFERRED_TRACKER
+
+def search_history() -> dict:
+    """USER_SEARCH_HISTORY (पहली बार ज़रूरत पड़ने पर snapshot से parse)"""
+    if "search_history" in _LAZY_SECTIONS:
+        _materialize("search_history")
+    return USER_SEARCH_HISTORY
+
+def banned_users() -> set:
+    """BANNED_USERS; IDs हमेशा लोड रहते हैं ताकि is_banned पहले अपडेट पर पूरा parse न करे"""
+    return BANNED_USERS
+
+def ban_times() -> dict:
+    """BANNED_AT (पहली बार ज़रूरत पड़ने पर snapshot से parse)"""
+    if "banned" in _LAZY_SECTIONS:
+        _materialize("banned")
+    return BANNED_AT
+
+def ban_reasons() -> dict:
+    """BAN_REASONS (पहली बार ज़रूरत पड़ने पर snapshot से parse)"""
+    if "banned" in _LAZY_SECTIONS:
+        _materialize("banned")
+    return BAN_REASONS
+
+async def warm_lazy_sections() -> None:
+    """startup के कुछ देर बाद बचे हुए lazy हिस्से लोड करें ताकि किसी यूजर की रिक्वेस्ट पर यह खर्च न आए"""
+    await asyncio.sleep(LAZY_WARMUP_DELAY)
+    for name in list(_LAZY_SECTIONS):
+        if name in _LAZY_SECTIONS:
+            _materialize(name)
+            await asyncio.sleep(0)
+
+def load_data():
+    """सबसे नई valid snapshot से डेटा लोड करें (हिस्ट्री और रेफरल्स LAZY_LOAD में पहली ज़रूरत पर)"""
+    global USER_CREDITS, USERS, UNLIMITED_USERS, DAILY_STATS, JOURNAL_SEQ
+    data = load_snapshot(DATA_FILE, lazy=("referrals", "search_history") if LAZY_LOAD else ())
+    if data is None:
+        return
+    USER_CREDITS = {int(k): v for k, v in data.get('credits', {}).items()}
+    USERS = set(data.get('users', []))
+    _set_section("referrals", data.get('referrals', []))
+    UNLIMITED_USERS = {int(k): v for k, v in data.get('unlimited', {}).items()}
+    _set_section("search_history", data.get('search_history', {}))
+    DAILY_STATS = data.get('daily_stats', {"searches": 0, "new_users": 0, "referrals": 0})
+    JOURNAL_SEQ = data.get('journal_seq', 0)
+    if 'profiles' in data:
+        _load_profiles(data['profiles'])
+    else:
+        _backfill_profiles()
+    UNLIMITED_INDEX.rebuild((_expiry_key(expiry), uid) for uid, expiry in UNLIMITED_USERS.items())
+    CREDITS_INDEX.rebuild((_credits_key(credits), uid) for uid, credits in USER_CREDITS.items())
+    logger.info(f"✅ Data loaded: {len(USERS)} users, {len(UNLIMITED_USERS)} unlimited users")
+
+def _snapshot_meta() -> dict:
+    """हर snapshot के header में: worker मोड में उसका shard layout, primary पर उसका lease epoch"""
+    meta = {}
+    if SHARD_ID is not None:
+        meta["shard"] = {"index": SHARD_ID, "count": SHARD_COUNT, "vnodes": SHARD_VNODES}
+    if _LEASE_EPOCH:
+        meta["lease_epoch"] = _LEASE_EPOCH
+    return meta
+
+def reset_state() -> None:
+    """सारा in-memory स्टेट खाली करें (reshard में हर फाइल लोड करने से पहले)"""
+    global USER_CREDITS, USERS, REFERRED_TRACKER, UNLIMITED_USERS, BANNED_USERS, USER_SEARCH_HISTORY
+    global DAILY_STATS, BANNED_AT, BAN_REASONS, USER_PROFILES, JOURNAL_SEQ
+    USER_CREDITS, USERS, REFERRED_TRACKER, UNLIMITED_USERS = {}, set(), set(), {}
+    BANNED_USERS, USER_SEARCH_HISTORY, BANNED_AT, BAN_REASONS, USER_PROFILES = set(), {}, {}, {}, {}
+    DAILY_STATS = {"searches": 0, "new_users": 0, "referrals": 0}
+    JOURNAL_SEQ = 0
+    _LAZY_SECTIONS.clear()
+    rebuild_indexes()
+
+_SAVE_TASKS = {}  # {"data" / "banned": asyncio.Task} SAVE_DEBOUNCE के बाद चलने वाला save
+
+def _save_target(kind: str) -> tuple:
+    """(फाइल, sections) जो इस save में लिखे जाएंगे"""
+    if kind == "banned":
+        # बैन समय / कारण अभी parse न हुए हों तो raw ही लिखें
+        return BANNED_USERS_FILE, {
+            "banned_at": BANNED_AT, "reasons": BAN_REASONS, **_LAZY_SECTIONS.get("banned", {}),
+            "users": list(BANNED_USERS),
         }
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"❌ Error saving data: {e}")
+    journal("stats", DAILY_STATS)
+    return DATA_FILE, {
+        'credits': USER_CREDITS,
+        'users': list(USERS),
+        'referrals': _LAZY_SECTIONS.get("referrals") or [list(x) for x in REFERRED_TRACKER],
+        'unlimited': UNLIMITED_USERS,
+        'search_history': _LAZY_SECTIONS.get("search_history") or USER_SEARCH_HISTORY,
+        'profiles': {uid: profile.to_list() for uid, profile in USER_PROFILES.items()},
+        'daily_stats': DAILY_STATS,
+        'journal_seq': JOURNAL_SEQ,
+        'last_updated': datetime.now().isoformat()
+    }
 
-def load_banned_users():
-    """बैन किए गए यूजर्स लोड करें"""
-    global BANNED_USERS
+def _after_save(kind: str, seq: int) -> None:
+    # journal सिर्फ तभी हटे जब snapshot में उसकी आखिरी एंट्री तक सब है
+    if kind == "data" and _JOURNAL is not None and JOURNAL_SEQ == seq and _JOURNAL.tell() > STATE_JOURNAL_MAX_BYTES:
+        rotate_journal()
+
+def _save_now(kind: str, raise_errors: bool = False) -> None:
     try:
-        if os.path.exists(BANNED_USERS_FILE):
-            with open(BANNED_USERS_FILE, 'r') as f:
-                BANNED_USERS = set(int(uid) for uid in json.load(f))
+        # lease किसी और के पास जा चुकी हो तो नया primary ही लिखे, हम नहीं
+        ensure_lease(check_disk=True)
+        path, sections = _save_target(kind)
+        seq = JOURNAL_SEQ
+        write_snapshot(path, sections, _snapshot_meta())
+        _after_save(kind, seq)
     except Exception as e:
-        logger.error(f"Error loading banned users: {e}")
+        logger.error(f"❌ Error saving {'data' if kind == 'data' else 'banned users'}: {e}")
+        if raise_errors:
+            raise
 
-def save_banned_users():
-    """बैन किए गए यूजर्स सेव करें"""
+async def _deferred_save(kind: str) -> None:
+    """SAVE_DEBOUNCE बाद एक save: डेटा loop पर encode होता है, fsync / rotation वाला write thread में"""
+    await asyncio.sleep(SAVE_DEBOUNCE)
+    if _SAVE_TASKS.get(kind) is not asyncio.current_task():
+        return  # flush_saves पहले ही लिख चुका
+    # इसके बाद के बदलाव नया save शेड्यूल करें
+    del _SAVE_TASKS[kind]
     try:
-        with open(BANNED_USERS_FILE, 'w') as f:
-            json.dump(list(BANNED_USERS), f)
+        ensure_lease(check_disk=True)
+        path, sections = _save_target(kind)
+        seq = JOURNAL_SEQ
+        encoded = encode_snapshot(sections)
+        await asyncio.to_thread(write_encoded_snapshot, path, encoded, _snapshot_meta())
+        _after_save(kind, seq)
     except Exception as e:
-        logger.error(f"Error saving banned users: {e}")
+        logger.error(f"❌ Error saving {'data' if kind == 'data' else 'banned users'}: {e}")
+
+def _defer_save(kind: str) -> bool:
+    """event loop पर हों और SAVE_DEBOUNCE चालू हो तो save टालें (एक बार में एक ही pending); True = टल गया"""
+    if SAVE_DEBOUNCE <= 0:
+        return False
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    if kind not in _SAVE_TASKS:
+        _SAVE_TASKS[kind] = start_background_task(_deferred_save(kind))
+    return True
+
+def flush_saves() -> None:
+    """टले हुए saves अभी लिखें (shutdown पर), ताकि आखिरी SAVE_DEBOUNCE सेकंड के बदलाव न छूटें"""
+    for kind in list(_SAVE_TASKS):
+        del _SAVE_TASKS[kind]
+        _save_now(kind)
+
+def save_data(raise_errors: bool = False):
+    """डेटा को crash-safe snapshot में सेव करें (जो हिस्से अभी parse नहीं हुए वे raw ही लिखे जाते हैं)
+
+    event loop पर save SAVE_DEBOUNCE तक टलता है और कई saves एक write बनते हैं। raise_errors=True वाले
+    कॉलर्स (bulk, import, reshard), जिन्हें पता होना चाहिए कि डेटा डिस्क पर पहुंचा, तुरंत लिखते हैं और
+    गड़बड़ी पर exception पाते हैं; बाकी में वह सिर्फ लॉग होती है।
+    """
+    if raise_errors or not _defer_save("data"):
+        _save_now("data", raise_errors)
+
+def load_banned_users():
+    """बैन किए गए यूजर्स लोड करें: IDs अभी, LAZY_LOAD में बैन समय और कारण पहली ज़रूरत पर"""
+    global BANNED_USERS
+    data = load_snapshot(BANNED_USERS_FILE, lazy=("banned_at", "reasons") if LAZY_LOAD else ())
+    if data is None:
+        return
+    if isinstance(data, dict) and any(isinstance(v, bytes) for v in data.values()):
+        data = dict(data)
+        BANNED_USERS = set(int(uid) for uid in data.pop("users", []))
+    _set_section("banned", data)
+
+def save_banned_users(raise_errors: bool = False):
+    """बैन किए गए यूजर्स सेव करें (raise_errors और debounce: save_data जैसा)"""
+    if raise_errors or not _defer_save("banned"):
+        _save_now("banned", raise_errors)
 
 def get_credits(user_id: int) -> int:
     """यूजर के वर्तमान क्रेडिट्स प्राप्त करें"""
@@ -117,7 +871,7 @@ def get_credits(user_id: int) -> int:
         return float('inf')
     
     if user_id not in USER_CREDITS:
-        USER_CREDITS[user_id] = DAILY_CREDITS_LIMIT
+        set_credits(user_id, DAILY_CREDITS_LIMIT)
         save_data()
     
     return USER_CREDITS.get(user_id, 0)
@@ -139,7 +893,7 @@ def is_unlimited(user_id: int) -> bool:
         if datetime.now().timestamp() < expiry:
             return True
         else:
-            del UNLIMITED_USERS[user_id]
+            revoke_unlimited(user_id)
             save_data()
             return False
     
@@ -181,22 +935,27 @@ def save_user(user_id: int) -> None:
     """यूजर ID सेव करें"""
     if user_id not in USERS:
         USERS.add(user_id)
+        journal("user", user_id)
+        update_profile(user_id, joined=int(time.time()))
         DAILY_STATS["new_users"] += 1
         save_data()
 
 def add_search_history(user_id: int, number: str) -> None:
     """सर्च हिस्ट्री में जोड़ें"""
-    if user_id not in USER_SEARCH_HISTORY:
-        USER_SEARCH_HISTORY[user_id] = []
+    history_by_user = search_history()
+    if user_id not in history_by_user:
+        history_by_user[user_id] = []
     
-    USER_SEARCH_HISTORY[user_id].append({
+    entry = {
         "number": number,
         "timestamp": datetime.now().isoformat()
-    })
+    }
+    history_by_user[user_id].append(entry)
+    journal("search", user_id, entry)
     
     # केवल आखिरी 50 सर्च रखें
-    if len(USER_SEARCH_HISTORY[user_id]) > 50:
-        USER_SEARCH_HISTORY[user_id] = USER_SEARCH_HISTORY[user_id][-50:]
+    if len(history_by_user[user_id]) > 50:
+        history_by_user[user_id] = history_by_user[user_id][-50:]
     
     DAILY_STATS["searches"] += 1
     save_data()
@@ -209,7 +968,7 @@ async def check_channel_membership(user_id: int, context: ContextTypes.DEFAULT_T
     except Forbidden:
         return False
     except TelegramError as e:
-        logger.error(f"Error checking membership for {user_id}: {e}")
+        logger.error(f"Error checking membership for {user_id}: {e}", extra={"category": "membership_error"})
         return False
 
 async def force_channel_join(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
@@ -252,7 +1011,40 @@ async def force_channel_join(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 def is_banned(user_id: int) -> bool:
     """चेक करें कि यूजर बैन है या नहीं"""
-    return user_id in BANNED_USERS
+    return user_id in banned_users()
+
+async def credit_referral(bot, referrer_id: int, referred_id: int, referred_name: str) -> bool:
+    """रेफरर को क्रेडिट दें (रेफरर के shard पर चलता है)"""
+    referral_key = (referrer_id, referred_id)
+    if referral_key in referral_tracker() or referrer_id in banned_users() or referrer_id not in USERS:
+        return False
+    
+    if not is_unlimited(referrer_id):
+        set_credits(referrer_id, USER_CREDITS.get(referrer_id, 0) + REFERRAL_CREDITS)
+    
+    referral_tracker().add(referral_key)
+    journal("referral", referrer_id, referred_id)
+    update_profile(referrer_id, referrals=referral_count(referrer_id) + 1)
+    if SHARD_COUNT <= 1 or shard_for_user(referred_id) == SHARD_ID:
+        # रेफर हुआ यूजर भी इसी shard पर है: उसका रेफरर इसी write में रखें
+        update_profile(referred_id, referrer=referrer_id)
+    DAILY_STATS["referrals"] += 1
+    save_data()
+    
+    referrer_credits = "अनलिमिटेड ♾️" if is_unlimited(referrer_id) else USER_CREDITS[referrer_id]
+    
+    try:
+        await bot.send_message(
+            chat_id=referrer_id,
+            text=f"🥳 **बधाई हो!** 🎉\n\n"
+                f"👤 **{referred_name}** ने आपके रेफरल लिंक से बॉट शुरू किया है।\n"
+                f"🎁 आपको **{REFERRAL_CREDITS} क्रेडिट** मिले हैं!\n"
+                f"💰 **आपके कुल क्रेडिट:** {referrer_credits}",
+            parse_mode=ParseMode.MARKDOWN
+        )
+    except:
+        pass
+    return True
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """/start कमांड हैंडलर"""
@@ -279,32 +1071,16 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if context.args and context.args[0].startswith('ref_'):
         try:
             referrer_id = int(context.args[0].split('_')[1])
-            referral_key = (referrer_id, user_id)
             
-            if referrer_id != user_id and referral_key not in REFERRED_TRACKER and referrer_id not in BANNED_USERS:
-                if referrer_id in USERS:
-                    if not is_unlimited(referrer_id):
-                        USER_CREDITS[referrer_id] = USER_CREDITS.get(referrer_id, 0) + REFERRAL_CREDITS
-                    
-                    REFERRED_TRACKER.add(referral_key)
-                    DAILY_STATS["referrals"] += 1
-                    save_data()
-                    
-                    referrer_credits = "अनलिमिटेड ♾️" if is_unlimited(referrer_id) else USER_CREDITS[referrer_id]
-                    
-                    try:
-                        await context.bot.send_message(
-                            chat_id=referrer_id,
-                            text=f"🥳 **बधाई हो!** 🎉\n\n"
-                                f"👤 **{username}** ने आपके रेफरल लिंक से बॉट शुरू किया है।\n"
-                                f"🎁 आपको **{REFERRAL_CREDITS} क्रेडिट** मिले हैं!\n"
-                                f"💰 **आपके कुल क्रेडिट:** {referrer_credits}",
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    except:
-                        pass
-                    
-                    referral_success = True
+            if referrer_id != user_id:
+                referral_success = await shard_call(
+                    context.bot, shard_for_user(referrer_id), "referral", referrer_id, user_id, username
+                )
+                if referral_success:
+                    if shard_for_user(referrer_id) != shard_for_user(user_id):
+                        # रेफरर दूसरे shard पर है, इसलिए यह जानकारी यहीं (यूजर के shard पर) रखें
+                        update_profile(user_id, referrer=referrer_id)
+                        save_data()
                     await update.message.reply_text(
                         f"✅ **स्वागत है!** 🎊\n\n"
                         f"आपने रेफरल के ज़रिए बॉट शुरू किया है।\n"
@@ -470,7 +1246,7 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if user_data:
         # क्रेडिट घटाएं (केवल सफल सर्च पर)
         if not is_unli:
-            USER_CREDITS[user_id] -= 1
+            set_credits(user_id, USER_CREDITS[user_id] - 1)
             save_data()
         
         # सर्च हिस्ट्री में जोड़ें
@@ -528,6 +1304,20 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 # --- Admin Commands (No change needed here, already supports unlimited) ---
 
+def parse_duration(time_str: str):
+    """'12h' / '7d' / '1m' को (expiry timestamp, टेक्स्ट) में बदलें; गलत फॉर्मेट पर None"""
+    time_str = time_str.lower()
+    if time_str.endswith('h'):
+        hours = int(time_str[:-1])
+        return (datetime.now() + timedelta(hours=hours)).timestamp(), f"{hours} घंटे"
+    elif time_str.endswith('d'):
+        days = int(time_str[:-1])
+        return (datetime.now() + timedelta(days=days)).timestamp(), f"{days} दिन"
+    elif time_str.endswith('m'):
+        months = int(time_str[:-1])
+        return (datetime.now() + timedelta(days=months*30)).timestamp(), f"{months} महीने"
+    return None
+
 async def unlimited_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """किसी यूजर को अनलिमिटेड एक्सेस दें (एडमिन ओनली)"""
     user_id = update.effective_user.id
@@ -559,29 +1349,17 @@ async def unlimited_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     duration_text = "हमेशा के लिए ♾️"
     
     if len(context.args) > 1:
-        time_str = context.args[1].lower()
         try:
-            if time_str.endswith('h'):
-                hours = int(time_str[:-1])
-                expiry = (datetime.now() + timedelta(hours=hours)).timestamp()
-                duration_text = f"{hours} घंटे"
-            elif time_str.endswith('d'):
-                days = int(time_str[:-1])
-                expiry = (datetime.now() + timedelta(days=days)).timestamp()
-                duration_text = f"{days} दिन"
-            elif time_str.endswith('m'):
-                months = int(time_str[:-1])
-                expiry = (datetime.now() + timedelta(days=months*30)).timestamp() 
-                duration_text = f"{months} महीने"
-            else:
-                await update.message.reply_text("❌ Invalid time format. Use: 1h, 7d, 1m, etc.")
-                return
+            parsed = parse_duration(context.args[1])
         except ValueError:
             await update.message.reply_text("❌ Invalid time value.")
             return
+        if parsed is None:
+            await update.message.reply_text("❌ Invalid time format. Use: 1h, 7d, 1m, etc.")
+            return
+        expiry, duration_text = parsed
     
-    UNLIMITED_USERS[target_user_id] = expiry
-    save_data()
+    await shard_call(context.bot, shard_for_user(target_user_id), "grant_unlimited", target_user_id, expiry)
     
     keyboard = [
         [InlineKeyboardButton("📊 View All Unlimited Users", callback_data='admin_unlimited_list')]
@@ -631,9 +1409,8 @@ async def remove_unlimited_command(update: Update, context: ContextTypes.DEFAULT
         await update.message.reply_text("❌ Invalid User ID.")
         return
     
-    if target_user_id in UNLIMITED_USERS:
-        del UNLIMITED_USERS[target_user_id]
-        save_data()
+    remaining_credits = await shard_call(context.bot, shard_for_user(target_user_id), "revoke_unlimited", target_user_id)
+    if remaining_credits is not None:
         await update.message.reply_text(
             f"✅ **Unlimited Access Removed**\n\n"
             f"User `{target_user_id}` का unlimited access हटा दिया गया है।",
@@ -641,20 +1418,45 @@ async def remove_unlimited_command(update: Update, context: ContextTypes.DEFAULT
         )
         
         try:
-            if target_user_id not in USER_CREDITS:
-                 USER_CREDITS[target_user_id] = DAILY_CREDITS_LIMIT
-                 save_data()
-            
             await context.bot.send_message(
                 chat_id=target_user_id,
                 text="⚠️ आपका **Unlimited Access** समाप्त हो गया है।\n\n"
-                    f"अब आप normal credits ({USER_CREDITS.get(target_user_id, 0)} क्रेडिट्स) के साथ बॉट का उपयोग कर सकते हैं।"
+                    f"अब आप normal credits ({remaining_credits} क्रेडिट्स) के साथ बॉट का उपयोग कर सकते हैं।"
             )
         except:
             pass
     else:
         await update.message.reply_text(f"❌ User `{target_user_id}` के पास unlimited access नहीं है।", parse_mode=ParseMode.MARKDOWN)
 
+def collect_stats(bot=None) -> dict:
+    """इस process (shard) के आंकड़े"""
+    return {
+        "users": len(USERS),
+        "referrals": len(referral_tracker()),
+        "unlimited": len(UNLIMITED_USERS),
+        "banned": len(banned_users()),
+        "searches": DAILY_STATS.get("searches", 0),
+        # यह सिर्फ एक अनुमानित आंकड़ा है, इसे सटीक रूप से ट्रैक करने के लिए अधिक complex logic चाहिए
+        "credits_used": sum(DAILY_CREDITS_LIMIT - USER_CREDITS.get(uid, 0) for uid in USERS if uid not in UNLIMITED_USERS),
+        "new_users": DAILY_STATS.get("new_users", 0),
+        "referrals_today": DAILY_STATS.get("referrals", 0),
+    }
+
+def _referral_counts() -> dict:
+    """इस shard के हर रेफरर की रेफरल गिनती"""
+    counts = {}
+    for ref_id, _ in referral_tracker():
+        counts[ref_id] = counts.get(ref_id, 0) + 1
+    return counts
+
+def top_referrers(bot=None, limit: int = 10) -> list:
+    """इस shard के सबसे ज़्यादा रेफरल वाले यूजर्स; हर रेफरर एक ही shard पर रहता है, इसलिए shards के top मिलाना काफी है"""
+    return sorted(_referral_counts().items(), key=lambda x: x[1], reverse=True)[:limit]
+
+def referrers_above(bot=None, count: int = 0) -> int:
+    """इस shard के कितने रेफरर्स के `count` से ज़्यादा रेफरल हैं (रैंक के लिए)"""
+    return sum(1 for value in _referral_counts().values() if value > count)
+
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """बॉट की स्टेटिस्टिक्स दिखाएं (Admin Only)"""
     user_id = update.effective_user.id
@@ -663,14 +1465,9 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         await update.message.reply_text("⚠️ **अस्वीकृत!** यह कमांड केवल एडमिन के लिए है।")
         return
     
-    total_users = len(USERS)
-    total_referrals = len(REFERRED_TRACKER)
-    unlimited_users = len(UNLIMITED_USERS)
-    banned_users = len(BANNED_USERS)
-    total_searches = DAILY_STATS.get("searches", 0)
-    
-    # यह सिर्फ एक अनुमानित आंकड़ा है, इसे सटीक रूप से ट्रैक करने के लिए अधिक complex logic चाहिए
-    total_credits_used = sum(DAILY_CREDITS_LIMIT - USER_CREDITS.get(uid, 0) for uid in USERS if uid not in UNLIMITED_USERS)
+    # sharded मोड में हर shard के आंकड़े जोड़ें
+    parts = await call_all_shards(context.bot, "stats")
+    stats = {key: sum(part[key] for part in parts) for key in parts[0]}
     
     keyboard = [
         [
@@ -679,6 +1476,9 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         ],
         [
             InlineKeyboardButton("🚫 Banned Users", callback_data='admin_banned_list'),
+            InlineKeyboardButton("💰 Top Credits", callback_data='admin_credits_list')
+        ],
+        [
             InlineKeyboardButton("🔄 Refresh", callback_data='admin_stats')
         ]
     ]
@@ -687,21 +1487,151 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     stats_message = (
         "📊 **Bot Statistics Dashboard**\n"
         "━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"👥 **Total Users:** {total_users}\n"
-        f"🔗 **Total Referrals:** {total_referrals}\n"
-        f"👑 **Unlimited Users:** {unlimited_users}\n"
-        f"🚫 **Banned Users:** {banned_users}\n"
-        f"🔍 **Total Searches (Since Start):** {total_searches}\n"
-        f"💳 **Estimated Credits Used:** {total_credits_used}\n\n"
+        f"👥 **Total Users:** {stats['users']}\n"
+        f"🔗 **Total Referrals:** {stats['referrals']}\n"
+        f"👑 **Unlimited Users:** {stats['unlimited']}\n"
+        f"🚫 **Banned Users:** {stats['banned']}\n"
+        f"🔍 **Total Searches (Since Start):** {stats['searches']}\n"
+        f"💳 **Estimated Credits Used:** {stats['credits_used']}\n\n"
         f"📅 **Today's Stats:**\n"
-        f"  • New Users: {DAILY_STATS.get('new_users', 0)}\n"
-        f"  • Searches: {DAILY_STATS.get('searches', 0)}\n"
-        f"  • Referrals: {DAILY_STATS.get('referrals', 0)}\n\n"
+        f"  • New Users: {stats['new_users']}\n"
+        f"  • Searches: {stats['searches']}\n"
+        f"  • Referrals: {stats['referrals_today']}\n\n"
         f"⏰ **Last Update:** {datetime.now().strftime('%d-%m-%Y %H:%M')}"
     )
     
     await update.message.reply_text(stats_message, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
 
+# --- Progress Reporting ---
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
+
+class ProgressReporter:
+    """लंबे एडमिन जॉब्स की प्रगति: updates coalesce होते हैं, sink तक हर `interval` सेकंड में ज़्यादा से ज़्यादा एक बार
+    
+    sink(text) सादा फंक्शन (CLI में stderr) या coroutine (Telegram edit) हो सकता है। async sink एक समय में
+    एक ही चलता है; बीच के updates छूट जाते हैं और अगली बार सबसे नई स्थिति जाती है। वही टेक्स्ट दोबारा नहीं भेजा जाता।
+    """
+    
+    def __init__(self, title: str, total: int, sink, labels: dict = None, unit: str = "items",
+                 interval: float = PROGRESS_EDIT_INTERVAL):
+        self.title = title
+        self.total = total
+        self.sink = sink
+        self.labels = labels or {}  # {count का नाम: दिखने वाला लेबल}; बाकी counts नहीं दिखते
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self.counts = {}
+        self.started = time.monotonic()
+        self._last_emit = self.started
+        self._last_digest = None
+        self._pending = None  # चल रहा async sink task
+    
+    def update(self, done: int = None, **counts) -> None:
+        """नई स्थिति दर्ज करें; interval बीत चुका हो और पिछला edit पूरा हो गया हो तभी sink तक जाती है"""
+        if done is not None:
+            self.done = done
+        self.counts.update(counts)
+        now = time.monotonic()
+        if now - self._last_emit < self.interval or (self._pending is not None and not self._pending.done()):
+            return
+        # rate / ETA हर बार बदलते हैं, इसलिए hash सिर्फ प्रगति का; कुछ आगे नहीं बढ़ा तो edit नहीं
+        result = self._emit(self.render(), hash((self.done, tuple(self.counts.items()))))
+        if result is False:
+            return
+        self._last_emit = now
+        if asyncio.iscoroutine(result):
+            self._pending = start_background_task(result)
+    
+    def _emit(self, text: str, digest=None):
+        # Telegram बिना बदलाव वाले edit पर "message is not modified" देता है, इसलिए hash से पहले ही रोकें
+        if digest is None:
+            digest = hashlib.sha1(text.encode("utf-8")).digest()
+        if digest == self._last_digest:
+            return False
+        self._last_digest = digest
+        return self.sink(text)
+    
+    def rate_line(self, final: bool = False) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        if final:
+            return f"⏱ Time: {_format_duration(elapsed)} • ⚡ {rate:,.1f} {self.unit}/s"
+        eta = (self.total - self.done) / rate if rate and self.total > self.done else None
+        return f"⚡ {rate:,.1f} {self.unit}/s • ⏳ ETA: {_format_duration(eta) if eta is not None else '—'}"
+    
+    def render(self, final: bool = False) -> str:
+        progress = f"📊 Progress: {self.done:,}/{self.total:,}"
+        if self.total:
+            progress += f" ({self.done / self.total * 100:.1f}%)"
+        lines = [self.title, "", progress]
+        lines += [f"{label}: {self.counts[name]:,}" for name, label in self.labels.items() if name in self.counts]
+        lines.append(self.rate_line(final))
+        return "\n".join(lines)
+    
+    def close(self, text: str = None) -> None:
+        """sync sink पर आखिरी summary (default: throughput के साथ)"""
+        self._emit(text or self.render(final=True))
+    
+    async def aclose(self, text: str = None) -> None:
+        """async sink: चल रहा edit पूरा होने दें, फिर आखिरी summary ताकि पुरानी स्थिति उसके ऊपर न लिखी जाए"""
+        if self._pending is not None:
+            await asyncio.wait([self._pending])
+        result = self._emit(text or self.render(final=True))
+        if asyncio.iscoroutine(result):
+            await result
+
+def message_progress_sink(message, parse_mode=None):
+    """Telegram status मैसेज को edit करने वाला sink; edit फेल हो तो जॉब नहीं रुकता, सिर्फ लॉग होता है"""
+    async def sink(text: str) -> None:
+        try:
+            await message.edit_text(text, parse_mode=parse_mode)
+        except TelegramError as e:
+            logger.info(f"Progress edit skipped: {e}", extra={"category": "progress_edit_failure"})
+    return sink
+
+def stderr_progress_sink(text: str) -> None:
+    """CLI के लिए: एक लाइन में stderr पर, साथ में RSS"""
+    line = " | ".join(part for part in text.splitlines() if part)
+    print(f"  {line} | RSS {format_bytes(get_rss_bytes())}", file=sys.stderr, flush=True)
+
+async def send_broadcast(bot, broadcast_message: str, on_progress=None) -> dict:
+    """इस process (shard) के सभी यूजर्स को मैसेज भेजें"""
+    results = {"total": len(USERS), "success": 0, "failure": 0, "blocked": 0}
+    
+    # भेजते समय नए यूजर्स जुड़ सकते हैं, इसलिए snapshot पर चलें
+    for idx, chat_id in enumerate(list(USERS)):
+        try:
+            await bot.send_message(
+                chat_id=chat_id,
+                text=f"📢 **Broadcast Message**\n\n{broadcast_message}",
+                parse_mode=ParseMode.MARKDOWN
+            )
+            results["success"] += 1
+            
+            if (idx + 1) % BROADCAST_BATCH_SIZE == 0 and BROADCAST_BATCH_DELAY > 0:
+                await asyncio.sleep(BROADCAST_BATCH_DELAY)
+                
+        except Forbidden:
+            results["blocked"] += 1
+            results["failure"] += 1
+        except Exception as e:
+            results["failure"] += 1
+            logger.info(f"Failed to send to {chat_id}: {e}", extra={"category": "broadcast_failure"})
+        
+        # हर मैसेज पर; कितनी बार edit हो यह ProgressReporter तय करता है
+        if on_progress:
+            on_progress(results)
+    
+    return results
+
 async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """सभी यूजर्स को मैसेज ब्रॉडकास्ट करें (Admin Only)"""
     user_id = update.effective_user.id
@@ -719,55 +1649,63 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     broadcast_message = " ".join(context.args)
-    success_count = 0
-    failure_count = 0
-    blocked_count = 0
-    
-    status_msg = await update.message.reply_text(
-        f"⏳ **Broadcasting...**\n\n"
-        f"👥 Target Users: {len(USERS)}\n"
-        f"✅ Sent: 0\n"
-        f"❌ Failed: 0"
-    )
     
-    for idx, chat_id in enumerate(USERS):
+    if SHARD_COUNT > 1:
+        status_msg = await update.message.reply_text(f"⏳ **Broadcasting...**\n\n🧩 Shards: {SHARD_COUNT}")
+        reporter = ProgressReporter(
+            "⏳ **Broadcasting...**", 0, message_progress_sink(status_msg),
+            labels={"success": "✅ Sent", "failure": "❌ Failed"}, unit="msg"
+        )
+        shard_results = {}
+        
+        def on_shard_progress(shard: int, results: dict) -> None:
+            # हर shard अपनी गिनती भेजता है; कुल = सबका जोड़
+            shard_results[shard] = results
+            reporter.total = sum(part["total"] for part in shard_results.values())
+            success = sum(part["success"] for part in shard_results.values())
+            failure = sum(part["failure"] for part in shard_results.values())
+            reporter.update(success + failure, success=success, failure=failure)
+        
+        # हर shard अपने यूजर्स को भेजता है, यहाँ सिर्फ नतीजे जुड़ते हैं
         try:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"📢 **Broadcast Message**\n\n{broadcast_message}",
-                parse_mode=ParseMode.MARKDOWN
+            parts = await call_all_shards(
+                context.bot, "broadcast", broadcast_message,
+                timeout=SHARD_BROADCAST_TIMEOUT, on_progress=on_shard_progress
             )
-            success_count += 1
-            
-            if (idx + 1) % 50 == 0:
-                await status_msg.edit_text(
-                    f"⏳ **Broadcasting...**\n\n"
-                    f"👥 Target Users: {len(USERS)}\n"
-                    f"✅ Sent: {success_count}\n"
-                    f"❌ Failed: {failure_count}\n"
-                    f"📊 Progress: {idx + 1}/{len(USERS)}"
-                )
-            
-            if (idx + 1) % 30 == 0:
-                await asyncio.sleep(1)
-                
-        except Forbidden:
-            blocked_count += 1
-            failure_count += 1
-        except Exception as e:
-            failure_count += 1
-            logger.info(f"Failed to send to {chat_id}: {e}")
+        except (asyncio.TimeoutError, RuntimeError) as e:
+            logger.error(f"❌ Sharded broadcast failed: {e}")
+            # status मैसेज बिना parse_mode के जाता है, इसलिए error जैसा है वैसा (escape नहीं)
+            await reporter.aclose(f"❌ **Broadcast Failed!**\n\nएक shard से जवाब नहीं मिला: {e or type(e).__name__}")
+            return
+        results = {key: sum(part[key] for part in parts) for key in parts[0]}
+    else:
+        status_msg = await update.message.reply_text(
+            f"⏳ **Broadcasting...**\n\n"
+            f"👥 Target Users: {len(USERS)}\n"
+            f"✅ Sent: 0\n"
+            f"❌ Failed: 0"
+        )
+        reporter = ProgressReporter(
+            "⏳ **Broadcasting...**", len(USERS), message_progress_sink(status_msg),
+            labels={"success": "✅ Sent", "failure": "❌ Failed"}, unit="msg"
+        )
+        results = await send_broadcast(
+            context.bot, broadcast_message,
+            lambda results: reporter.update(results["success"] + results["failure"], **results)
+        )
+    reporter.done = results["success"] + results["failure"]
     
     final_message = (
         f"✅ **Broadcast Complete!**\n\n"
         f"📊 **Results:**\n"
-        f"✅ Successfully Sent: {success_count}\n"
-        f"❌ Failed: {failure_count}\n"
-        f"🚫 Blocked Bot: {blocked_count}\n"
-        f"📈 Success Rate: {(success_count/len(USERS)*100 if len(USERS) > 0 else 0):.1f}%"
+        f"✅ Successfully Sent: {results['success']}\n"
+        f"❌ Failed: {results['failure']}\n"
+        f"🚫 Blocked Bot: {results['blocked']}\n"
+        f"📈 Success Rate: {(results['success']/results['total']*100 if results['total'] > 0 else 0):.1f}%\n"
+        f"{reporter.rate_line(final=True)}"
     )
     
-    await status_msg.edit_text(final_message)
+    await reporter.aclose(final_message)
 
 async def add_credits_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """किसी यूजर को क्रेडिट्स जोड़ें (Admin Only)"""
@@ -795,17 +1733,13 @@ async def add_credits_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("❌ Credits 0 से ज्यादा होने चाहिए।")
         return
     
-    if target_user_id not in USER_CREDITS:
-        USER_CREDITS[target_user_id] = 0
-    
-    USER_CREDITS[target_user_id] += credits_to_add
-    save_data()
+    new_total = await shard_call(context.bot, shard_for_user(target_user_id), "add_credits", target_user_id, credits_to_add)
     
     await update.message.reply_text(
         f"✅ **Credits Added Successfully!**\n\n"
         f"👤 **User ID:** `{target_user_id}`\n"
         f"➕ **Added:** {credits_to_add} credits\n"
-        f"💰 **New Total:** {USER_CREDITS[target_user_id]} credits",
+        f"💰 **New Total:** {new_total} credits",
         parse_mode=ParseMode.MARKDOWN
     )
     
@@ -814,7 +1748,7 @@ async def add_credits_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             chat_id=target_user_id,
             text=f"🎉 **Bonus Credits!**\n\n"
                 f"आपको **{credits_to_add} bonus credits** मिले हैं!\n"
-                f"💰 **Total Credits:** {USER_CREDITS[target_user_id]}",
+                f"💰 **Total Credits:** {new_total}",
             parse_mode=ParseMode.MARKDOWN
         )
     except:
@@ -843,8 +1777,7 @@ async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     
     reason = " ".join(context.args[1:]) if len(context.args) > 1 else "No reason provided"
     
-    BANNED_USERS.add(target_user_id)
-    save_banned_users()
+    await shard_call(context.bot, shard_for_user(target_user_id), "ban", target_user_id, reason)
     
     await update.message.reply_text(
         f"🚫 **User Banned**\n\n"
@@ -881,9 +1814,7 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         await update.message.reply_text("❌ Invalid User ID.")
         return
     
-    if target_user_id in BANNED_USERS:
-        BANNED_USERS.remove(target_user_id)
-        save_banned_users()
+    if await shard_call(context.bot, shard_for_user(target_user_id), "unban", target_user_id):
         await update.message.reply_text(f"✅ User `{target_user_id}` को unban कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
         
         try:
@@ -897,20 +1828,1004 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     else:
         await update.message.reply_text(f"❌ User `{target_user_id}` banned नहीं है।", parse_mode=ParseMode.MARKDOWN)
 
-# --- Button Handler (Updated for buy_unlimited_access) ---
+# --- Admin User Profile ---
 
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Inline बटन हैंडलर"""
-    query = update.callback_query
-    await query.answer()
+# callback_data: ua|<action>|<user_id>  ->  (बटन का टेक्स्ट, shard op, op के बाकी args)
+USER_ACTIONS = {
+    "c5": ("➕ 5 Credits", "add_credits", (5,)),
+    "c20": ("➕ 20 Credits", "add_credits", (20,)),
+    "u7": ("👑 7 दिन", "grant_unlimited", ("7d",)),
+    "uf": ("👑 Forever", "grant_unlimited", ("forever",)),
+    "ur": ("❌ Unlimited हटाएं", "revoke_unlimited", ()),
+    "ban": ("🚫 Ban", "ban", ("No reason provided",)),
+    "unban": ("✅ Unban", "unban", ()),
+}
+
+async def track_activity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """हर update पर यूजर की आखिरी गतिविधि दर्ज करें (बाकी हैंडलर्स से पहले, group -1)"""
+    if update.effective_user:
+        touch_user(update.effective_user.id)
+
+def describe_user(bot, user_id: int):
+    """एक यूजर का पूरा रिकॉर्ड, हर हिस्सा O(1) lookup (यूजर के shard पर चलता है); अनजान यूजर पर None"""
+    profile = USER_PROFILES.get(user_id)
+    if user_id not in USERS and profile is None:
+        return None
+    profile = profile or UserProfile()
+    return {
+        "user_id": user_id,
+        "credits": USER_CREDITS.get(user_id),  # None = अभी क्रेडिट्स की एंट्री नहीं बनी
+        "unlimited_text": get_unlimited_expiry_text(user_id),
+        "banned": user_id in banned_users(),
+        "banned_at": ban_times().get(user_id),
+        "ban_reason": ban_reasons().get(user_id),
+        "referrer": profile.referrer,
+        "referrals": profile.referrals,
+        "joined": profile.joined,
+        "last_seen": profile.last_seen,
+    }
+
+def _format_timestamp(timestamp) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%d-%m-%Y %H:%M') if timestamp else "अज्ञात"
+
+def render_user_profile(info: dict, note: str = ""):
+    """/user का मैसेज और एक्शन बटन"""
+    uid = info["user_id"]
+    ban_text = f"हाँ ({_format_timestamp(info['banned_at'])})" if info["banned"] else "नहीं"
+    if info["banned"] and info["ban_reason"]:
+        ban_text += f"\n📝 **Reason:** {escape_markdown(info['ban_reason'])}"
+    referrer_text = f"`{info['referrer']}`" if info["referrer"] else "—"
+    credits_text = info["credits"] if info["credits"] is not None else "कोई रिकॉर्ड नहीं"
     
-    user_id = query.from_user.id
-    save_user(user_id)
-    bot_username = context.bot.username
+    text = (
+        f"👤 **User Profile:** `{uid}`\n"
+        "━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"💰 **Credits:** {credits_text}\n"
+        f"👑 **Unlimited:** {info['unlimited_text'] or 'नहीं'}\n"
+        f"🚫 **Banned:** {ban_text}\n"
+        f"🔗 **Referred By:** {referrer_text}\n"
+        f"👥 **Referrals:** {info['referrals']}\n"
+        f"📅 **Joined:** {_format_timestamp(info['joined'])}\n"
+        f"🕒 **Last Active:** {_format_timestamp(info['last_seen'])}"
+    )
+    if note:
+        text += f"\n\n{note}"
     
-    # चैनल मेंबरशिप चेक
-    if query.data == 'check_membership':
-        is_member = await check_channel_membership(user_id, context)
+    def button(action: str) -> InlineKeyboardButton:
+        return InlineKeyboardButton(USER_ACTIONS[action][0], callback_data=f"ua|{action}|{uid}")
+    
+    keyboard = [
+        [button("c5"), button("c20")],
+        [button("u7"), button("uf")] + ([button("ur")] if info["unlimited_text"] else []),
+        [button("unban") if info["banned"] else button("ban")],
+        [InlineKeyboardButton("🔄 Refresh", callback_data=f"ua|r|{uid}")],
+    ]
+    return text, InlineKeyboardMarkup(keyboard)
+
+def shard_error_note(e: Exception) -> str:
+    """shard_call की गड़बड़ी (timeout / remote op की गलती) एडमिन के लिए एक लाइन में"""
+    if isinstance(e, asyncio.TimeoutError):
+        return "❌ एक shard ने समय पर जवाब नहीं दिया, दोबारा कोशिश करें।"
+    return f"❌ एक्शन फेल हुआ: {escape_markdown(str(e))}"
+
+async def run_user_action(bot, action: str, target_user_id: int) -> str:
+    """प्रोफाइल बटन का एक्शन यूजर के shard पर चलाएं, यूजर को बताएं और एडमिन के लिए नोट लौटाएं"""
+    label, op, args = USER_ACTIONS[action]
+    notice = None
+    if op == "grant_unlimited":
+        expiry, duration_text = ("forever", "हमेशा के लिए ♾️") if args[0] == "forever" else parse_duration(args[0])
+        args = (expiry,)
+    
+    try:
+        result = await shard_call(bot, shard_for_user(target_user_id), op, target_user_id, *args)
+    except (asyncio.TimeoutError, RuntimeError) as e:
+        logger.error(f"❌ Profile action {action} for {target_user_id} failed: {e!r}")
+        return shard_error_note(e)
+    
+    if op == "add_credits":
+        note = f"✅ {args[0]} credits जोड़े गए (Total: {result})"
+        notice = (f"🎉 **Bonus Credits!**\n\n"
+                  f"आपको **{args[0]} bonus credits** मिले हैं!\n"
+                  f"💰 **Total Credits:** {result}")
+    elif op == "grant_unlimited":
+        note = f"✅ Unlimited दिया गया ({duration_text})"
+        notice = (f"🎉 **बधाई हो!** 👑\n\n"
+                  f"आपको **Unlimited Search Access** मिल गया है!\n"
+                  f"⏰ **अवधि:** {duration_text}\n\n"
+                  f"अब आप बिना किसी लिमिट के सर्च कर सकते हैं! 🚀")
+    elif op == "revoke_unlimited":
+        if result is None:
+            return "❌ इस यूजर के पास unlimited access नहीं है।"
+        note = "✅ Unlimited access हटा दिया गया"
+        notice = ("⚠️ आपका **Unlimited Access** समाप्त हो गया है।\n\n"
+                  f"अब आप normal credits ({result} क्रेडिट्स) के साथ बॉट का उपयोग कर सकते हैं।")
+    elif op == "ban":
+        note = "🚫 यूजर बैन कर दिया गया"
+        notice = (f"🚫 **You have been banned from using this bot.**\n\n"
+                  f"**Reason:** {args[0]}\n\n"
+                  "Contact support for more information.")
+    else:
+        if not result:
+            return "❌ यह यूजर banned नहीं है।"
+        note = "✅ यूजर unban कर दिया गया"
+        notice = ("✅ **Good news!** आपको unban कर दिया गया है।\n\n"
+                  "अब आप बॉट का दोबारा उपयोग कर सकते हैं।")
+    
+    try:
+        await bot.send_message(chat_id=target_user_id, text=notice,
+                               parse_mode=ParseMode.MARKDOWN if op != "ban" else None)
+    except Exception as e:
+        logger.info(f"Profile action {action} notification to {target_user_id} failed: {e}")
+    return note
+
+async def user_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """एक यूजर की पूरी जानकारी और एक्शन बटन (Admin Only)"""
+    user_id = update.effective_user.id
+    
+    if user_id != ADMIN_ID:
+        await update.message.reply_text("⚠️ **अस्वीकृत!** यह कमांड केवल एडमिन के लिए है।")
+        return
+    
+    if not context.args:
+        await update.message.reply_text("📝 **Usage:** `/user <user_id>`", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    try:
+        target_user_id = int(context.args[0])
+    except ValueError:
+        await update.message.reply_text("❌ Invalid User ID.")
+        return
+    
+    try:
+        info = await shard_call(context.bot, shard_for_user(target_user_id), "describe_user", target_user_id)
+    except (asyncio.TimeoutError, RuntimeError) as e:
+        logger.error(f"❌ /user {target_user_id} failed: {e!r}")
+        await update.message.reply_text(shard_error_note(e), parse_mode=ParseMode.MARKDOWN)
+        return
+    if info is None:
+        await update.message.reply_text(f"❌ User `{target_user_id}` नहीं मिला।", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    text, reply_markup = render_user_profile(info)
+    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+
+# --- Bulk Admin Operations ---
+
+BULK_USAGE = (
+    "📦 **Bulk Admin Operations**\n\n"
+    "एक `.txt` / `.csv` फाइल भेजें और caption में लिखें:\n"
+    "• `/bulk credits` ➜ हर लाइन: `user_id,credits`\n"
+    "• `/bulk unlimited` ➜ हर लाइन: `user_id[,7d]` (खाली = forever)\n"
+    "• `/bulk ban` ➜ हर लाइन: `user_id[,reason]`\n"
+    "• `/bulk unban` ➜ हर लाइन: `user_id`\n\n"
+    "यूजर्स को नोटिफिकेशन नहीं भेजने हों तो caption के आखिर में `silent` जोड़ें।"
+)
+
+def iter_bulk_rows(data: bytes):
+    """फाइल की हर लाइन को (line_no, fields) के रूप में एक-एक करके दें"""
+    with io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "," in line or ";" in line:
+                fields = [field.strip() for field in line.replace(";", ",").split(",", 1)]
+            else:
+                fields = line.split(None, 1)
+            yield line_no, fields
+
+def parse_bulk_file(action: str, data: bytes):
+    """फाइल को validate करें; {user_id: value} और errors लौटाएं (कुछ भी लागू नहीं होता)"""
+    ops = {}
+    errors = []
+    for line_no, fields in iter_bulk_rows(data):
+        try:
+            target_user_id = int(fields[0])
+        except ValueError:
+            target_user_id = 0
+        if not 0 < target_user_id < 2 ** 52:
+            errors.append((line_no, "Invalid user id"))
+            continue
+        value = fields[1] if len(fields) > 1 else ""
+        
+        if action == "credits":
+            try:
+                credits = int(value)
+            except ValueError:
+                errors.append((line_no, "Credits missing or not a number"))
+                continue
+            if not 0 < credits < 2 ** 31:
+                errors.append((line_no, "Credits must be > 0"))
+                continue
+            # एक ही यूजर कई बार हो तो क्रेडिट्स जुड़ते हैं
+            ops[target_user_id] = ops.get(target_user_id, 0) + credits
+        elif action == "unlimited":
+            if not value or value.lower() == "forever":
+                ops[target_user_id] = ("forever", "हमेशा के लिए ♾️")
+                continue
+            try:
+                parsed = parse_duration(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                errors.append((line_no, "Invalid duration (use 12h, 7d, 1m)"))
+                continue
+            ops[target_user_id] = parsed
+        elif action == "ban":
+            ops[target_user_id] = value or "No reason provided"
+        else:
+            ops[target_user_id] = None
+    return ops, errors
+
+def apply_bulk_ops(action: str, ops: dict) -> list:
+    """सभी बदलाव एक transaction में लागू करें: गड़बड़ी हो तो सब वापस, सफल हो तो एक ही save"""
+    previous = {
+        uid: (USER_CREDITS.get(uid), UNLIMITED_USERS.get(uid), uid in banned_users(), ban_times().get(uid),
+              ban_reasons().get(uid))
+        for uid in ops
+    }
+    changed = []
+    try:
+        for uid, value in ops.items():
+            if action == "credits":
+                set_credits(uid, USER_CREDITS.get(uid, 0) + value)
+            elif action == "unlimited":
+                grant_unlimited(uid, value[0])
+            elif action == "ban":
+                ban_user(uid, reason=value)
+            elif not unban_user(uid):
+                continue
+            changed.append(uid)
+        # हर action सिर्फ एक फाइल बदलता है, इसलिए flush भी एक ही; डिस्क पर न पहुंचे तो भी सब वापस
+        if action in ("ban", "unban"):
+            save_banned_users(raise_errors=True)
+        else:
+            save_data(raise_errors=True)
+    except Exception:
+        # सिर्फ वही वापस लिखें जो बदला है, पहले जैसा ही (बिना समय वाला बैन बिना समय के)
+        for uid, (credits, expiry, banned, banned_at, ban_reason) in previous.items():
+            if USER_CREDITS.get(uid) != credits:
+                if credits is None:
+                    clear_credits(uid)
+                else:
+                    set_credits(uid, credits)
+            if UNLIMITED_USERS.get(uid) != expiry:
+                if expiry is None:
+                    revoke_unlimited(uid)
+                else:
+                    grant_unlimited(uid, expiry)
+            if (uid in banned_users(), ban_times().get(uid), ban_reasons().get(uid)) != (banned, banned_at, ban_reason):
+                unban_user(uid)
+                if banned:
+                    ban_user(uid, 0 if banned_at is None else banned_at, ban_reason)
+                    if banned_at is None:
+                        del ban_times()[uid]  # index key 0 ही रहती है (_ban_key का default)
+        raise
+    return changed
+
+def _bulk_notification_text(action: str, uid: int, value) -> str:
+    if action == "credits":
+        return (f"🎉 **Bonus Credits!**\n\n"
+                f"आपको **{value} bonus credits** मिले हैं!\n"
+                f"💰 **Total Credits:** {USER_CREDITS.get(uid, 0)}")
+    if action == "unlimited":
+        return (f"🎉 **बधाई हो!** 👑\n\n"
+                f"आपको **Unlimited Search Access** मिल गया है!\n"
+                f"⏰ **अवधि:** {value[1]}\n\n"
+                f"अब आप बिना किसी लिमिट के सर्च कर सकते हैं! 🚀")
+    if action == "ban":
+        return (f"🚫 **You have been banned from using this bot.**\n\n"
+                f"**Reason:** {value}\n\n"
+                "Contact support for more information.")
+    return ("✅ **Good news!** आपको unban कर दिया गया है।\n\n"
+            "अब आप बॉट का दोबारा उपयोग कर सकते हैं।")
+
+async def send_bulk_notifications(bot, action: str, ops: dict) -> None:
+    """नोटिफिकेशन तय rate पर भेजें ताकि flood limit न लगे; प्रगति एडमिन के status मैसेज में"""
+    interval = 1 / BULK_NOTIFY_RATE if BULK_NOTIFY_RATE > 0 else 0
+    sent = failed = 0
+    reporter = None
+    if ADMIN_ID and ops:
+        title = f"📨 Bulk {action} notifications" + (f" (shard {SHARD_ID})" if SHARD_COUNT > 1 else "")
+        try:
+            status_msg = await bot.send_message(chat_id=ADMIN_ID, text=f"{title}\n\n📊 Progress: 0/{len(ops):,}")
+            reporter = ProgressReporter(title, len(ops), message_progress_sink(status_msg),
+                                        labels={"sent": "✅ Sent", "failed": "❌ Failed"}, unit="msg")
+        except TelegramError as e:
+            logger.warning(f"Could not send bulk progress message to admin: {e}")
+    for uid, value in ops.items():
+        try:
+            await bot.send_message(
+                chat_id=uid,
+                text=_bulk_notification_text(action, uid, value),
+                parse_mode=ParseMode.MARKDOWN if action != "ban" else None
+            )
+            sent += 1
+        except Exception as e:
+            failed += 1
+            logger.info(f"Bulk {action} notification to {uid} failed: {e}", extra={"category": "bulk_notify_failure"})
+        if reporter:
+            reporter.update(sent + failed, sent=sent, failed=failed)
+        if interval:
+            await asyncio.sleep(interval)
+    if reporter:
+        await reporter.aclose()
+    logger.info(f"✅ Bulk {action} notifications done: {sent} sent, {failed} failed")
+
+def _apply_bulk_part(bot, action: str, ops: dict, notify: bool) -> list:
+    """एक shard का हिस्सा लागू करें; नोटिफिकेशन भी वहीं से जाते हैं जहाँ यूजर का डेटा है"""
+    changed = apply_bulk_ops(action, ops)
+    if notify:
+        start_background_task(send_bulk_notifications(bot, action, {uid: ops[uid] for uid in changed}))
+    return changed
+
+async def run_bulk_ops(bot, action: str, ops: dict, notify: bool) -> tuple:
+    """ops को यूजर्स के shards में बाँटकर लागू करें (हर shard अपना transaction)
+
+    एक shard फेल हो तो बाकी shards के बदलाव बने रहते हैं, इसलिए नतीजा shard-वार:
+    (बदले गए यूजर्स, {फेल shard: (उसके यूजर्स की गिनती, error)})
+    """
+    parts = {}
+    for uid, value in ops.items():
+        parts.setdefault(shard_for_user(uid), {})[uid] = value
+    results = await asyncio.gather(*(
+        shard_call(bot, shard, "bulk", action, part, notify) for shard, part in parts.items()
+    ), return_exceptions=True)
+    changed, failed = [], {}
+    for (shard, part), result in zip(parts.items(), results):
+        if isinstance(result, Exception):
+            failed[shard] = (len(part), result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            changed.extend(result)
+    return changed, failed
+
+def _bulk_failure_line(shard: int, users: int, error: Exception) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        # जवाब नहीं आया: shard ने शायद बाद में लागू कर दिया हो
+        return f"• Shard {shard}: {users} users — जवाब नहीं मिला, स्थिति अज्ञात (/user से जांचें)"
+    return f"• Shard {shard}: {users} users — rolled back ({escape_markdown(str(error))})"
+
+async def bulk_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """फाइल से कई यूजर्स पर एक साथ credits / unlimited / ban / unban (Admin Only)"""
+    user_id = update.effective_user.id
+    
+    if user_id != ADMIN_ID:
+        await update.message.reply_text("⚠️ **अस्वीकृत!** यह कमांड केवल एडमिन के लिए है।")
+        return
+    
+    document = update.message.document
+    words = (update.message.caption or update.message.text or "").split()[1:]
+    action = words[0].lower() if words else ""
+    silent = "silent" in (w.lower() for w in words[1:])
+    
+    if not document or action not in ("credits", "unlimited", "ban", "unban"):
+        await update.message.reply_text(BULK_USAGE, parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if document.file_size and document.file_size > BULK_MAX_BYTES:
+        await update.message.reply_text(f"❌ File too large. Max {BULK_MAX_BYTES // 1024} KB.")
+        return
+    
+    started = time.perf_counter()
+    tg_file = await document.get_file()
+    data = bytes(await tg_file.download_as_bytearray())
+    
+    ops, errors = parse_bulk_file(action, data)
+    if not ops:
+        await update.message.reply_text("❌ File में कोई valid लाइन नहीं मिली।\n\n" + BULK_USAGE, parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    changed, failed = await run_bulk_ops(context.bot, action, ops, notify=not silent)
+    for shard, (users, error) in failed.items():
+        logger.error(f"❌ Bulk {action} on shard {shard} failed ({users} users): {error!r}")
+    timed_out = any(isinstance(error, asyncio.TimeoutError) for _, error in failed.values())
+    if len(failed) == len({shard_for_user(uid) for uid in ops}) and not timed_out:
+        error = next(iter(failed.values()))[1]
+        await update.message.reply_text(f"❌ Bulk {action} failed, कोई बदलाव लागू नहीं हुआ।\n\nError: {error}")
+        return
+    
+    error_lines = "\n".join(f"• Line {line_no}: {message}" for line_no, message in errors[:10])
+    if len(errors) > 10:
+        error_lines += f"\n... and {len(errors) - 10} more"
+    
+    notify_text = "Off (silent)" if silent else f"{len(changed)} queued @ {BULK_NOTIFY_RATE:g}/s"
+    # कुछ shards फेल हुए तो बाकी के बदलाव बने रहे; एडमिन को shard-वार बताएं
+    failed_lines = "\n".join(_bulk_failure_line(shard, users, error) for shard, (users, error) in failed.items())
+    await update.message.reply_text(
+        (f"⚠️ **Bulk {action} partially applied!**\n\n" if failed else f"✅ **Bulk {action} complete!**\n\n") +
+        f"👥 **Users in file:** {len(ops)}\n"
+        f"✏️ **Changed:** {len(changed)}\n"
+        f"⚠️ **Invalid lines:** {len(errors)}\n"
+        f"📨 **Notifications:** {notify_text}\n"
+        f"⏱ **Time:** {time.perf_counter() - started:.2f}s"
+        + (f"\n\n**Failed shards:**\n{failed_lines}" if failed else "")
+        + (f"\n\n**Errors:**\n{error_lines}" if errors else ""),
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+# --- Bot API HTTP Metrics ---
+
+API_METRICS = {}  # {(pool, method): {...}}
+
+def _api_metric(pool: str, method: str) -> dict:
+    """किसी pool / API मेथड का मेट्रिक्स रिकॉर्ड (न हो तो बनाएं)"""
+    key = (pool, method)
+    if key not in API_METRICS:
+        API_METRICS[key] = {
+            "calls": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0,
+            "pool_waits": 0, "pool_wait_total": 0.0, "pool_wait_max": 0.0,
+            "latency_total": 0.0, "latency_max": 0.0,
+        }
+    return API_METRICS[key]
+
+_TLS_CONTEXT = None  # सभी HTTP pools का साझा ssl.SSLContext
+
+class MeteredHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest जिसमें keep-alive सेटिंग है और हर API मेथड का pool wait / in-flight नापा जाता है
+
+    httpx client पूरी तरह यहीं सिर्फ़ httpx के public arguments से बनता है; PTB से बस _build_client hook लेते हैं
+    (PTB 21.0.1 में httpx_kwargs नहीं है)। transport टेस्ट में httpx.MockTransport के लिए।
+    """
+
+    __slots__ = ("_pool_name", "_pool_size", "_keepalive_expiry", "_timeout", "_transport")
+
+    def __init__(self, pool_name: str, connection_pool_size: int, keepalive_expiry: float, *,
+                 read_timeout: float, write_timeout: float, connect_timeout: float, pool_timeout: float,
+                 transport: httpx.AsyncBaseTransport = None):
+        self._pool_name = pool_name
+        self._pool_size = connection_pool_size
+        self._keepalive_expiry = keepalive_expiry
+        self._timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout)
+        self._transport = transport
+        super().__init__(
+            connection_pool_size=connection_pool_size,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            connect_timeout=connect_timeout,
+            pool_timeout=pool_timeout,
+        )
+
+    def _build_client(self) -> httpx.AsyncClient:
+        # TLS context सब pools में साझा (हर नया context ~60ms)
+        global _TLS_CONTEXT
+        if _TLS_CONTEXT is None:
+            _TLS_CONTEXT = httpx.create_ssl_context()
+        return httpx.AsyncClient(
+            timeout=self._timeout,
+            limits=httpx.Limits(
+                max_connections=self._pool_size,
+                max_keepalive_connections=self._pool_size,
+                keepalive_expiry=self._keepalive_expiry,
+            ),
+            verify=_TLS_CONTEXT,
+            transport=self._transport,
+            event_hooks={"request": [self._attach_pool_trace]},
+        )
+
+    async def _attach_pool_trace(self, request: httpx.Request) -> None:
+        """httpcore trace से पता करें कि कनेक्शन मिलने में कितना समय लगा"""
+        stats = _api_metric(self._pool_name, request.url.path.rsplit("/", 1)[-1])
+        queued_at = time.perf_counter()
+        recorded = False
+        
+        async def trace(event_name: str, info: dict) -> None:
+            nonlocal recorded
+            # पहला connection.* (नया कनेक्शन) या send_request_headers (reuse) इवेंट = pool से कनेक्शन मिल गया
+            if recorded or not (event_name.startswith("connection.") or event_name.endswith("send_request_headers.started")):
+                return
+            recorded = True
+            waited = time.perf_counter() - queued_at
+            stats["pool_waits"] += 1
+            stats["pool_wait_total"] += waited
+            stats["pool_wait_max"] = max(stats["pool_wait_max"], waited)
+        
+        request.extensions["trace"] = trace
+
+    async def do_request(self, url: str, method: str, request_data=None, **timeouts):
+        stats = _api_metric(self._pool_name, url.rsplit("/", 1)[-1])
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        started = time.perf_counter()
+        try:
+            return await super().do_request(url, method, request_data, **timeouts)
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stats["in_flight"] -= 1
+            stats["calls"] += 1
+            stats["latency_total"] += elapsed
+            stats["latency_max"] = max(stats["latency_max"], elapsed)
+
+def build_api_requests() -> tuple:
+    """API कॉल्स और getUpdates के लिए अलग HTTP pools बनाएं"""
+    api_request = MeteredHTTPXRequest(
+        "api", API_POOL_SIZE, API_KEEPALIVE_EXPIRY,
+        pool_timeout=API_POOL_TIMEOUT,
+        connect_timeout=API_CONNECT_TIMEOUT,
+        read_timeout=API_READ_TIMEOUT,
+        write_timeout=API_WRITE_TIMEOUT,
+    )
+    updates_request = MeteredHTTPXRequest(
+        "updates", UPDATES_POOL_SIZE, UPDATES_KEEPALIVE_EXPIRY,
+        pool_timeout=UPDATES_POOL_TIMEOUT,
+        connect_timeout=API_CONNECT_TIMEOUT,
+        read_timeout=UPDATES_READ_TIMEOUT,
+        write_timeout=API_WRITE_TIMEOUT,
+    )
+    return api_request, updates_request
+
+def api_metrics_part(bot=None, reset: bool = False) -> dict:
+    """इस process (shard) के API मेट्रिक्स; reset=True हो तो पहले साफ करें (in_flight छोड़कर)"""
+    if reset:
+        for stats in API_METRICS.values():
+            for key in stats:
+                if key != "in_flight":
+                    stats[key] = type(stats[key])()
+    return API_METRICS
+
+def merge_api_metrics(parts: list) -> dict:
+    """workers के मेट्रिक्स मिलाएं: गिनती और कुल समय जुड़ते हैं, max वाले fields में सबसे बड़ा"""
+    merged = {}
+    for part in parts:
+        for key, stats in part.items():
+            into = merged.setdefault(key, dict.fromkeys(stats, 0))
+            for field, value in stats.items():
+                into[field] = max(into[field], value) if "max" in field else into[field] + value
+    return merged
+
+async def apistats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """हर API मेथड के लिए pool wait, in-flight और latency (Admin Only); sharded मोड में सभी workers का जोड़"""
+    user_id = update.effective_user.id
+    
+    if user_id != ADMIN_ID:
+        await update.message.reply_text("⚠️ **अस्वीकृत!** यह कमांड केवल एडमिन के लिए है।")
+        return
+    
+    reset = bool(context.args) and context.args[0].lower() == "reset"
+    try:
+        metrics = merge_api_metrics(await call_all_shards(context.bot, "api_metrics", reset))
+    except (asyncio.TimeoutError, RuntimeError) as e:
+        logger.error(f"❌ API metrics failed: {e!r}")
+        await update.message.reply_text(shard_error_note(e), parse_mode=ParseMode.MARKDOWN)
+        return
+    if reset:
+        await update.message.reply_text("✅ API metrics reset.")
+        return
+    
+    lines = [f"{'pool/method':<26}{'calls':>7}{'err':>5}{'now':>5}{'max':>5}{'wait ms':>9}{'wmax':>7}{'lat ms':>8}"]
+    for (pool, method), stats in sorted(metrics.items(), key=lambda x: x[1]["calls"], reverse=True)[:20]:
+        calls = stats["calls"] or 1
+        avg_wait = stats["pool_wait_total"] / (stats["pool_waits"] or 1) * 1000
+        lines.append(
+            f"{(pool + '/' + method)[:25]:<26}{stats['calls']:>7}{stats['errors']:>5}"
+            f"{stats['in_flight']:>5}{stats['max_in_flight']:>5}{avg_wait:>9.1f}"
+            f"{stats['pool_wait_max'] * 1000:>7.0f}{stats['latency_total'] / calls * 1000:>8.1f}"
+        )
+    
+    workers_line = f"🧩 **Workers:** {SHARD_COUNT} (हर worker के अपने pools, आंकड़े जोड़कर)\n" if SHARD_COUNT > 1 else ""
+    apistats_message = (
+        "🌐 **Bot API HTTP Stats**\n"
+        "━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"{workers_line}"
+        f"🔌 **API pool:** {API_POOL_SIZE} conns, pool timeout {API_POOL_TIMEOUT}s, keep-alive {API_KEEPALIVE_EXPIRY}s\n"
+        f"📥 **Updates pool:** {UPDATES_POOL_SIZE} conns, read timeout {UPDATES_READ_TIMEOUT}s\n\n"
+        "```\n" + "\n".join(lines) + "\n```\n"
+        "`now`/`max` = in-flight, `wait` = pool wait (avg / max)\n"
+        "💡 `/apistats reset`"
+    )
+    
+    await update.message.reply_text(apistats_message, parse_mode=ParseMode.MARKDOWN)
+
+# --- Memory Introspection ---
+
+_BACKGROUND_TASKS = set()
+_MEMORY_BASELINE = None  # {"snapshot": tracemalloc.Snapshot | None, "rss": int, "sizes": {...}, "time": str}
+_LAST_MEMORY_ALERT = 0.0
+
+def start_background_task(coro) -> asyncio.Task:
+    """बैकग्राउंड task शुरू करें और उसका reference रखें ताकि वह GC न हो जाए"""
+    task = asyncio.get_running_loop().create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+async def deep_sizeof(obj) -> int:
+    """किसी ऑब्जेक्ट (और उसके अंदर के dict/list/set/tuple) का कुल साइज़ बाइट्स में; बीच-बीच में updates चलने दें"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    steps = 0
+    while stack:
+        steps += 1
+        if steps % COMPACT_CHUNK_SIZE == 0:
+            await asyncio.sleep(0)
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+def get_rss_bytes() -> int:
+    """प्रोसेस का मौजूदा RSS (Linux पर /proc से, वरना peak RSS)"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def format_bytes(size: float) -> str:
+    """बाइट्स को पढ़ने लायक यूनिट में बदलें"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+async def get_structure_sizes() -> dict:
+    """हर ग्लोबल स्टोरेज का deep size"""
+    structures = {
+        "USER_CREDITS": USER_CREDITS,
+        "USERS": USERS,
+        "REFERRED_TRACKER": referral_tracker(),
+        "UNLIMITED_USERS": UNLIMITED_USERS,
+        "BANNED_USERS": banned_users(),
+        "USER_SEARCH_HISTORY": search_history(),
+        "DAILY_STATS": DAILY_STATS,
+        "BANNED_AT": ban_times(),
+        "BAN_REASONS": ban_reasons(),
+        "USER_PROFILES": USER_PROFILES,
+    }
+    sizes = {name: await deep_sizeof(value) for name, value in structures.items()}
+    sizes["SORTED_INDEXES"] = sum(
+        sys.getsizeof(index._keys) + sys.getsizeof(index._ids) for index in (UNLIMITED_INDEX, BANNED_INDEX, CREDITS_INDEX)
+    )
+    return sizes
+
+def trim_search_history(limit: int, uids=None) -> int:
+    """खाली हिस्ट्री हटाएं; limit > 0 हो तो बाकी को आखिरी `limit` सर्च तक छोटा करें (uids: सिर्फ इन यूजर्स की)"""
+    trimmed = 0
+    history_by_user = search_history()
+    for uid in list(history_by_user) if uids is None else uids:
+        history = history_by_user.get(uid)
+        if history is None:
+            continue
+        if not history:
+            del history_by_user[uid]
+            trimmed += 1
+        elif limit > 0 and len(history) > limit:
+            history_by_user[uid] = history[-limit:]
+            trimmed += 1
+    return trimmed
+
+async def compact_state(history_limit: int = 0, progress: ProgressReporter = None) -> dict:
+    """मेमोरी बचाने के लिए expired अनलिमिटेड एंट्रीज़ और खाली हिस्ट्री हटाएं
+
+    history_limit > 0 हो तभी सर्च हिस्ट्री आखिरी इतनी सर्च तक काटी जाती है। काम टुकड़ों में होता है
+    ताकि 1M यूजर्स पर भी बीच में updates चलते रहें।
+    """
+    now = datetime.now().timestamp()
+    expired = [uid for uid, expiry in UNLIMITED_USERS.items() if isinstance(expiry, (int, float)) and expiry <= now]
+    for uid in expired:
+        revoke_unlimited(uid)
+    
+    uids = list(search_history())
+    trimmed = 0
+    for start in range(0, len(uids), COMPACT_CHUNK_SIZE):
+        trimmed += trim_search_history(history_limit, uids[start:start + COMPACT_CHUNK_SIZE])
+        if progress:
+            progress.update(min(start + COMPACT_CHUNK_SIZE, len(uids)), trimmed=trimmed)
+        await asyncio.sleep(0)
+    if expired or trimmed:
+        journal("compact", history_limit)
+        save_data()
+    collected = gc.collect()
+    return {"expired_unlimited": len(expired), "histories_trimmed": trimmed, "gc_collected": collected}
+
+async def memory_watchdog(application: Application) -> None:
+    """RSS को soft limit से ऊपर जाने पर compaction चलाएं और एडमिन को अलर्ट करें"""
+    global _LAST_MEMORY_ALERT
+    limit = MEMORY_SOFT_LIMIT_MB * 1024 * 1024
+    interval = MEMORY_CHECK_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        rss_before = get_rss_bytes()
+        if rss_before < limit:
+            interval = MEMORY_CHECK_INTERVAL
+            continue
+        
+        result = await compact_state(COMPACT_HISTORY_LIMIT)
+        rss_after = get_rss_bytes()
+        # कुछ नहीं हटा तो अगली बार भी नहीं हटेगा; हर मिनट वही पूरा pass न चलाएं
+        if result["expired_unlimited"] or result["histories_trimmed"]:
+            interval = MEMORY_CHECK_INTERVAL
+        else:
+            interval = min(interval * 2, MEMORY_CHECK_MAX_INTERVAL)
+        logger.warning(
+            f"⚠️ Memory soft limit crossed: {format_bytes(rss_before)} -> {format_bytes(rss_after)} "
+            f"after compaction {result}, next check in {interval}s"
+        )
+        
+        if not ADMIN_ID or time.time() - _LAST_MEMORY_ALERT < MEMORY_ALERT_COOLDOWN:
+            continue
+        _LAST_MEMORY_ALERT = time.time()
+        try:
+            await application.bot.send_message(
+                chat_id=ADMIN_ID,
+                text=f"⚠️ **Memory Soft Limit Crossed!**\n\n"
+                    f"📈 **RSS:** {format_bytes(rss_before)} (limit {MEMORY_SOFT_LIMIT_MB} MB)\n"
+                    f"🧹 **After Compaction:** {format_bytes(rss_after)}\n"
+                    f"⏳ Expired unlimited removed: {result['expired_unlimited']}\n"
+                    f"📜 Histories trimmed: {result['histories_trimmed']}\n\n"
+                    "Details के लिए `/memstats` चलाएं।",
+                parse_mode=ParseMode.MARKDOWN
+            )
+        except Exception as e:
+            logger.warning(f"Could not send memory alert to admin: {e}")
+
+async def memory_report(bot=None) -> dict:
+    """इस process (shard) का RSS और structure sizes, baseline के साथ (bus पर भेजने लायक)"""
+    baseline = _MEMORY_BASELINE
+    return {
+        "rss": get_rss_bytes(),
+        "sizes": await get_structure_sizes(),
+        "baseline": {key: baseline[key] for key in ("rss", "sizes", "time")} if baseline else None,
+    }
+
+async def take_memory_baseline(bot=None) -> int:
+    """tracemalloc चालू करके मौजूदा RSS / sizes को baseline बनाएं; RSS लौटाएं"""
+    global _MEMORY_BASELINE
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(TRACEMALLOC_FRAMES, 1))
+    _MEMORY_BASELINE = {
+        "snapshot": tracemalloc.take_snapshot(),
+        "rss": get_rss_bytes(),
+        "sizes": await get_structure_sizes(),
+        "time": datetime.now().strftime('%d-%m-%Y %H:%M'),
+    }
+    return _MEMORY_BASELINE["rss"]
+
+async def compact_shard(bot=None, history_limit: int = 0, progress: ProgressReporter = None) -> dict:
+    """इस shard का compaction, पहले और बाद के RSS के साथ"""
+    rss_before = get_rss_bytes()
+    result = await compact_state(history_limit, progress)
+    return dict(result, rss_before=rss_before, rss_after=get_rss_bytes())
+
+def _merge_memory_reports(parts: list) -> dict:
+    """shards की रिपोर्ट्स का जोड़; baseline तभी जब हर shard पर हो"""
+    sizes = {}
+    for part in parts:
+        for name, size in part["sizes"].items():
+            sizes[name] = sizes.get(name, 0) + size
+    baselines = [part["baseline"] for part in parts]
+    baseline = None
+    if all(baselines):
+        baseline = {"rss": sum(b["rss"] for b in baselines), "time": baselines[0]["time"], "sizes": {}}
+        for b in baselines:
+            for name, size in b["sizes"].items():
+                baseline["sizes"][name] = baseline["sizes"].get(name, 0) + size
+    return {"rss": sum(part["rss"] for part in parts), "sizes": sizes, "baseline": baseline}
+
+async def memstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """मेमोरी उपयोग की रिपोर्ट (Admin Only); sharded मोड में सभी workers का जोड़"""
+    user_id = update.effective_user.id
+    
+    if user_id != ADMIN_ID:
+        await update.message.reply_text("⚠️ **अस्वीकृत!** यह कमांड केवल एडमिन के लिए है।")
+        return
+    
+    action = context.args[0].lower() if context.args else ""
+    
+    if action == "compact":
+        # हिस्ट्री तभी कटे जब एडमिन limit दे: `/memstats compact 10`
+        try:
+            history_limit = max(int(context.args[1]), 0) if len(context.args) > 1 else 0
+        except ValueError:
+            await update.message.reply_text("❌ **Usage:** `/memstats compact [history_limit]`", parse_mode=ParseMode.MARKDOWN)
+            return
+        status_msg = await update.message.reply_text("🧹 **Compacting...**", parse_mode=ParseMode.MARKDOWN)
+        reporter = None
+        try:
+            if SHARD_COUNT > 1:
+                # हर worker अपना हिस्सा compact करता है; लाइव प्रगति सिर्फ single worker मोड में
+                parts = await call_all_shards(context.bot, "compact", history_limit)
+            else:
+                reporter = ProgressReporter(
+                    "🧹 **Compacting...**", len(search_history()), message_progress_sink(status_msg, ParseMode.MARKDOWN),
+                    labels={"trimmed": "📜 Histories trimmed"}, unit="users"
+                )
+                parts = [await compact_shard(context.bot, history_limit, reporter)]
+        except (asyncio.TimeoutError, RuntimeError) as e:
+            logger.error(f"❌ Compaction failed: {e!r}")
+            await status_msg.edit_text(shard_error_note(e), parse_mode=ParseMode.MARKDOWN)
+            return
+        result = {key: sum(part[key] for part in parts) for key in parts[0]}
+        summary = (
+            f"🧹 **Compaction Done**\n\n"
+            f"📈 **RSS:** {format_bytes(result['rss_before'])} ➜ {format_bytes(result['rss_after'])}\n"
+            f"⏳ Expired unlimited removed: {result['expired_unlimited']}\n"
+            f"📜 Histories trimmed: {result['histories_trimmed']}\n"
+            f"♻️ GC collected: {result['gc_collected']}"
+        )
+        if reporter:
+            await reporter.aclose(f"{summary}\n{reporter.rate_line(final=True)}")
+        else:
+            await status_msg.edit_text(summary, parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    try:
+        if action == "baseline":
+            rss = sum(await call_all_shards(context.bot, "memory_baseline"))
+        else:
+            parts = await call_all_shards(context.bot, "memory")
+    except (asyncio.TimeoutError, RuntimeError) as e:
+        logger.error(f"❌ Memory report failed: {e!r}")
+        await update.message.reply_text(shard_error_note(e), parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if action == "baseline":
+        await update.message.reply_text(
+            f"📌 **Memory baseline saved**\n\n"
+            f"📈 **RSS:** {format_bytes(rss)}\n"
+            "अब `/memstats` इस baseline से diff दिखाएगा।",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    report = _merge_memory_reports(parts)
+    baseline = report["baseline"]
+    baseline_sizes = baseline["sizes"] if baseline else {}
+    
+    lines = []
+    for name, size in sorted(report["sizes"].items(), key=lambda x: x[1], reverse=True):
+        line = f"{name:<20} {format_bytes(size):>10}"
+        if name in baseline_sizes:
+            line += f"  ({'+' if size >= baseline_sizes[name] else '-'}{format_bytes(abs(size - baseline_sizes[name]))})"
+        lines.append(line)
+    
+    rss_line = f"📈 **Process RSS:** {format_bytes(report['rss'])}"
+    if baseline:
+        rss_line += f" (baseline {baseline['time']}: {format_bytes(baseline['rss'])})"
+    if SHARD_COUNT > 1:
+        rss_line += "\n🧩 **Workers:** " + " • ".join(format_bytes(part["rss"]) for part in parts)
+    if MEMORY_SOFT_LIMIT_MB:
+        rss_line += f"\n🚧 **Soft Limit:** {MEMORY_SOFT_LIMIT_MB} MB" + (" (प्रति worker)" if SHARD_COUNT > 1 else "")
+    
+    if SHARD_COUNT > 1:
+        tracemalloc_text = "🔬 Allocation sites हर worker process के अलग होते हैं, इसलिए सिर्फ `WORKERS=1` में दिखते हैं।"
+    elif tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if _MEMORY_BASELINE and _MEMORY_BASELINE["snapshot"] is not None:
+            title = "Top allocation diffs vs baseline"
+            top = [str(stat) for stat in snapshot.compare_to(_MEMORY_BASELINE["snapshot"], "lineno")[:10]]
+        else:
+            title = "Top allocation sites"
+            top = [str(stat) for stat in snapshot.statistics("lineno")[:10]]
+        # फाइल पाथ को छोटा रखें ताकि मैसेज लिमिट में रहे
+        top = [line.replace(os.path.dirname(os.__file__), "<stdlib>") for line in top]
+        tracemalloc_text = f"🔬 **{title}:**\n```\n" + "\n".join(top) + "\n```"
+    else:
+        tracemalloc_text = "🔬 tracemalloc बंद है। चालू करने के लिए `/memstats baseline` चलाएं।"
+    
+    memstats_message = (
+        "🧠 **Memory Stats**\n"
+        "━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"{rss_line}\n\n"
+        "📦 **Deep size per structure:**\n"
+        "```\n" + "\n".join(lines) + "\n```\n"
+        f"{tracemalloc_text}\n\n"
+        "💡 `/memstats baseline` • `/memstats compact [history_limit]`"
+    )
+    
+    await update.message.reply_text(memstats_message, parse_mode=ParseMode.MARKDOWN)
+
+# --- Admin Paginated Lists ---
+
+ADMIN_LISTS = {
+    'u': ("👑 **Unlimited Users List:**", "No unlimited users found.", UNLIMITED_INDEX),
+    'b': ("🚫 **Banned Users List:**", "No banned users found.", BANNED_INDEX),
+    'c': ("💰 **Users by Credits:**", "No users found.", CREDITS_INDEX),
+}
+
+def _format_admin_entry(kind: str, key: int, uid: int) -> str:
+    """index की एक एंट्री को लिस्ट की लाइन में बदलें"""
+    if kind == 'u':
+        if key == FOREVER_KEY:
+            expiry_str = "Forever ♾️"
+        elif key < 0:
+            expiry_str = "Invalid Date"
+        else:
+            expiry_str = datetime.fromtimestamp(key).strftime('%d-%m-%Y %H:%M')
+        return f"• User `{uid}` - {expiry_str}"
+    if kind == 'b':
+        banned_str = datetime.fromtimestamp(-key).strftime('%d-%m-%Y %H:%M') if key else "पुराना बैन"
+        return f"• User `{uid}` - {banned_str}"
+    return f"• User `{uid}` - {-key} क्रेडिट"
+
+def admin_page_part(bot, kind: str, cursor, backwards: bool, size: int) -> tuple:
+    """इस shard के index का एक पेज: (entries, start, इस shard की कुल एंट्रीज़)"""
+    index = ADMIN_LISTS.get(kind, ADMIN_LISTS['u'])[2]
+    if index is BANNED_INDEX:
+        ban_times()  # बैन index lazy समय parse होने पर ही बनता है
+    entries, start = index.page(cursor, size, backwards=backwards)
+    return entries, start, len(index)
+
+def merge_index_pages(parts: list, size: int, backwards: bool = False) -> tuple:
+    """हर shard के उसी cursor वाले पेज मिलाकर पूरे index का पेज: (entries, start, total)
+
+    आगे: हर shard का start उसकी cursor तक की एंट्रीज़ है, इसलिए कुल start उनका जोड़। पीछे: हर shard
+    का start और उसकी वे एंट्रीज़ जो मिले हुए पेज से पहले छूट गईं।
+    """
+    total = sum(part_total for _, _, part_total in parts)
+    merged = list(heapq.merge(*(tuple(map(tuple, entries)) for entries, _, _ in parts)))
+    if not backwards:
+        return merged[:size], sum(start for _, start, _ in parts), total
+    entries = merged[-size:]
+    if not entries:
+        return [], 0, total
+    start = sum(part_start + sum(1 for entry in part_entries if tuple(entry) < entries[0])
+                for part_entries, part_start, _ in parts)
+    return entries, start, total
+
+async def render_admin_page(bot, kind: str, cursor=None, backwards: bool = False):
+    """सभी shards के sorted indexes से एक पेज बनाएं; next/prev बटन में cursor रहता है, पेज नंबर नहीं"""
+    title, empty_text, _ = ADMIN_LISTS.get(kind, ADMIN_LISTS['u'])
+    back_row = [InlineKeyboardButton("🔙 Back to Stats", callback_data='admin_stats')]
+    
+    parts = await call_all_shards(bot, "admin_page", kind, cursor, backwards, ADMIN_PAGE_SIZE)
+    entries, start, total = merge_index_pages(parts, ADMIN_PAGE_SIZE, backwards)
+    if not total:
+        return f"{title}\n\n{empty_text}", InlineKeyboardMarkup([back_row])
+    
+    if not entries:
+        # cursor वाली एंट्री हट चुकी हो और आगे कुछ न बचा हो तो शुरुआत से दिखाएं
+        parts = await call_all_shards(bot, "admin_page", kind, None, False, ADMIN_PAGE_SIZE)
+        entries, start, total = merge_index_pages(parts, ADMIN_PAGE_SIZE)
+    
+    text = f"{title}\n\n"
+    text += "\n".join(_format_admin_entry(kind, key, uid) for key, uid in entries)
+    text += f"\n\n📄 {start + 1}-{start + len(entries)} / {total}"
+    
+    nav_row = []
+    if start > 0:
+        first_key, first_uid = entries[0]
+        nav_row.append(InlineKeyboardButton("◀️ Prev", callback_data=f"pg|{kind}|p|{first_key}|{first_uid}"))
+    if start + len(entries) < total:
+        last_key, last_uid = entries[-1]
+        nav_row.append(InlineKeyboardButton("Next ▶️", callback_data=f"pg|{kind}|n|{last_key}|{last_uid}"))
+    
+    keyboard = [nav_row, back_row] if nav_row else [back_row]
+    return text, InlineKeyboardMarkup(keyboard)
+
+# --- Button Handler (Updated for buy_unlimited_access) ---
+
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Inline बटन हैंडलर"""
+    query = update.callback_query
+    await query.answer()
+    
+    user_id = query.from_user.id
+    save_user(user_id)
+    bot_username = context.bot.username
+    
+    # चैनल मेंबरशिप चेक
+    if query.data == 'check_membership':
+        is_member = await check_channel_membership(user_id, context)
         if is_member:
             keyboard = [[InlineKeyboardButton("🔙 मुख्य मेनू", callback_data='main_menu')]]
             reply_markup = InlineKeyboardMarkup(keyboard)
@@ -939,7 +2854,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         current_credits = get_credits(user_id)
         is_unli = is_unlimited(user_id)
         credit_text = "अनलिमिटेड ♾️" if is_unli else str(current_credits)
-        referral_count = sum(1 for r in REFERRED_TRACKER if r[0] == user_id)
+        referrals = referral_count(user_id)
         
         expiry_info = ""
         if is_unli and user_id != ADMIN_ID:
@@ -954,7 +2869,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         
         credits_msg = (
             f"💰 **आपके क्रेडिट्स:** {credit_text}{expiry_info}\n"
-            f"🔗 **आपके रेफरल:** {referral_count}\n"
+            f"🔗 **आपके रेफरल:** {referrals}\n"
             f"🎁 **हर रेफरल:** +{REFERRAL_CREDITS} क्रेडिट\n\n"
         )
         
@@ -970,8 +2885,8 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     elif query.data == 'get_referral_link':
         referral_link = get_referral_link(bot_username, user_id)
-        referral_count = sum(1 for r in REFERRED_TRACKER if r[0] == user_id)
-        total_earned = referral_count * REFERRAL_CREDITS
+        referrals = referral_count(user_id)
+        total_earned = referrals * REFERRAL_CREDITS
         current_credits = get_credits(user_id)
         credit_text = "अनलिमिटेड ♾️" if is_unlimited(user_id) else str(current_credits)
         
@@ -983,13 +2898,13 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             "2️⃣ दोस्तों को WhatsApp/Telegram पर भेजें\n"
             f"3️⃣ जब वे ज्वाइन करें, आपको **{REFERRAL_CREDITS}** क्रेडिट मिलेंगे\n\n"
             "📊 **आपकी रेफरल स्टेट:**\n"
-            f"👥 **कुल रेफरल:** {referral_count}\n"
+            f"👥 **कुल रेफरल:** {referrals}\n"
             f"💰 **कमाए क्रेडिट:** {total_earned}\n"
             f"💎 **मौजूदा क्रेडिट:** {credit_text}"
         )
         
         share_text = f"🔍 Number Search Bot - किसी भी नंबर की जानकारी पाएं!\n\n{referral_link}"
-        encoded_text = requests.utils.quote(share_text)
+        encoded_text = quote(share_text)
         
         keyboard = [
             [InlineKeyboardButton("💬 WhatsApp पर शेयर करें", url=f"https://wa.me/?text={encoded_text}")],
@@ -1022,15 +2937,16 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
 
     elif query.data == 'my_referrals':
-        referral_count = sum(1 for r in REFERRED_TRACKER if r[0] == user_id)
-        total_earned = referral_count * REFERRAL_CREDITS
+        referrals = referral_count(user_id)
+        total_earned = referrals * REFERRAL_CREDITS
         
-        referral_counts = {}
-        for ref_id, _ in REFERRED_TRACKER:
-            referral_counts[ref_id] = referral_counts.get(ref_id, 0) + 1
-        
-        sorted_referrers = sorted(referral_counts.items(), key=lambda x: x[1], reverse=True)
-        user_rank = next((i+1 for i, (uid, _) in enumerate(sorted_referrers) if uid == user_id), "N/A")
+        # रैंक = सभी shards पर इससे ज़्यादा रेफरल वाले + 1 (बराबर वालों की एक ही रैंक)
+        user_rank = "N/A"
+        if referrals:
+            try:
+                user_rank = 1 + sum(await call_all_shards(context.bot, "referrers_above", referrals))
+            except (asyncio.TimeoutError, RuntimeError) as e:
+                logger.error(f"❌ Referral rank for {user_id} failed: {e!r}")
         
         keyboard = [
             [InlineKeyboardButton("🎁 रेफरल लिंक पाएं", callback_data='get_referral_link')],
@@ -1040,7 +2956,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         
         await query.edit_message_text(
             f"📊 **आपकी रेफरल स्टेटिस्टिक्स**\n\n"
-            f"👥 **कुल रेफरल:** {referral_count}\n"
+            f"👥 **कुल रेफरल:** {referrals}\n"
             f"💰 **कुल कमाए क्रेडिट:** {total_earned}\n"
             f"🎁 **प्रति रेफरल:** {REFERRAL_CREDITS} क्रेडिट\n"
             f"🏆 **आपकी रैंक:** #{user_rank}\n\n"
@@ -1050,7 +2966,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
     
     elif query.data == 'search_history':
-        if user_id not in USER_SEARCH_HISTORY or not USER_SEARCH_HISTORY[user_id]:
+        if not search_history().get(user_id):
             keyboard = [[InlineKeyboardButton("🔙 मुख्य मेनू", callback_data='main_menu')]]
             reply_markup = InlineKeyboardMarkup(keyboard)
             await query.edit_message_text(
@@ -1063,7 +2979,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             )
             return
         
-        history = USER_SEARCH_HISTORY[user_id][-10:]
+        history = search_history()[user_id][-10:]
         history_text = "📜 **आपकी आखिरी 10 सर्च:**\n\n"
         
         for idx, search in enumerate(reversed(history), 1):
@@ -1080,8 +2996,9 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text(history_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
     
     elif query.data == 'clear_history':
-        if user_id in USER_SEARCH_HISTORY:
-            USER_SEARCH_HISTORY[user_id] = []
+        if user_id in search_history():
+            search_history()[user_id] = []
+            journal("history_clear", user_id)
             save_data()
         
         keyboard = [[InlineKeyboardButton("🔙 मुख्य मेनू", callback_data='main_menu')]]
@@ -1178,11 +3095,13 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await stats_command(update.callback_query.message, context)
     
     elif query.data == 'admin_top_users' and user_id == ADMIN_ID:
-        referral_counts = {}
-        for ref_id, _ in REFERRED_TRACKER:
-            referral_counts[ref_id] = referral_counts.get(ref_id, 0) + 1
-        
-        sorted_referrers = sorted(referral_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        try:
+            parts = await call_all_shards(context.bot, "top_referrers", 10)
+        except (asyncio.TimeoutError, RuntimeError) as e:
+            logger.error(f"❌ Top referrers failed: {e!r}")
+            await query.message.reply_text(shard_error_note(e), parse_mode=ParseMode.MARKDOWN)
+            return
+        sorted_referrers = sorted((entry for part in parts for entry in part), key=lambda x: x[1], reverse=True)[:10]
         
         top_users_text = "🏆 **Top 10 Referrers:**\n\n"
         for idx, (uid, count) in enumerate(sorted_referrers, 1):
@@ -1194,58 +3113,58 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         
         await query.edit_message_text(top_users_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
     
-    elif query.data == 'admin_unlimited_list' and user_id == ADMIN_ID:
-        if not UNLIMITED_USERS:
-            keyboard = [[InlineKeyboardButton("🔙 Back to Stats", callback_data='admin_stats')]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
-                "👑 **Unlimited Users List:**\n\nNo unlimited users found.",
-                reply_markup=reply_markup
-            )
+    elif query.data in ('admin_unlimited_list', 'admin_banned_list', 'admin_credits_list') and user_id == ADMIN_ID:
+        kind = {'admin_unlimited_list': 'u', 'admin_banned_list': 'b', 'admin_credits_list': 'c'}[query.data]
+        try:
+            text, reply_markup = await render_admin_page(context.bot, kind)
+        except (asyncio.TimeoutError, RuntimeError) as e:
+            logger.error(f"❌ Admin list {kind} failed: {e!r}")
+            await query.message.reply_text(shard_error_note(e), parse_mode=ParseMode.MARKDOWN)
             return
-        
-        unlimited_text = "👑 **Unlimited Users List:**\n\n"
-        for uid, expiry in list(UNLIMITED_USERS.items())[:20]:
-            if expiry == "forever":
-                expiry_str = "Forever ♾️"
-            else:
-                try:
-                    expiry_date = datetime.fromtimestamp(expiry)
-                    expiry_str = expiry_date.strftime('%d-%m-%Y %H:%M')
-                except:
-                    expiry_str = "Invalid Date"
-
-            unlimited_text += f"• User `{uid}` - {expiry_str}\n"
-        
-        if len(UNLIMITED_USERS) > 20:
-            unlimited_text += f"\n... and {len(UNLIMITED_USERS) - 20} more"
-        
-        keyboard = [[InlineKeyboardButton("🔙 Back to Stats", callback_data='admin_stats')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(unlimited_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
     
-    elif query.data == 'admin_banned_list' and user_id == ADMIN_ID:
-        if not BANNED_USERS:
-            keyboard = [[InlineKeyboardButton("🔙 Back to Stats", callback_data='admin_stats')]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
-                "🚫 **Banned Users List:**\n\nNo banned users found.",
-                reply_markup=reply_markup
-            )
+    elif query.data.startswith('pg|') and user_id == ADMIN_ID:
+        # callback_data: pg|<list>|<n/p>|<cursor key>|<cursor user_id>
+        try:
+            _, kind, direction, key, cursor_uid = query.data.split('|')
+            cursor = (int(key), int(cursor_uid)) if key else None
+        except ValueError:
+            kind, direction, cursor = 'u', 'n', None
+        try:
+            text, reply_markup = await render_admin_page(context.bot, kind, cursor, backwards=direction == 'p')
+        except (asyncio.TimeoutError, RuntimeError) as e:
+            logger.error(f"❌ Admin list {kind} failed: {e!r}")
+            await query.message.reply_text(shard_error_note(e), parse_mode=ParseMode.MARKDOWN)
             return
-        
-        banned_text = "🚫 **Banned Users List:**\n\n"
-        for uid in list(BANNED_USERS)[:30]:
-            banned_text += f"• User `{uid}`\n"
-        
-        if len(BANNED_USERS) > 30:
-            banned_text += f"\n... and {len(BANNED_USERS) - 30} more"
-        
-        keyboard = [[InlineKeyboardButton("🔙 Back to Stats", callback_data='admin_stats')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(banned_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        try:
+            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        except BadRequest:
+            pass
+    
+    elif query.data.startswith('ua|') and user_id == ADMIN_ID:
+        # callback_data: ua|<action>|<user_id>; r = सिर्फ refresh
+        try:
+            _, action, target = query.data.split('|')
+            target_user_id = int(target)
+        except ValueError:
+            return
+        note = ""
+        if action in USER_ACTIONS:
+            note = await run_user_action(context.bot, action, target_user_id)
+        try:
+            info = await shard_call(context.bot, shard_for_user(target_user_id), "describe_user", target_user_id)
+        except (asyncio.TimeoutError, RuntimeError) as e:
+            logger.error(f"❌ Profile refresh for {target_user_id} failed: {e!r}")
+            await query.message.reply_text(f"{note}\n{shard_error_note(e)}".strip(), parse_mode=ParseMode.MARKDOWN)
+            return
+        if info is None:
+            await query.edit_message_text(f"❌ User `{target_user_id}` नहीं मिला।", parse_mode=ParseMode.MARKDOWN)
+            return
+        text, reply_markup = render_user_profile(info, note)
+        try:
+            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        except BadRequest:
+            pass
 
 async def set_bot_commands(application: Application) -> None:
     """बॉट commands सेट करें"""
@@ -1257,18 +3176,25 @@ async def set_bot_commands(application: Application) -> None:
     await application.bot.set_my_commands(commands)
     logger.info("✅ Bot commands set successfully")
 
-async def post_init(application: Application) -> None:
-    """Initialization के बाद चलाएं"""
+async def announce_startup(application: Application) -> None:
+    """commands सेट करें और एडमिन को स्टार्ट मैसेज भेजें (पोलिंग शुरू होने के बाद, बैकग्राउंड में)"""
     await set_bot_commands(application)
     
     if ADMIN_ID:
+        # sharded मोड में सभी shards का जोड़; कोई shard अभी लोड हो रहा हो तो सिर्फ यहाँ के आंकड़े
+        try:
+            parts = await call_all_shards(application.bot, "stats")
+        except (asyncio.TimeoutError, RuntimeError) as e:
+            logger.warning(f"⚠️ Startup stats from other shards unavailable: {e!r}")
+            parts = [collect_stats()]
+        stats = {key: sum(part[key] for part in parts) for key in parts[0]}
         try:
             await application.bot.send_message(
                 chat_id=ADMIN_ID,
                 text=f"✅ **Bot Started Successfully!**\n\n"
-                    f"👥 Total Users: {len(USERS)}\n"
-                    f"👑 Unlimited Users: {len(UNLIMITED_USERS)}\n"
-                    f"🚫 Banned Users: {len(BANNED_USERS)}\n"
+                    f"👥 Total Users: {stats['users']}\n"
+                    f"👑 Unlimited Users: {stats['unlimited']}\n"
+                    f"🚫 Banned Users: {stats['banned']}\n"
                     f"🔗 Referral Credit: {REFERRAL_CREDITS}\n"
                     f"⏰ Time: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}",
                 parse_mode=ParseMode.MARKDOWN
@@ -1276,8 +3202,1153 @@ async def post_init(application: Application) -> None:
         except:
             pass
 
+async def post_init(application: Application) -> None:
+    """Initialization के बाद चलाएं"""
+    # sharded मोड में commands और स्टार्ट मैसेज सिर्फ पहला shard भेजे
+    # ये Telegram API कॉल्स पहले अपडेट का रास्ता न रोकें, इसलिए बैकग्राउंड में
+    if not SHARD_ID:
+        start_background_task(announce_startup(application))
+    if _LAZY_SECTIONS and LAZY_WARMUP_DELAY > 0:
+        start_background_task(warm_lazy_sections())
+    
+    if MEMORY_SOFT_LIMIT_MB > 0:
+        start_background_task(memory_watchdog(application))
+    if _JOURNAL is not None:
+        start_background_task(lease_keeper(application))
+    mark_startup("post_init")
+
+# --- State Export / Import (offline CLI) ---
+
+STATE_RECORD_TYPES = ("user", "credits", "unlimited", "referral", "ban", "ban_reason", "profile")
+
+def iter_state_records():
+    """पूरे स्टेट को एक-एक रिकॉर्ड के रूप में दें (कोई बीच की कॉपी नहीं बनती)"""
+    for uid in USERS:
+        yield {"type": "user", "user_id": uid, "value": None}
+    for uid, credits in USER_CREDITS.items():
+        yield {"type": "credits", "user_id": uid, "value": credits}
+    for uid, expiry in UNLIMITED_USERS.items():
+        yield {"type": "unlimited", "user_id": uid, "value": expiry}
+    for referrer_id, referred_id in referral_tracker():
+        yield {"type": "referral", "user_id": referrer_id, "value": referred_id}
+    for uid in banned_users():
+        yield {"type": "ban", "user_id": uid, "value": ban_times().get(uid, 0)}
+    for uid, reason in ban_reasons().items():
+        yield {"type": "ban_reason", "user_id": uid, "value": reason}
+    # CSV में भी एक ही कॉलम रहे, इसलिए प्रोफाइल compact JSON स्ट्रिंग के रूप में
+    for uid, profile in USER_PROFILES.items():
+        yield {"type": "profile", "user_id": uid, "value": json.dumps(profile.to_list(), separators=(",", ":"), ensure_ascii=False)}
+
+def _record_line(record: dict) -> str:
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+class StateChecksum:
+    """क्रम से स्वतंत्र checksum: हर रिकॉर्ड के sha256 का जोड़ (mod 2^256)"""
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, record: dict) -> None:
+        digest = hashlib.sha256(_record_line(record).encode("utf-8")).digest()
+        self.total = (self.total + int.from_bytes(digest, "big")) % (1 << 256)
+        self.count += 1
+
+    @property
+    def hexdigest(self) -> str:
+        return f"{self.total:064x}"
+
+def _parse_number(value: str):
+    """JSON जैसा: "5" → int, "5.5" → float (ताकि checksum वही रहे)"""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def _parse_csv_value(kind: str, value: str):
+    """CSV सेल को रिकॉर्ड के टाइप के हिसाब से पढ़ें; "123" जैसा ban reason स्ट्रिंग ही रहे"""
+    if kind == "user":
+        return None
+    if kind in ("credits", "referral", "ban"):
+        return int(value)
+    if kind == "unlimited":
+        return value if value == "forever" else _parse_number(value)
+    return value  # ban_reason, profile: जैसा लिखा था वैसा ही
+
+def iter_export_file(path: str, fmt: str):
+    """एक्सपोर्ट फाइल को लाइन-दर-लाइन पढ़ें; आखिरी checksum रिकॉर्ड भी देता है"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for row in reader:
+                if len(row) != 3:
+                    continue
+                if row[0] == "checksum":
+                    yield {"type": "checksum", "records": int(row[1]), "value": row[2]}
+                else:
+                    yield {"type": row[0], "user_id": int(row[1]), "value": _parse_csv_value(row[0], row[2])}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+CLI_PROGRESS_INTERVAL = 1.0  # सेकंड; टर्मिनल पर edit की कोई लिमिट नहीं
+
+def export_state(path: str, fmt: str) -> StateChecksum:
+    """स्टेट को JSONL / CSV में स्ट्रीम करें, आखिर में checksum रिकॉर्ड के साथ"""
+    checksum = StateChecksum()
+    total = (len(USERS) + len(USER_CREDITS) + len(UNLIMITED_USERS) + len(referral_tracker())
+             + len(banned_users()) + len(ban_reasons()) + len(USER_PROFILES))
+    progress = ProgressReporter("exported", total, stderr_progress_sink, unit="records", interval=CLI_PROGRESS_INTERVAL)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer:
+            writer.writerow(["type", "user_id", "value"])
+        for record in iter_state_records():
+            checksum.add(record)
+            if writer:
+                writer.writerow([record["type"], record["user_id"], "" if record["value"] is None else record["value"]])
+            else:
+                f.write(_record_line(record) + "\n")
+            progress.update(checksum.count)
+        if writer:
+            writer.writerow(["checksum", checksum.count, checksum.hexdigest])
+        else:
+            f.write(_record_line({"type": "checksum", "records": checksum.count, "value": checksum.hexdigest}) + "\n")
+    progress.close()
+    return checksum
+
+def verify_export_file(path: str, fmt: str) -> StateChecksum:
+    """फाइल का checksum उसके trailer से मिलाएं (कुछ भी लागू किए बिना)"""
+    checksum = StateChecksum()
+    expected = None
+    for record in iter_export_file(path, fmt):
+        if record["type"] == "checksum":
+            expected = record
+            continue
+        if record["type"] not in STATE_RECORD_TYPES:
+            raise ValueError(f"Unknown record type: {record['type']}")
+        checksum.add(record)
+    if expected is None:
+        raise ValueError("Checksum record missing, file is truncated")
+    if expected["records"] != checksum.count or expected["value"] != checksum.hexdigest:
+        raise ValueError(f"Checksum mismatch: file says {expected['records']} records / {expected['value'][:12]}…, "
+                         f"read {checksum.count} / {checksum.hexdigest[:12]}…")
+    return checksum
+
+def _apply_state_record(record: dict) -> None:
+    """एक रिकॉर्ड सीधे storage में लिखें; sorted indexes import के आखिर में एक बार बनते हैं"""
+    uid, value = record["user_id"], record["value"]
+    kind = record["type"]
+    if kind == "user":
+        USERS.add(uid)
+    elif kind == "credits":
+        USER_CREDITS[uid] = value
+    elif kind == "unlimited":
+        UNLIMITED_USERS[uid] = value
+    elif kind == "referral":
+        referral_tracker().add((uid, value))
+    elif kind == "ban":
+        banned_users().add(uid)
+        ban_times()[uid] = int(value or 0)  # 0 = पुराना बैन, समय अज्ञात
+    elif kind == "ban_reason":
+        ban_reasons()[uid] = str(value)
+    elif kind == "profile":
+        USER_PROFILES[uid] = UserProfile.from_list(json.loads(value))
+
+def _commit_import() -> None:
+    save_data(raise_errors=True)
+    save_banned_users(raise_errors=True)
+
+def import_state(path: str, fmt: str, chunk_size: int, replace: bool) -> StateChecksum:
+    """पहले checksum जांचें, फिर chunks में लागू करें और बीच-बीच में storage में commit करें
+
+    हर commit पूरा snapshot दोबारा लिखता है, इसलिए commits के बीच का अंतर हर बार दोगुना होता है
+    (chunk_size, 2x, 4x …): कुल लिखा डेटा O(n) रहता है, O(n²/chunk_size) नहीं।
+    """
+    global JOURNAL_SEQ
+    expected = verify_export_file(path, fmt)
+    
+    if replace:
+        USERS.clear()
+        USER_CREDITS.clear()
+        UNLIMITED_USERS.clear()
+        referral_tracker().clear()
+        banned_users().clear()
+        ban_times().clear()
+        ban_reasons().clear()
+        USER_PROFILES.clear()
+    
+    progress = ProgressReporter("imported", expected.count, stderr_progress_sink, labels={"commits": "chunks committed"},
+                                unit="records", interval=CLI_PROGRESS_INTERVAL)
+    done = commits = 0
+    next_commit = chunk_size
+    for record in iter_export_file(path, fmt):
+        if record["type"] == "checksum":
+            continue
+        _apply_state_record(record)
+        done += 1
+        if done >= next_commit:
+            _commit_import()
+            commits += 1
+            next_commit = done * 2
+        progress.update(done, commits=commits)
+    
+    # journal की एंट्रीज़ (cli पहले ही replay कर चुका) अगले boot पर import के ऊपर दोबारा न चलें: journal हटाएं,
+    # और seq एक आगे रखें ताकि पुराने seq पर अटका standby अगली एंट्री पर gap देखकर नया snapshot लोड करे
+    JOURNAL_SEQ += 1
+    _commit_import()
+    if STATE_JOURNAL_FILE and os.path.exists(STATE_JOURNAL_FILE):
+        os.remove(STATE_JOURNAL_FILE)
+    rebuild_indexes()
+    progress.counts["commits"] = commits + 1
+    progress.close()
+    return expected
+
+def cli(argv: list) -> int:
+    """Offline टूल्स: python main.py export|import ..."""
+    start_logging()
+    parser = argparse.ArgumentParser(prog="main.py", description="Offline state tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    p_export = sub.add_parser("export", help="stream state to JSONL/CSV")
+    p_export.add_argument("path")
+    p_export.add_argument("--format", choices=("jsonl", "csv"), default=None)
+    
+    p_import = sub.add_parser("import", help="load a JSONL/CSV export into the storage files")
+    p_import.add_argument("path")
+    p_import.add_argument("--format", choices=("jsonl", "csv"), default=None)
+    p_import.add_argument("--chunk-size", type=int, default=100_000,
+                          help="records before the first commit; the interval doubles after each commit")
+    p_import.add_argument("--replace", action="store_true", help="clear existing state first (default: merge)")
+    
+    sub.add_parser("reshard", help="merge all shard files and split them again for the current WORKERS")
+    
+    args = parser.parse_args(argv)
+    if args.command == "reshard":
+        try:
+            reshard(max(WORKERS, 1))
+        except (RuntimeError, OSError) as e:
+            print(f"❌ Reshard failed, run it again to resume: {e}", file=sys.stderr)
+            return 1
+        print(f"✅ Storage resharded for WORKERS={max(WORKERS, 1)}")
+        return 0
+    
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    
+    if args.command == "import" and STATE_JOURNAL_FILE:
+        lease = _read_lease()
+        if lease.get("holder") and lease.get("expires", 0) > time.time():
+            print(f"❌ The bot is running ({lease['holder']} holds {LEASE_FILE}); stop it before importing", file=sys.stderr)
+            return 1
+    
+    try:
+        load_data()
+        load_banned_users()
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if STATE_JOURNAL_FILE:
+        # snapshot के बाद के बदलाव सिर्फ journal में हैं
+        replayed = JournalTail(STATE_JOURNAL_FILE).poll()
+        if replayed:
+            print(f"🗂 Replayed {replayed:,} journal entries newer than the snapshot", file=sys.stderr)
+    
+    if args.command == "export":
+        checksum = export_state(args.path, fmt)
+        print(f"✅ Exported {checksum.count:,} records to {args.path}")
+        print(f"🔐 Checksum: {checksum.hexdigest}")
+        return 0
+    
+    try:
+        expected = import_state(args.path, fmt, max(args.chunk_size, 1), args.replace)
+    except (ValueError, KeyError) as e:
+        print(f"❌ Import aborted, nothing written: {e}", file=sys.stderr)
+        return 1
+    except (RuntimeError, OSError) as e:
+        print(f"❌ Import failed while writing storage (earlier commits are kept): {e}", file=sys.stderr)
+        return 1
+    
+    print(f"✅ Imported {expected.count:,} records from {args.path}")
+    if args.replace:
+        # Round trip जांच: स्टोरेज में अब जो है उसका checksum फाइल से मिलना चाहिए
+        actual = StateChecksum()
+        for record in iter_state_records():
+            actual.add(record)
+        if actual.hexdigest != expected.hexdigest:
+            print(f"❌ Checksum after import does not match: {actual.hexdigest}", file=sys.stderr)
+            return 1
+        print(f"🔐 Checksum verified: {actual.hexdigest}")
+    return 0
+
+# --- State Journal & Hot Standby ---
+
+_LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}"
+_LEASE_EPOCH = 0  # हमारी lease का epoch (हर नए holder पर बढ़ता है); 0 = lease के बिना चल रहे हैं
+_LEASE_DEADLINE = 0.0  # इस समय तक lease पक्की हमारी है
+
+def journal(op: str, *args) -> None:
+    """primary पर हर बदलाव journal में जोड़ें ताकि standby अपनी मेमोरी गर्म रख सके"""
+    global JOURNAL_SEQ
+    if _JOURNAL is None:
+        return
+    ensure_lease()
+    JOURNAL_SEQ += 1
+    _JOURNAL.write(json.dumps(
+        {"seq": JOURNAL_SEQ, "epoch": _LEASE_EPOCH, "op": op, "args": args}, ensure_ascii=False
+    ) + "\n")
+
+def open_journal() -> None:
+    """journal को append के लिए खोलें (line-buffered, हर एंट्री तुरंत फाइल में)"""
+    global _JOURNAL
+    _JOURNAL = open(STATE_JOURNAL_FILE, "a", encoding="utf-8", buffering=1)
+
+def close_journal() -> None:
+    global _JOURNAL
+    if _JOURNAL is not None:
+        _JOURNAL.close()
+        _JOURNAL = None
+
+def rotate_journal() -> None:
+    """snapshot सेव होने के बाद पुरानी journal हटाकर नई शुरू करें; standby नई inode देखकर फिर से खोलता है"""
+    close_journal()
+    os.remove(STATE_JOURNAL_FILE)
+    open_journal()
+    logger.info(f"🔄 State journal rotated at seq {JOURNAL_SEQ}")
+
+def apply_journal_entry(op: str, args: list) -> None:
+    """journal की एक एंट्री मेमोरी पर लागू करें (standby / crash के बाद replay)"""
+    if op == "credits":
+        if args[1] is None:
+            clear_credits(args[0])
+        else:
+            set_credits(args[0], args[1])
+    elif op == "unlimited":
+        if args[1] is None:
+            revoke_unlimited(args[0])
+        else:
+            grant_unlimited(args[0], args[1])
+    elif op == "ban":
+        ban_user(args[0], args[1], args[2] if len(args) > 2 else None)
+    elif op == "unban":
+        unban_user(args[0])
+    elif op == "user":
+        USERS.add(args[0])
+    elif op == "referral":
+        referral_tracker().add((args[0], args[1]))
+    elif op == "search":
+        history = search_history().setdefault(args[0], [])
+        history.append(args[1])
+        if len(history) > 50:
+            search_history()[args[0]] = history[-50:]
+    elif op == "history_clear":
+        search_history()[args[0]] = []
+    elif op == "compact":
+        trim_search_history(args[0])
+    elif op == "stats":
+        DAILY_STATS.update(args[0])
+    elif op == "profile":
+        USER_PROFILES[args[0]] = UserProfile.from_list(args[1])
+
+class JournalTail:
+    """journal फाइल को tail करे: अधूरी आखिरी लाइन और rotation (नई inode) संभालता है"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._inode = None
+        self._partial = ""
+        self._epoch = 0  # अब तक देखा सबसे नया lease epoch
+        self._pending = None  # gap की वजह से रुकी एंट्री, अगले poll में फिर कोशिश
+        self._gap_generation = None  # जिस snapshot से gap नहीं भरा, उसका generation
+    
+    def poll(self) -> int:
+        """नई एंट्रीज़ लागू करें, लौटाए कितनी लागू हुईं"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return 0  # rotation के बीच फाइल कुछ पल के लिए नहीं होती
+        applied = 0
+        if inode != self._inode:
+            if self._file is not None:
+                applied += self._drain()
+                self._file.close()
+            self._file = open(self.path, encoding="utf-8")
+            self._inode = inode
+            self._partial = ""
+        return applied + self._drain()
+    
+    def _drain(self) -> int:
+        global JOURNAL_SEQ
+        applied = 0
+        while True:
+            if self._pending is None:
+                line = self._file.readline()
+                if not line:
+                    break
+                if not line.endswith("\n"):
+                    self._partial += line
+                    break
+                line, self._partial = self._partial + line, ""
+                self._pending = json.loads(line)
+            entry = self._pending
+            epoch = entry.get("epoch", 0)
+            if epoch < self._epoch:
+                # takeover के बाद पुराने primary की एंट्री (fencing से पहले की दौड़), उसे लागू न करें
+                logger.warning(f"⚠️ Skipping journal seq {entry['seq']} from stale epoch {epoch} < {self._epoch}")
+                self._pending = None
+                continue
+            if entry["seq"] > JOURNAL_SEQ + 1 and not self._fill_gap(entry["seq"]):
+                break
+            self._pending = None
+            self._epoch = epoch
+            if entry["seq"] <= JOURNAL_SEQ:
+                continue
+            apply_journal_entry(entry["op"], entry["args"])
+            JOURNAL_SEQ = entry["seq"]
+            applied += 1
+        return applied
+    
+    def _fill_gap(self, seq: int) -> bool:
+        """बीच की एंट्रीज़ rotation में चली गईं, वे snapshot में हैं: उसे फिर लोड करें; gap भरा तो True"""
+        generation = _snapshot_generation(DATA_FILE)
+        if generation == self._gap_generation:
+            return False  # यही snapshot पहले भी पीछे था, अगले snapshot का इंतज़ार
+        logger.warning(f"⚠️ Journal gap {JOURNAL_SEQ} -> {seq}, reloading snapshot")
+        try:
+            load_data()
+            load_banned_users()
+        except (RuntimeError, OSError, ValueError) as e:
+            logger.error(f"❌ Snapshot reload failed, retrying on next poll: {e}")
+            return False
+        if seq > JOURNAL_SEQ + 1:
+            self._gap_generation = generation
+            logger.error(f"❌ Snapshot is at seq {JOURNAL_SEQ}, still missing entries before {seq}; waiting for the next snapshot")
+            return False
+        self._gap_generation = None
+        return True
+
+def _read_lease() -> dict:
+    try:
+        with open(LEASE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_lease(lease: dict) -> None:
+    tmp_path = f"{LEASE_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(lease, f)
+    os.replace(tmp_path, LEASE_FILE)
+
+def try_acquire_lease() -> bool:
+    """lease खाली या expired हो तो लें (नया epoch); पढ़ना-लिखना lock के अंदर ताकि दो standby एक साथ न जीतें"""
+    global _LEASE_EPOCH, _LEASE_DEADLINE
+    with open(f"{LEASE_FILE}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        lease = _read_lease()
+        if lease.get("holder") not in (None, _LEASE_HOLDER) and lease.get("expires", 0) > time.time():
+            return False
+        epoch = lease.get("epoch", 0)
+        if lease.get("holder") != _LEASE_HOLDER or epoch != _LEASE_EPOCH:
+            epoch += 1
+        expires = time.time() + LEASE_TTL
+        _write_lease({"holder": _LEASE_HOLDER, "expires": expires, "epoch": epoch})
+    _LEASE_EPOCH, _LEASE_DEADLINE = epoch, expires
+    return True
+
+def renew_lease() -> bool:
+    """अपनी lease (वही epoch) आगे बढ़ाएं; बीच में किसी और ने ली हो तो False, वापस कभी नहीं लेते"""
+    global _LEASE_DEADLINE
+    with open(f"{LEASE_FILE}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        lease = _read_lease()
+        if lease.get("holder") != _LEASE_HOLDER or lease.get("epoch") != _LEASE_EPOCH:
+            return False
+        expires = time.time() + LEASE_TTL
+        _write_lease({"holder": _LEASE_HOLDER, "expires": expires, "epoch": _LEASE_EPOCH})
+    _LEASE_DEADLINE = expires
+    return True
+
+def ensure_lease(check_disk: bool = False) -> None:
+    """fencing: लिखने से पहले पक्का करें कि lease अब भी हमारी है, नहीं तो RuntimeError
+
+    event loop लंबे समय तक अटका रहे (बड़ा save, compaction) तो lease_keeper renew नहीं कर पाता और
+    standby takeover कर सकता है; तब पुराना primary यहीं रुक जाता है।
+    """
+    if not _LEASE_EPOCH:
+        return
+    if check_disk:
+        lease = _read_lease()
+        if lease.get("holder") != _LEASE_HOLDER or lease.get("epoch") != _LEASE_EPOCH:
+            raise RuntimeError(f"Lease epoch {_LEASE_EPOCH} lost to {lease.get('holder')} (epoch {lease.get('epoch')})")
+    # deadline से पहले कोई और lease नहीं ले सकता; उसके पास पहुंचे तो renew करके ही लिखें
+    if time.time() > _LEASE_DEADLINE - LEASE_TTL / 3 and not renew_lease():
+        raise RuntimeError(f"Lease epoch {_LEASE_EPOCH} lost to {_read_lease().get('holder')}")
+
+def release_lease() -> None:
+    """साफ़ बंद होने पर lease छोड़ें ताकि standby TTL का इंतज़ार किए बिना तुरंत ले ले (epoch बना रहता है)"""
+    global _LEASE_EPOCH
+    with open(f"{LEASE_FILE}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        lease = _read_lease()
+        if lease.get("holder") != _LEASE_HOLDER:
+            return
+        _write_lease({"holder": None, "expires": 0, "epoch": lease.get("epoch", _LEASE_EPOCH)})
+    _LEASE_EPOCH = 0
+    logger.info("🔓 Lease released")
+
+async def lease_keeper(application: Application) -> None:
+    """lease renew करते रहें; किसी और ने ले ली तो intake बंद करें ताकि दो primary न रहें"""
+    while True:
+        await asyncio.sleep(LEASE_TTL / 3)
+        if not renew_lease():
+            logger.error(f"❌ Lease lost to {_read_lease().get('holder')}, stopping update intake")
+            application.stop_running()
+            return
+
+def run_standby(tail: JournalTail) -> None:
+    """journal tail करके state गर्म रखें, lease मिलते ही लौटें (फिर यही process primary बनता है)"""
+    logger.info(f"🕒 Standby: following {STATE_JOURNAL_FILE} from seq {JOURNAL_SEQ}, waiting for lease")
+    while True:
+        tail.poll()
+        if try_acquire_lease():
+            break
+        time.sleep(STANDBY_POLL_INTERVAL)
+    started = time.perf_counter()
+    applied = tail.poll()
+    logger.warning(
+        f"👑 Standby took over at seq {JOURNAL_SEQ}: {len(USERS)} users, "
+        f"{applied} final entries in {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+
+# --- Sharded Workers (multi-process) ---
+
+SHARD_ID = None  # worker process में उसका shard नंबर, single-process मोड में None
+SHARD_COUNT = 1
+_SHARD_RING = None
+_SHARD_OUTBOX = None  # multiprocessing.Queue: (shard, message) router को, वह सही inbox में डालता है
+_PENDING_CALLS = {}  # {call_id: (shard, asyncio.Future, on_progress)} दूसरे shards से जवाब का इंतज़ार
+_CALL_IDS = itertools.count()
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+class HashRing:
+    """Consistent hash ring: worker जुड़ने/हटने पर सिर्फ ~1/N यूजर्स का shard बदलता है"""
+    
+    def __init__(self, nodes, vnodes: int = SHARD_VNODES):
+        points = sorted((_ring_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+    
+    def node_for(self, key) -> int:
+        idx = bisect.bisect(self._hashes, _ring_hash(str(key))) % len(self._hashes)
+        return self._nodes[idx]
+
+def shard_for_user(user_id: int) -> int:
+    """यूजर का डेटा किस shard के पास है"""
+    return _SHARD_RING.node_for(user_id) if _SHARD_RING else 0
+
+def update_user_id(update: dict):
+    """raw update JSON से effective user id (message / callback_query / ... का "from")"""
+    for value in update.values():
+        if isinstance(value, dict):
+            user = value.get("from") or value.get("user")
+            if user:
+                return user.get("id")
+    return None
+
+def _op_grant_unlimited(bot, user_id: int, expiry) -> None:
+    grant_unlimited(user_id, expiry)
+    save_data()
+
+def _op_revoke_unlimited(bot, user_id: int):
+    if not revoke_unlimited(user_id):
+        return None
+    if user_id not in USER_CREDITS:
+        set_credits(user_id, DAILY_CREDITS_LIMIT)
+    save_data()
+    return USER_CREDITS[user_id]
+
+def _op_add_credits(bot, user_id: int, amount: int) -> int:
+    set_credits(user_id, USER_CREDITS.get(user_id, 0) + amount)
+    save_data()
+    return USER_CREDITS[user_id]
+
+def _op_ban(bot, user_id: int, reason: str = None) -> None:
+    ban_user(user_id, reason=reason)
+    save_banned_users()
+
+def _op_unban(bot, user_id: int) -> bool:
+    if not unban_user(user_id):
+        return False
+    save_banned_users()
+    return True
+
+# message bus पर चलने वाले operations; हर एक पहले argument में उस shard का bot लेता है
+SHARD_OPS = {
+    "referral": credit_referral,
+    "grant_unlimited": _op_grant_unlimited,
+    "revoke_unlimited": _op_revoke_unlimited,
+    "add_credits": _op_add_credits,
+    "ban": _op_ban,
+    "unban": _op_unban,
+    "bulk": _apply_bulk_part,
+    "broadcast": send_broadcast,
+    "stats": collect_stats,
+    "describe_user": describe_user,
+    "admin_page": admin_page_part,
+    "top_referrers": top_referrers,
+    "referrers_above": referrers_above,
+    "memory": memory_report,
+    "memory_baseline": take_memory_baseline,
+    "compact": compact_shard,
+    "api_metrics": api_metrics_part,
+}
+
+async def _run_shard_op(bot, op: str, args: tuple, on_progress=None):
+    kwargs = {"on_progress": on_progress} if on_progress else {}
+    result = SHARD_OPS[op](bot, *args, **kwargs)
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+async def shard_call(bot, shard: int, op: str, *args, timeout: float = SHARD_CALL_TIMEOUT, on_progress=None):
+    """op को उस shard पर चलाएं जिसके पास डेटा है; अपना shard हो तो सीधे यहीं
+
+    on_progress दिया हो तो op (जैसे broadcast) की प्रगति भी मिलती है, दूसरे shard से bus पर होकर।
+    """
+    if SHARD_COUNT <= 1 or shard == SHARD_ID:
+        return await _run_shard_op(bot, op, args, on_progress)
+    
+    call_id = next(_CALL_IDS)
+    future = asyncio.get_running_loop().create_future()
+    _PENDING_CALLS[call_id] = (shard, future, on_progress)
+    _SHARD_OUTBOX.put((shard, ("call", call_id, SHARD_ID, op, args, on_progress is not None)))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    finally:
+        _PENDING_CALLS.pop(call_id, None)
+
+async def call_all_shards(bot, op: str, *args, timeout: float = SHARD_CALL_TIMEOUT, on_progress=None) -> list:
+    """op को हर shard पर साथ में चलाएं और सबके नतीजे लौटाएं (on_progress(shard, results))"""
+    return await asyncio.gather(*(
+        shard_call(
+            bot, shard, op, *args, timeout=timeout,
+            on_progress=functools.partial(on_progress, shard) if on_progress else None
+        )
+        for shard in range(SHARD_COUNT)
+    ))
+
+def _progress_relay(origin: int, call_id: int):
+    """दूसरे shard की call की प्रगति उसे वापस भेजें, सेकंड में ज़्यादा से ज़्यादा एक बार (आखिरी गिनती reply में)"""
+    last_sent = 0.0
+    
+    def relay(results: dict) -> None:
+        nonlocal last_sent
+        now = time.monotonic()
+        if now - last_sent >= 1:
+            last_sent = now
+            _SHARD_OUTBOX.put((origin, ("progress", call_id, dict(results))))
+    return relay
+
+async def _serve_shard_call(bot, call_id: int, origin: int, op: str, args: tuple, wants_progress: bool = False) -> None:
+    result, error = None, None
+    try:
+        result = await _run_shard_op(bot, op, args, _progress_relay(origin, call_id) if wants_progress else None)
+    except Exception as e:
+        logger.error(f"❌ Shard op {op} from shard {origin} failed: {e}")
+        error = f"{type(e).__name__}: {e}"
+    _SHARD_OUTBOX.put((origin, ("reply", call_id, result, error)))
+
+def _shard_path(path: str, shard: int) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard}{ext}"
+
+def _keep_owned_state(shard: int) -> None:
+    """पूरे (merged) स्टेट में से सिर्फ इस shard के यूजर्स रखें"""
+    def foreign(uids):
+        return [uid for uid in uids if shard_for_user(uid) != shard]
+    
+    USERS.difference_update(foreign(USERS))
+    banned_users().difference_update(foreign(banned_users()))
+    for table in (USER_CREDITS, UNLIMITED_USERS, search_history(), ban_times(), ban_reasons(), USER_PROFILES):
+        for uid in foreign(table):
+            del table[uid]
+    referral_tracker().difference_update([key for key in referral_tracker() if shard_for_user(key[0]) != shard])
+    if shard != 0:
+        for key in DAILY_STATS:
+            DAILY_STATS[key] = 0
+    rebuild_indexes()
+
+def shard_files(path: str) -> dict:
+    """डिस्क पर मौजूद shard फाइलें: {shard: path} (सिर्फ पुरानी generation बची हो तब भी गिनी जाती है)"""
+    root, ext = os.path.splitext(path)
+    directory, name = os.path.split(os.path.abspath(root))
+    pattern = re.compile(re.escape(name) + r"\.shard(\d+)" + re.escape(ext) + r"(\.\d+)?$")
+    found = {}
+    for entry in os.listdir(directory):
+        match = pattern.fullmatch(entry)
+        if match:
+            found[int(match.group(1))] = _shard_path(path, int(match.group(1)))
+    return found
+
+def read_shard_layout(path: str):
+    """shard फाइलें किस layout के लिए लिखी गईं: {"shards": [..], "layouts": {(count, vnodes), ..}}; फाइलें न हों तो None
+
+    पुराने कोड की फाइलों के header में layout नहीं होता; उनके लिए फाइलों की गिनती और मौजूदा SHARD_VNODES माने जाते हैं।
+    """
+    files = shard_files(path)
+    if not files:
+        return None
+    layouts = set()
+    for shard_path in files.values():
+        headers = [header for header in map(snapshot_header, snapshot_files(shard_path)) if header]
+        newest = max(headers, key=lambda header: header.get("generation", 0), default={})
+        layout = newest.get("shard") or {"count": len(files), "vnodes": SHARD_VNODES}
+        layouts.add((layout["count"], layout["vnodes"]))
+    return {"shards": sorted(files), "layouts": layouts}
+
+def _staging_path(path: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.reshard{ext}"
+
+def _load_merged_shards(shards) -> None:
+    """हर shard की फाइलें एक-एक करके लोड करें और सबको मिलाकर मेमोरी में एक स्टेट बनाएं"""
+    global DATA_FILE, BANNED_USERS_FILE, JOURNAL_SEQ
+    users, referrals, banned = set(), set(), set()
+    credits, unlimited, history, profiles, banned_at, reasons = {}, {}, {}, {}, {}, {}
+    stats, seq = {}, 0
+    data_file, banned_file = DATA_FILE, BANNED_USERS_FILE
+    try:
+        for shard in shards:
+            reset_state()
+            DATA_FILE, BANNED_USERS_FILE = _shard_path(data_file, shard), _shard_path(banned_file, shard)
+            load_data()
+            load_banned_users()
+            users |= USERS
+            referrals |= referral_tracker()
+            banned |= banned_users()
+            credits.update(USER_CREDITS)
+            unlimited.update(UNLIMITED_USERS)
+            history.update(search_history())
+            profiles.update(USER_PROFILES)
+            banned_at.update(ban_times())
+            reasons.update(ban_reasons())
+            for key, value in DAILY_STATS.items():
+                stats[key] = stats.get(key, 0) + value
+            seq = max(seq, JOURNAL_SEQ)
+    finally:
+        DATA_FILE, BANNED_USERS_FILE = data_file, banned_file
+    
+    reset_state()
+    USERS.update(users)
+    REFERRED_TRACKER.update(referrals)
+    BANNED_USERS.update(banned)
+    USER_CREDITS.update(credits)
+    UNLIMITED_USERS.update(unlimited)
+    USER_SEARCH_HISTORY.update(history)
+    USER_PROFILES.update(profiles)
+    BANNED_AT.update(banned_at)
+    BAN_REASONS.update(reasons)
+    DAILY_STATS.update(stats)
+    JOURNAL_SEQ = seq
+    rebuild_indexes()
+
+def _write_shards_from_staging(shard_count: int) -> None:
+    """staging फाइल से हर नए shard की फाइल लिखें (shard_count=1 पर वापस single-process DATA_FILE), फिर staging हटाएं"""
+    global SHARD_ID, SHARD_COUNT, _SHARD_RING, DATA_FILE, BANNED_USERS_FILE
+    data_file, banned_file = DATA_FILE, BANNED_USERS_FILE
+    tag = f"retired-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    # staging में सब कुछ है; इसी बीच (पिछली अधूरी कोशिश में) लिखी गई shard फाइलें हटाएं ताकि कोई पुरानी न बचे
+    for path in (data_file, banned_file):
+        for shard_path in shard_files(path).values():
+            retire_snapshot(shard_path, tag)
+    
+    try:
+        for shard in range(shard_count):
+            reset_state()
+            DATA_FILE, BANNED_USERS_FILE = _staging_path(data_file), _staging_path(banned_file)
+            load_data()
+            load_banned_users()
+            if shard_count > 1:
+                SHARD_ID, SHARD_COUNT, _SHARD_RING = shard, shard_count, HashRing(range(shard_count))
+                _keep_owned_state(shard)
+                DATA_FILE, BANNED_USERS_FILE = _shard_path(data_file, shard), _shard_path(banned_file, shard)
+            else:
+                DATA_FILE, BANNED_USERS_FILE = data_file, banned_file
+            save_data(raise_errors=True)
+            save_banned_users(raise_errors=True)
+            logger.info(f"✅ Reshard: wrote {DATA_FILE} with {len(USERS)} users")
+    finally:
+        SHARD_ID, SHARD_COUNT, _SHARD_RING = None, 1, None
+        DATA_FILE, BANNED_USERS_FILE = data_file, banned_file
+    
+    for path in (data_file, banned_file):
+        retire_snapshot(_staging_path(path), tag)
+    reset_state()
+
+def reshard(shard_count: int) -> None:
+    """सभी shard फाइलें (या पुरानी single-process फाइल) मिलाकर shard_count के ring पर दोबारा बाँटें
+
+    पहले पूरा स्टेट एक staging फाइल में जाता है और पुरानी फाइलें retire होती हैं; बीच में रुकने पर
+    अगली बार staging से ही आगे बढ़ता है, इसलिए कोई यूजर किसी पुरानी फाइल में अटका नहीं रहता।
+    """
+    global DATA_FILE, BANNED_USERS_FILE
+    data_file, banned_file = DATA_FILE, BANNED_USERS_FILE
+    tag = f"retired-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    if not snapshot_files(_staging_path(data_file)):
+        layout = read_shard_layout(data_file)
+        if layout is not None:
+            _load_merged_shards(layout["shards"])
+            DATA_FILE, BANNED_USERS_FILE = _staging_path(data_file), _staging_path(banned_file)
+            try:
+                save_data(raise_errors=True)
+                save_banned_users(raise_errors=True)
+            finally:
+                DATA_FILE, BANNED_USERS_FILE = data_file, banned_file
+            logger.info(f"✅ Reshard: merged shards {layout['shards']} ({len(USERS)} users) into staging")
+            # split के बाद भी बची पुरानी single-process फाइल अब stale है
+            for path in (data_file, banned_file):
+                retire_snapshot(path, tag)
+        elif snapshot_files(data_file) or snapshot_files(banned_file):
+            # single-process फाइल खुद ही staging बन जाती है (rename, कोई कॉपी नहीं)
+            for path in (data_file, banned_file):
+                for candidate in snapshot_files(path):
+                    os.replace(candidate, _staging_path(path) + candidate[len(path):])
+        else:
+            return
+    _write_shards_from_staging(shard_count)
+    logger.info(f"✅ Reshard to {shard_count} shard(s) complete")
+
+def check_storage_layout(shard_count: int) -> None:
+    """स्टार्ट से पहले: फाइलें इसी WORKERS / ring के लिए हों; पुरानी single-process फाइल पहली बार में खुद बँटती है
+
+    WORKERS या SHARD_VNODES बदलने पर यूजर्स दूसरे shards पर चले जाते, इसलिए mismatch पर RuntimeError
+    (`python main.py reshard` चलाना होगा)।
+    """
+    hint = f"run `WORKERS={shard_count} python main.py reshard` first"
+    if snapshot_files(_staging_path(DATA_FILE)):
+        if shard_count == 1:
+            raise RuntimeError(f"An interrupted reshard left {_staging_path(DATA_FILE)}; {hint}")
+        logger.warning("⚠️ Resuming an interrupted reshard")
+        _write_shards_from_staging(shard_count)
+        return
+    
+    layout = read_shard_layout(DATA_FILE)
+    if shard_count == 1:
+        if layout is not None:
+            raise RuntimeError(f"Found shard files {layout['shards']} but WORKERS=1; {hint}")
+        return
+    if layout is None:
+        if snapshot_files(DATA_FILE):
+            logger.info(f"🧩 Splitting the single-process data file into {shard_count} shards")
+            reshard(shard_count)
+        return
+    if layout["layouts"] != {(shard_count, SHARD_VNODES)} or layout["shards"] != list(range(shard_count)):
+        found = ", ".join(f"{count} workers / {vnodes} vnodes" for count, vnodes in sorted(layout["layouts"]))
+        raise RuntimeError(
+            f"Shard files {layout['shards']} were written for {found}, not {shard_count} workers / "
+            f"{SHARD_VNODES} vnodes; {hint}"
+        )
+
+async def _run_worker(application: Application, inbox) -> None:
+    """worker का event loop: router से updates और दूसरे shards से calls/replies लें"""
+    loop = asyncio.get_running_loop()
+    async with application:
+        await application.start()
+        await post_init(application)
+        logger.info(f"✅ Shard {SHARD_ID}/{SHARD_COUNT} ready: {len(USERS)} users")
+        
+        while True:
+            message = await loop.run_in_executor(None, inbox.get)
+            kind = message[0]
+            if kind == "update":
+                await application.update_queue.put(Update.de_json(message[1], application.bot))
+            elif kind == "call":
+                start_background_task(_serve_shard_call(application.bot, *message[1:]))
+            elif kind == "reply":
+                _, call_id, result, error = message
+                _, future, _ = _PENDING_CALLS.get(call_id, (None, None, None))
+                if future is None or future.done():
+                    continue
+                if error:
+                    future.set_exception(RuntimeError(error))
+                else:
+                    future.set_result(result)
+            elif kind == "progress":
+                _, call_id, results = message
+                _, future, on_progress = _PENDING_CALLS.get(call_id, (None, None, None))
+                if on_progress and not future.done():
+                    on_progress(results)
+            elif kind == "shard_restarted":
+                # उस shard के पुराने process को भेजी calls का जवाब कभी नहीं आएगा
+                for shard, future, _ in list(_PENDING_CALLS.values()):
+                    if shard == message[1] and not future.done():
+                        future.set_exception(RuntimeError(f"Shard {shard} restarted before replying"))
+            elif kind == "stop":
+                break
+        
+        await application.stop()
+        flush_saves()
+
+def _worker_main(shard: int, shard_count: int, inbox, outbox) -> None:
+    """worker process: अपने shard का डेटा लोड करें और router से आए updates प्रोसेस करें"""
+    global SHARD_ID, SHARD_COUNT, _SHARD_RING, _SHARD_OUTBOX, DATA_FILE, BANNED_USERS_FILE, LOG_FILE, _LOG_LISTENER
+    # Ctrl+C पूरे process group को जाता है; worker router के "stop" का इंतज़ार करे
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    # spawn से नया process: logging यहीं, अपने shard की लॉग फाइल के साथ
+    LOG_FILE = _shard_path(LOG_FILE, shard)
+    _LOG_LISTENER = setup_logging()
+    
+    SHARD_ID, SHARD_COUNT, _SHARD_OUTBOX = shard, shard_count, outbox
+    _SHARD_RING = HashRing(range(shard_count))
+    
+    if TRACEMALLOC_FRAMES > 0:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    
+    # layout router पहले ही जांच चुका है (check_storage_layout)
+    DATA_FILE, BANNED_USERS_FILE = _shard_path(DATA_FILE, shard), _shard_path(BANNED_USERS_FILE, shard)
+    load_data()
+    load_banned_users()
+    
+    asyncio.run(_run_worker(build_application(updater=False), inbox))
+
+def _bot_api_call(session, method: str, params: dict, timeout: float = API_READ_TIMEOUT) -> dict:
+    response = session.post(f"{BOT_API_BASE_URL}{BOT_TOKEN}/{method}", json=params, timeout=timeout)
+    return response.json()
+
+class _PollError(Exception):
+    """getUpdates का ok=false जवाब (401 / 409 / 429 …)"""
+
+    def __init__(self, reply: dict):
+        super().__init__(f"{reply.get('error_code')} {reply.get('description')}")
+        self.retry_after = (reply.get("parameters") or {}).get("retry_after")
+
+def _poll_backoff(error: Exception, failures: int) -> float:
+    """अगले getUpdates से पहले इंतज़ार: 429 का retry_after, वरना 1, 2, 4 … UPDATES_MAX_BACKOFF तक"""
+    delay = min(UPDATES_MAX_BACKOFF, 2 ** (failures - 1))
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after:
+        delay = max(delay, float(retry_after))
+    logger.warning(f"⚠️ getUpdates failed ({failures}x): {error}; retrying in {delay:.0f}s")
+    return delay
+
+def _route_polled_updates(dispatch) -> None:
+    """router: getUpdates long-poll करके updates बाँटें"""
+    session = requests.Session()
+    _bot_api_call(session, "deleteWebhook", {"drop_pending_updates": True})
+    offset = 0
+    failures = 0
+    while True:
+        try:
+            # long-poll 10 सेकंड (run_polling जैसा), HTTP timeout उससे ऊपर
+            result = _bot_api_call(
+                session, "getUpdates",
+                {"offset": offset, "timeout": 10, "allowed_updates": Update.ALL_TYPES},
+                timeout=UPDATES_READ_TIMEOUT
+            )
+            if not result.get("ok"):
+                raise _PollError(result)
+        except (requests.RequestException, ValueError, _PollError) as e:
+            failures += 1
+            time.sleep(_poll_backoff(e, failures))
+            continue
+        failures = 0
+        for update in result.get("result", []):
+            offset = update["update_id"] + 1
+            dispatch(update)
+
+def _route_webhook_updates(dispatch) -> None:
+    """router: webhook endpoint पर आए updates बाँटें"""
+    url_path = urlparse(WEBHOOK_URL).path or "/"
+    
+    class WebhookHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path != url_path:
+                status = 404
+            elif WEBHOOK_SECRET and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+                status = 403
+            else:
+                try:
+                    dispatch(json.loads(body))
+                    status = 200
+                except ValueError:
+                    status = 400
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((WEBHOOK_LISTEN, PORT), WebhookHandler)
+    server.daemon_threads = True
+    _bot_api_call(requests.Session(), "setWebhook", {
+        "url": WEBHOOK_URL,
+        "secret_token": WEBHOOK_SECRET,
+        "allowed_updates": Update.ALL_TYPES,
+        "drop_pending_updates": True,
+    })
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+def _stop_on_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+def check_sharding_settings() -> None:
+    """WORKERS>1 में journal / hot standby नहीं चलते; इन्हें चुपचाप अनदेखा करने के बजाय RuntimeError"""
+    unsupported = []
+    if STATE_JOURNAL_FILE:
+        unsupported.append("STATE_JOURNAL_FILE")
+    if ROLE == "standby":
+        unsupported.append("ROLE=standby")
+    if unsupported:
+        raise RuntimeError(f"{' and '.join(unsupported)} cannot be combined with WORKERS={WORKERS}; "
+                           f"the journal and hot standby only work with WORKERS=1")
+
+def run_sharded() -> None:
+    """router process: updates को यूजर id के consistent hash से WORKERS processes में बाँटें"""
+    try:
+        check_sharding_settings()
+        check_storage_layout(WORKERS)
+    except RuntimeError as e:
+        print(f"❌ ERROR: {e}")
+        sys.exit(1)
+    
+    mp_context = multiprocessing.get_context("spawn")
+    # हर worker का अपना inbox और outbox; shards आपस में सीधे नहीं, router के ज़रिए बात करते हैं
+    # ताकि restart पर नया inbox दिया जा सके
+    inboxes, outboxes, workers = {}, {}, {}
+    stopping = threading.Event()
+    
+    def forward(shard: int, outbox) -> None:
+        # outbox बदलने (restart) के बाद भी बचे हुए मैसेज (जैसे replies) पहुंचा दें, फिर बंद
+        while not stopping.is_set():
+            try:
+                dest, message = outbox.get(timeout=1)
+            except queue.Empty:
+                if outboxes.get(shard) is not outbox:
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            inboxes[dest].put(message)
+    
+    def start_worker(shard: int) -> None:
+        inboxes[shard], outboxes[shard] = mp_context.Queue(), mp_context.Queue()
+        threading.Thread(target=forward, args=(shard, outboxes[shard]), name=f"shard-{shard}-bus", daemon=True).start()
+        workers[shard] = mp_context.Process(
+            target=_worker_main, args=(shard, WORKERS, inboxes[shard], outboxes[shard]), name=f"shard-{shard}"
+        )
+        workers[shard].start()
+    
+    def restart_worker(shard: int) -> None:
+        # मरा हुआ reader inbox का lock पकड़े रह सकता है, इसलिए नया inbox; जो updates निकल सकें वे साथ ले जाएं
+        old_inbox = inboxes[shard]
+        start_worker(shard)
+        carried = 0
+        while True:
+            try:
+                message = old_inbox.get(timeout=0.1)
+            except (queue.Empty, EOFError, OSError):
+                break
+            if message[0] == "update":
+                inboxes[shard].put(message)
+                carried += 1
+        if carried:
+            logger.info(f"📦 Carried {carried} queued updates to the new shard {shard} inbox")
+        for other in range(WORKERS):
+            if other != shard:
+                inboxes[other].put(("shard_restarted", shard))
+    
+    def supervise() -> None:
+        # crash हुआ worker दोबारा शुरू करें; उसकी pending calls बाकी shards पर फेल हो जाती हैं
+        while not stopping.wait(2):
+            for shard, worker in list(workers.items()):
+                if not worker.is_alive():
+                    logger.error(f"❌ Shard {shard} worker exited with code {worker.exitcode}, restarting")
+                    restart_worker(shard)
+    
+    for shard in range(WORKERS):
+        start_worker(shard)
+    threading.Thread(target=supervise, name="shard-supervisor", daemon=True).start()
+    
+    ring = HashRing(range(WORKERS))
+    
+    def dispatch(update: dict) -> None:
+        user_id = update_user_id(update)
+        inboxes[ring.node_for(user_id) if user_id is not None else 0].put(("update", update))
+    
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    try:
+        if WEBHOOK_URL:
+            _route_webhook_updates(dispatch)
+        else:
+            _route_polled_updates(dispatch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping.set()
+        for inbox in inboxes.values():
+            inbox.put(("stop",))
+        for worker in workers.values():
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        logger.info("🛑 All shard workers stopped")
+
+def build_application(updater: bool = True) -> Application:
+    """Application बनाएं और सभी हैंडलर्स जोड़ें (worker में updater नहीं, updates router से आते हैं)"""
+    api_request, updates_request = build_api_requests()
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .base_url(BOT_API_BASE_URL)
+        .base_file_url(BOT_API_FILE_URL)
+        .request(api_request)
+        .concurrent_updates(CONCURRENT_UPDATES if CONCURRENT_UPDATES > 1 else False)
+        .post_init(post_init)
+    )
+    if updater:
+        builder = builder.get_updates_request(updates_request)
+    else:
+        builder = builder.updater(None)
+    application = builder.build()
+    
+    # आखिरी गतिविधि हर update पर, बाकी हैंडलर्स से अलग group में ताकि वे भी चलें
+    application.add_handler(TypeHandler(Update, track_activity), group=-1)
+    application.add_handler(CommandHandler("start", with_log_context(start_command)))
+    application.add_handler(CommandHandler("search", with_log_context(search_command)))
+    
+    # Admin Commands
+    application.add_handler(CommandHandler("broadcast", with_log_context(broadcast_command)))
+    application.add_handler(CommandHandler("unlimited", with_log_context(unlimited_command)))
+    application.add_handler(CommandHandler("remove_unlimited", with_log_context(remove_unlimited_command)))
+    application.add_handler(CommandHandler("stats", with_log_context(stats_command)))
+    application.add_handler(CommandHandler("addcredits", with_log_context(add_credits_command)))
+    application.add_handler(CommandHandler("ban", with_log_context(ban_command)))
+    application.add_handler(CommandHandler("unban", with_log_context(unban_command)))
+    application.add_handler(CommandHandler("user", with_log_context(user_command)))
+    application.add_handler(CommandHandler("memstats", with_log_context(memstats_command)))
+    application.add_handler(CommandHandler("apistats", with_log_context(apistats_command)))
+    application.add_handler(CommandHandler("bulk", with_log_context(bulk_command)))
+    application.add_handler(MessageHandler(filters.Document.ALL & filters.CaptionRegex(r'^/bulk\b'), with_log_context(bulk_command)))
+    
+    application.add_handler(CallbackQueryHandler(with_log_context(button_handler)))
+    return application
+
 def main() -> None:
     """मुख्य फंक्शन"""
+    start_logging()
     if not BOT_TOKEN:
         print("❌ ERROR: BOT_TOKEN is not set in environment variables.")
         return
@@ -1285,24 +4356,39 @@ def main() -> None:
     if ADMIN_ID is None:
         print("⚠️ WARNING: ADMIN_ID is not set. Admin commands will not work.")
     
-    load_data()
-    load_banned_users()
+    if WORKERS > 1:
+        print(f"🧩 Sharded mode: {WORKERS} workers, {'Webhook' if WEBHOOK_URL else 'Polling'} router")
+        run_sharded()
+        return
     
-    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    if TRACEMALLOC_FRAMES > 0:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
     
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("search", search_command))
+    try:
+        check_storage_layout(1)
+        load_data()
+        mark_startup("load_data")
+        load_banned_users()
+        mark_startup("load_banned_users")
+    except RuntimeError as e:
+        print(f"❌ ERROR: {e}")
+        sys.exit(1)
     
-    # Admin Commands
-    application.add_handler(CommandHandler("broadcast", broadcast_command))
-    application.add_handler(CommandHandler("unlimited", unlimited_command))
-    application.add_handler(CommandHandler("remove_unlimited", remove_unlimited_command))
-    application.add_handler(CommandHandler("stats", stats_command))
-    application.add_handler(CommandHandler("addcredits", add_credits_command))
-    application.add_handler(CommandHandler("ban", ban_command))
-    application.add_handler(CommandHandler("unban", unban_command))
+    took_over = False
+    if STATE_JOURNAL_FILE:
+        # snapshot के बाद की एंट्रीज़ journal से (crash recovery), फिर standby हो तो lease का इंतज़ार
+        tail = JournalTail(STATE_JOURNAL_FILE)
+        replayed = tail.poll()
+        if replayed:
+            logger.info(f"✅ Replayed {replayed} journal entries newer than the snapshot")
+        if ROLE == "standby" or not try_acquire_lease():
+            run_standby(tail)
+            took_over = True
+        open_journal()
+        mark_startup("journal_replay")
     
-    application.add_handler(CallbackQueryHandler(button_handler))
+    application = build_application()
+    mark_startup("build_application")
     
     print("=" * 50)
     print("✅ ADVANCED BOT IS RUNNING")
@@ -1312,16 +4398,40 @@ def main() -> None:
     print(f"🎁 Referral Credit: {REFERRAL_CREDITS}")
     print(f"👥 Total Users: {len(USERS)}")
     print(f"👑 Unlimited Users: {len(UNLIMITED_USERS)}")
+    # lazy हिस्से सिर्फ गिनती के लिए स्टार्टअप पर parse न करें
     print(f"🚫 Banned Users: {len(BANNED_USERS)}")
-    print(f"🔗 Total Referrals: {len(REFERRED_TRACKER)}")
+    print(f"🔗 Total Referrals: {'lazy' if 'referrals' in _LAZY_SECTIONS else len(REFERRED_TRACKER)}")
     print(f"🔍 Total Searches: {DAILY_STATS.get('searches', 0)}")
+    print(f"🌐 Mode: {'Webhook' if WEBHOOK_URL else 'Polling'}")
+    if STATE_JOURNAL_FILE:
+        print(f"🗂 Journal: {STATE_JOURNAL_FILE} (seq {JOURNAL_SEQ}, {'took over from standby' if took_over else 'primary'})")
     print(f"⏰ Started at: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}")
     print("=" * 50)
     
-    application.run_polling(
-        allowed_updates=Update.ALL_TYPES,
-        drop_pending_updates=True
-    )
+    # takeover पर downtime में आए updates न छोड़ें
+    try:
+        if WEBHOOK_URL:
+            application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=PORT,
+                url_path=urlparse(WEBHOOK_URL).path.lstrip("/"),
+                webhook_url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=not took_over
+            )
+        else:
+            application.run_polling(
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=not took_over
+            )
+    finally:
+        flush_saves()
+        if STATE_JOURNAL_FILE:
+            close_journal()
+            release_lease()
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in ("export", "import", "reshard"):
+        sys.exit(cli(sys.argv[1:]))
     main()
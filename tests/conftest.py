@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# main.py import पर env से सेटिंग्स पढ़ता है; logging main() / cli() शुरू करते हैं
+_LOG_DIR = tempfile.mkdtemp(prefix="numinfo-tests-")
+os.environ.setdefault("LOG_FILE", os.path.join(_LOG_DIR, "test.log"))
+os.environ.setdefault("SNAPSHOT_FSYNC", "false")
+os.environ.setdefault("SAVE_DEBOUNCE", "0")  # debounce के अपने टेस्ट इसे खुद चालू करते हैं
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    """हर टेस्ट के लिए खाली स्टेट और tmp_path में storage फाइलें"""
+    monkeypatch.setattr(main, "DATA_FILE", str(tmp_path / "bot_data.json"))
+    monkeypatch.setattr(main, "BANNED_USERS_FILE", str(tmp_path / "banned_users.json"))
+    monkeypatch.setattr(main, "STATE_JOURNAL_FILE", str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(main, "LEASE_FILE", str(tmp_path / "bot.lease"))
+    monkeypatch.setattr(main, "SHARD_ID", None)
+    monkeypatch.setattr(main, "SHARD_COUNT", 1)
+    monkeypatch.setattr(main, "_SHARD_RING", None)
+    monkeypatch.setattr(main, "_LEASE_EPOCH", 0)
+    monkeypatch.setattr(main, "_LEASE_DEADLINE", 0.0)
+    main.reset_state()
+    yield main
+    main.close_journal()
+    main.reset_state()
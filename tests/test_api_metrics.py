@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+import pytest
+from telegram.error import NetworkError
+
+
+def _request(main, handler):
+    return main.MeteredHTTPXRequest(
+        "api", 4, 30.0,
+        read_timeout=5, write_timeout=5, connect_timeout=5, pool_timeout=1,
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def test_calls_go_through_our_client_and_are_metered(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "API_METRICS", {})
+    seen = []
+
+    async def handler(request):
+        # httpcore इसी तरह trace बुलाता है जब pool से कनेक्शन मिलता है
+        await request.extensions["trace"]("http11.send_request_headers.started", {})
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"ok": True, "result": True})
+
+    async def run():
+        request = _request(main, handler)
+        await request.initialize()
+        try:
+            assert await request.post("https://api.telegram.org/bot123:TEST/sendMessage") is True
+            assert await request.post("https://api.telegram.org/bot123:TEST/sendMessage") is True
+        finally:
+            await request.shutdown()
+
+    asyncio.run(run())
+    # PTB अगर _build_client hook बदल दे तो MockTransport तक कॉल नहीं पहुंचेगी
+    assert seen == ["/bot123:TEST/sendMessage"] * 2
+    stats = main.API_METRICS[("api", "sendMessage")]
+    assert stats["calls"] == 2
+    assert stats["errors"] == 0
+    assert stats["in_flight"] == 0
+    assert stats["max_in_flight"] == 1
+    assert stats["pool_waits"] == 2
+
+
+def test_transport_errors_are_counted(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "API_METRICS", {})
+
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    async def run():
+        request = _request(main, handler)
+        await request.initialize()
+        try:
+            with pytest.raises(NetworkError):
+                await request.post("https://api.telegram.org/bot123:TEST/getMe")
+        finally:
+            await request.shutdown()
+
+    asyncio.run(run())
+    stats = main.API_METRICS[("api", "getMe")]
+    assert stats["calls"] == 1
+    assert stats["errors"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_client_uses_keepalive_and_shared_tls_settings(state):
+    main = state
+    api_request, updates_request = main.build_api_requests()
+    # सिर्फ़ httpx के public arguments से बना client; दोनों pools एक ही TLS context साझा करते हैं
+    assert main._TLS_CONTEXT is not None
+    assert api_request._pool_size == main.API_POOL_SIZE
+    assert updates_request._keepalive_expiry == main.UPDATES_KEEPALIVE_EXPIRY
+    assert api_request.read_timeout == main.API_READ_TIMEOUT
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+
+def test_parse_bulk_file_reports_bad_lines_and_keeps_good_ones(state):
+    main = state
+    data = (
+        "# comment\n"
+        "101,5\n"
+        "abc,5\n"
+        "102;x\n"
+        "\n"
+        "103 0\n"
+        "101,7\n"
+        "-4,5\n"
+    ).encode()
+
+    ops, errors = main.parse_bulk_file("credits", data)
+
+    assert ops == {101: 12}  # एक ही यूजर दो बार: क्रेडिट्स जुड़ते हैं
+    assert errors == [
+        (3, "Invalid user id"),
+        (4, "Credits missing or not a number"),
+        (6, "Credits must be > 0"),
+        (8, "Invalid user id"),
+    ]
+
+
+def test_parse_bulk_file_unlimited_and_ban_values(state):
+    main = state
+
+    ops, errors = main.parse_bulk_file("unlimited", b"\xef\xbb\xbf201\n202,7d\n203,soon\n")
+    assert ops[201] == ("forever", "हमेशा के लिए ♾️")
+    assert 202 in ops
+    assert errors == [(3, "Invalid duration (use 12h, 7d, 1m)")]
+
+    ops, errors = main.parse_bulk_file("ban", b"301\n302, spam, links\n")
+    assert ops == {301: "No reason provided", 302: "spam, links"}
+    assert errors == []
+
+
+def _snapshot(main, uids):
+    return {
+        uid: (main.USER_CREDITS.get(uid), uid in main.banned_users(), main.ban_times().get(uid),
+              main.ban_reasons().get(uid))
+        for uid in uids
+    }
+
+
+def test_apply_bulk_ops_rolls_back_when_a_mutation_fails(state):
+    main = state
+    main.set_credits(1, 3)
+
+    with pytest.raises(TypeError):
+        main.apply_bulk_ops("credits", {1: 5, 2: 4, 3: "x"})
+
+    assert main.USER_CREDITS == {1: 3}
+    assert main.CREDITS_INDEX.page(None, 10)[0] == [(-3, 1)]
+
+
+def test_apply_bulk_ops_rolls_back_when_the_flush_fails(state, monkeypatch):
+    main = state
+    main.ban_user(1, banned_at=100, reason="old")
+    before = _snapshot(main, (1, 2))
+
+    def failing_write(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(main, "write_snapshot", failing_write)
+
+    with pytest.raises(OSError):
+        main.apply_bulk_ops("ban", {1: "new", 2: "spam"})
+
+    assert _snapshot(main, (1, 2)) == before
+    assert main.BANNED_INDEX.page(None, 10)[0] == [(-100, 1)]
+
+
+def test_apply_bulk_ops_writes_only_the_touched_file(state, monkeypatch):
+    main = state
+    written = []
+    real_write = main.write_snapshot
+    monkeypatch.setattr(main, "write_snapshot", lambda path, *a, **k: written.append(path) or real_write(path, *a, **k))
+
+    assert main.apply_bulk_ops("ban", {5: "spam"}) == [5]
+    assert written == [main.BANNED_USERS_FILE]
+
+    main.reset_state()
+    main.load_banned_users()
+    assert main.ban_reasons() == {5: "spam"}
+
+
+def test_rollback_restores_a_ban_without_a_time_exactly(state, monkeypatch):
+    main = state
+    main.ban_user(1, reason="old")
+    del main.ban_times()[1]  # पुराना बैन, समय दर्ज नहीं
+    main.rebuild_indexes()
+    main.set_credits(2, 4)
+
+    def failing_write(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(main, "write_snapshot", failing_write)
+
+    with pytest.raises(OSError):
+        main.apply_bulk_ops("ban", {1: "new", 2: "spam"})
+
+    assert 1 not in main.ban_times()
+    assert main.ban_reasons() == {1: "old"}
+    assert main.banned_users() == {1}
+    assert main.BANNED_INDEX.page(None, 10)[0] == [(0, 1)]
+    assert main.USER_CREDITS == {2: 4}
+
+
+def test_run_bulk_ops_reports_failed_shards_and_keeps_the_rest(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "shard_for_user", lambda uid: uid % 3)
+
+    async def fake_shard_call(bot, shard, op, action, part, notify):
+        if shard == 1:
+            raise RuntimeError("OSError: disk full")
+        if shard == 2:
+            raise asyncio.TimeoutError()
+        return sorted(part)
+    monkeypatch.setattr(main, "shard_call", fake_shard_call)
+
+    changed, failed = asyncio.run(main.run_bulk_ops(None, "credits", {3: 1, 6: 1, 4: 1, 5: 1, 8: 1}, False))
+
+    assert changed == [3, 6]
+    assert {shard: users for shard, (users, _) in failed.items()} == {1: 1, 2: 2}
+    assert "rolled back" in main._bulk_failure_line(1, *failed[1])
+    assert "स्थिति अज्ञात" in main._bulk_failure_line(2, *failed[2])
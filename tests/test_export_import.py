@@ -0,0 +1,108 @@
+import json
+import os
+
+import pytest
+
+
+def _populate(main):
+    for uid in range(1, 301):
+        main.USERS.add(uid)
+        main.set_credits(uid, uid % 9)
+        main.update_profile(uid, joined=1_700_000_000 + uid, referrals=uid % 3)
+    main.grant_unlimited(7, "forever")
+    main.grant_unlimited(8, 1_900_000_000)
+    main.ban_user(9, banned_at=1_700_000_500, reason="spam, links")
+    main.ban_user(10, banned_at=1_700_000_600)
+    main.referral_tracker().add((1, 2))
+
+
+def _state_checksum(main):
+    checksum = main.StateChecksum()
+    for record in main.iter_state_records():
+        checksum.add(record)
+    return checksum.hexdigest
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_then_replace_import_round_trips_the_checksum(state, tmp_path, fmt):
+    main = state
+    _populate(main)
+    path = str(tmp_path / f"state.{fmt}")
+    exported = main.export_state(path, fmt)
+
+    main.reset_state()
+    main.set_credits(999, 1)  # --replace इसे हटाएगा
+    imported = main.import_state(path, fmt, chunk_size=50, replace=True)
+
+    assert imported.hexdigest == exported.hexdigest
+    assert _state_checksum(main) == exported.hexdigest
+
+    # जो storage में लिखा गया वही दोबारा लोड होने पर भी मिलना चाहिए
+    main.reset_state()
+    main.load_data()
+    main.load_banned_users()
+    assert _state_checksum(main) == exported.hexdigest
+    assert main.ban_reasons() == {9: "spam, links"}
+
+
+def test_tampered_export_is_rejected_before_anything_is_written(state, tmp_path):
+    main = state
+    _populate(main)
+    path = str(tmp_path / "state.jsonl")
+    main.export_state(path, "jsonl")
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    record = json.loads(lines[0])
+    record["user_id"] += 1000
+    lines[0] = json.dumps(record) + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+    with pytest.raises(ValueError):
+        main.import_state(path, "jsonl", chunk_size=50, replace=True)
+    assert not os.path.exists(main.DATA_FILE)
+
+
+def test_import_commits_geometrically_and_retires_the_journal(state, tmp_path, monkeypatch):
+    main = state
+    _populate(main)
+    path = str(tmp_path / "state.jsonl")
+    exported = main.export_state(path, "jsonl")
+    main.reset_state()
+    with open(main.STATE_JOURNAL_FILE, "w", encoding="utf-8") as f:
+        f.write('{"seq": 41, "epoch": 1, "op": "credits", "args": [1, 500]}\n')
+    main.JOURNAL_SEQ = 41
+
+    commits = []
+    real_save = main.save_data
+    monkeypatch.setattr(main, "save_data", lambda **kw: commits.append(1) or real_save(**kw))
+    main.import_state(path, "jsonl", chunk_size=10, replace=True)
+
+    # 906 records: 10, 20, 40 … 640 पर और आखिरी commit, हर 10 पर नहीं
+    assert exported.count == 906
+    assert len(commits) == 8
+    assert not os.path.exists(main.STATE_JOURNAL_FILE)
+    main.reset_state()
+    main.load_data()
+    # standby अगली एंट्री (seq 43) पर gap देखकर यह snapshot लोड करेगा
+    assert main.JOURNAL_SEQ == 42
+    assert main.USER_CREDITS[1] == 1
+
+
+def test_csv_keeps_numeric_looking_strings_as_strings(state, tmp_path):
+    main = state
+    main.ban_user(1, banned_at=1_700_000_000, reason="123")
+    main.ban_user(2, banned_at=1_700_000_001, reason="nan")
+    main.ban_user(3, banned_at=1_700_000_002, reason="1e5")
+    main.grant_unlimited(4, 1_900_000_000.5)
+    main.grant_unlimited(5, 1_900_000_000)
+    main.grant_unlimited(6, "forever")
+    path = str(tmp_path / "state.csv")
+    exported = main.export_state(path, "csv")
+
+    main.reset_state()
+    imported = main.import_state(path, "csv", chunk_size=50, replace=True)
+
+    assert imported.hexdigest == exported.hexdigest
+    assert main.ban_reasons() == {1: "123", 2: "nan", 3: "1e5"}
+    assert main.UNLIMITED_USERS == {4: 1_900_000_000.5, 5: 1_900_000_000, 6: "forever"}
@@ -0,0 +1,161 @@
+import json
+import os
+import time
+
+import pytest
+
+
+def _entry(seq, op, *args, epoch=1):
+    return json.dumps({"seq": seq, "epoch": epoch, "op": op, "args": args}) + "\n"
+
+
+def _append(main, *lines):
+    with open(main.STATE_JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def _rotate(main, *lines):
+    """primary का rotate_journal: पुरानी फाइल हटाकर नई (नई inode)"""
+    os.remove(main.STATE_JOURNAL_FILE)
+    _append(main, *lines)
+
+
+def _primary_snapshot(main, seq, credits):
+    """primary (दूसरा process) का snapshot, standby की मेमोरी छुए बिना"""
+    main.write_snapshot(main.DATA_FILE, {
+        "credits": {str(uid): value for uid, value in credits.items()},
+        "users": sorted(credits),
+        "profiles": {},
+        "journal_seq": seq,
+    })
+
+
+def test_partial_last_line_waits_for_the_rest(state):
+    main = state
+    line = _entry(2, "credits", 2, 6)
+    _append(main, _entry(1, "credits", 1, 5), line[:10])
+    tail = main.JournalTail(main.STATE_JOURNAL_FILE)
+
+    assert tail.poll() == 1
+    _append(main, line[10:])
+    assert tail.poll() == 1
+    assert main.USER_CREDITS == {1: 5, 2: 6}
+    assert main.JOURNAL_SEQ == 2
+
+
+def test_rotation_is_followed_to_the_new_file(state):
+    main = state
+    _append(main, _entry(1, "credits", 1, 5), _entry(2, "credits", 1, 6))
+    tail = main.JournalTail(main.STATE_JOURNAL_FILE)
+    assert tail.poll() == 2
+
+    _rotate(main, _entry(3, "credits", 1, 7))
+
+    assert tail.poll() == 1
+    assert main.USER_CREDITS == {1: 7}
+    assert main.JOURNAL_SEQ == 3
+
+
+def test_gap_is_filled_from_the_newer_snapshot(state):
+    main = state
+    _append(main, _entry(1, "credits", 1, 5))
+    tail = main.JournalTail(main.STATE_JOURNAL_FILE)
+    tail.poll()
+
+    # seq 2..5 rotation में गए, snapshot में हैं
+    _primary_snapshot(main, 5, {1: 50, 2: 20})
+    _rotate(main, _entry(6, "credits", 2, 21))
+
+    assert tail.poll() == 1
+    assert main.USER_CREDITS == {1: 50, 2: 21}
+    assert main.JOURNAL_SEQ == 6
+
+
+def test_gap_behind_the_snapshot_is_held_until_a_newer_snapshot(state, monkeypatch):
+    main = state
+    _primary_snapshot(main, 3, {1: 30})
+    _append(main, _entry(6, "credits", 1, 60))
+    tail = main.JournalTail(main.STATE_JOURNAL_FILE)
+    reloads = []
+    real_load = main.load_data
+    monkeypatch.setattr(main, "load_data", lambda: reloads.append(1) or real_load())
+
+    assert tail.poll() == 0
+    assert tail.poll() == 0
+    # seq 4..5 किसी snapshot में नहीं: 6 लागू नहीं हुआ, और वही snapshot बार-बार लोड नहीं हुआ
+    assert main.USER_CREDITS == {1: 30}
+    assert main.JOURNAL_SEQ == 3
+    assert len(reloads) == 1
+
+    _primary_snapshot(main, 5, {1: 50})
+    _append(main, _entry(7, "credits", 1, 70))
+    assert tail.poll() == 2
+    assert main.USER_CREDITS == {1: 70}
+    assert main.JOURNAL_SEQ == 7
+
+
+def test_failed_reload_is_retried_on_the_next_poll(state, monkeypatch):
+    main = state
+    _primary_snapshot(main, 5, {1: 50})
+    _append(main, _entry(6, "credits", 1, 60))
+    tail = main.JournalTail(main.STATE_JOURNAL_FILE)
+    real_load = main.load_data
+
+    def broken_load():
+        raise RuntimeError("No valid snapshot")
+    monkeypatch.setattr(main, "load_data", broken_load)
+    assert tail.poll() == 0
+
+    monkeypatch.setattr(main, "load_data", real_load)
+    assert tail.poll() == 1
+    assert main.USER_CREDITS == {1: 60}
+
+
+def test_entries_from_a_stale_epoch_are_skipped(state):
+    main = state
+    _append(
+        main,
+        _entry(1, "credits", 1, 5, epoch=2),
+        _entry(2, "credits", 1, 666, epoch=1),  # takeover के बाद पुराना primary
+        _entry(2, "credits", 1, 6, epoch=2),
+    )
+
+    assert main.JournalTail(main.STATE_JOURNAL_FILE).poll() == 2
+    assert main.USER_CREDITS == {1: 6}
+
+
+def test_lease_epoch_grows_per_holder_and_survives_release(state, monkeypatch):
+    main = state
+    assert main.try_acquire_lease()
+    assert main._LEASE_EPOCH == 1
+    assert main.try_acquire_lease()  # renew: वही epoch
+    assert main._LEASE_EPOCH == 1
+
+    main.release_lease()
+    with open(main.LEASE_FILE) as f:
+        assert json.load(f) == {"holder": None, "expires": 0, "epoch": 1}
+
+    monkeypatch.setattr(main, "_LEASE_HOLDER", "standby:2")
+    assert main.try_acquire_lease()
+    assert main._LEASE_EPOCH == 2
+
+
+def test_old_primary_cannot_write_after_takeover(state):
+    main = state
+    assert main.try_acquire_lease()
+    main.open_journal()
+    main.set_credits(1, 5)
+    with open(main.LEASE_FILE, "w") as f:
+        json.dump({"holder": "standby:2", "expires": time.time() + 60, "epoch": 2}, f)
+    main._LEASE_DEADLINE = 0  # event loop अटका रहा, renew का समय निकल गया
+
+    with pytest.raises(RuntimeError, match="Lease epoch 1 lost"):
+        main.set_credits(2, 6)
+    with pytest.raises(RuntimeError, match="Lease epoch 1 lost"):
+        main.save_data(raise_errors=True)
+    assert not main.renew_lease()
+
+    main.close_journal()
+    with open(main.STATE_JOURNAL_FILE, encoding="utf-8") as f:
+        assert [json.loads(line)["args"] for line in f] == [[1, 5]]
+    assert not os.path.exists(main.DATA_FILE)
@@ -0,0 +1,88 @@
+import asyncio
+
+
+def _save_and_reload(main, monkeypatch):
+    main.USERS.update({1, 2, 3})
+    main.referral_tracker().add((1, 2))
+    main.search_history()[1] = [{"number": "9999999999", "timestamp": "2026-01-01T00:00:00"}]
+    main.ban_user(3, banned_at=1_700_000_000, reason="spam")
+    main.save_data(raise_errors=True)
+    main.save_banned_users(raise_errors=True)
+
+    main.reset_state()
+    monkeypatch.setattr(main, "LAZY_LOAD", True)
+    main.load_data()
+    main.load_banned_users()
+
+
+def test_heavy_sections_stay_raw_until_first_access(state, monkeypatch):
+    main = state
+    _save_and_reload(main, monkeypatch)
+
+    assert set(main._LAZY_SECTIONS) == {"referrals", "search_history", "banned"}
+    assert isinstance(main._LAZY_SECTIONS["search_history"], bytes)
+    # बैन IDs हमेशा तुरंत, ताकि is_banned के लिए parse न करना पड़े
+    assert main.is_banned(3)
+
+    assert main.search_history() == {1: [{"number": "9999999999", "timestamp": "2026-01-01T00:00:00"}]}
+    assert set(main._LAZY_SECTIONS) == {"referrals", "banned"}
+
+    assert main.referral_tracker() == {(1, 2)}
+    assert main.ban_reasons() == {3: "spam"}
+    assert main.ban_times() == {3: 1_700_000_000}
+    assert main._LAZY_SECTIONS == {}
+    assert [uid for _, uid in main.BANNED_INDEX.page(None, 10, False)[0]] == [3]
+
+
+def test_saving_unparsed_sections_keeps_them_intact(state, monkeypatch):
+    main = state
+    _save_and_reload(main, monkeypatch)
+
+    # कुछ भी parse किए बिना दोबारा सेव करें, फिर LAZY_LOAD के बिना पढ़ें
+    main.save_data(raise_errors=True)
+    main.save_banned_users(raise_errors=True)
+    main.reset_state()
+    monkeypatch.setattr(main, "LAZY_LOAD", False)
+    main.load_data()
+    main.load_banned_users()
+
+    assert main._LAZY_SECTIONS == {}
+    assert main.REFERRED_TRACKER == {(1, 2)}
+    assert main.USER_SEARCH_HISTORY[1][0]["number"] == "9999999999"
+    assert main.BAN_REASONS == {3: "spam"}
+
+
+def test_warmup_parses_the_remaining_sections(state, monkeypatch):
+    main = state
+    _save_and_reload(main, monkeypatch)
+    monkeypatch.setattr(main, "LAZY_WARMUP_DELAY", 0)
+
+    asyncio.run(main.warm_lazy_sections())
+
+    assert main._LAZY_SECTIONS == {}
+    assert main.REFERRED_TRACKER == {(1, 2)}
+
+
+def test_post_init_does_not_wait_for_startup_api_calls(state, monkeypatch):
+    main = state
+    started = []
+
+    async def slow_announce(application):
+        started.append(application)
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(main, "announce_startup", slow_announce)
+    monkeypatch.setattr(main, "MEMORY_SOFT_LIMIT_MB", 0)
+
+    async def run():
+        await asyncio.wait_for(main.post_init("app"), timeout=1)
+        await asyncio.sleep(0)
+        tasks = list(main._BACKGROUND_TASKS)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
+    # announce बैकग्राउंड में शुरू हुआ, post_init उसका इंतज़ार किए बिना लौट आया
+    assert started == ["app"]
+    assert "post_init" in main.STARTUP_TIMINGS
@@ -0,0 +1,99 @@
+import logging
+
+import pytest
+
+
+def _record(msg="hello", category=None):
+    record = logging.LogRecord("main", logging.INFO, __file__, 1, msg, None, None)
+    if category:
+        record.category = category
+    return record
+
+
+def test_sample_rates_are_parsed(state):
+    main = state
+    assert main.parse_sample_rates("") == {}
+    assert main.parse_sample_rates("search=0.1, broadcast=1,") == {"search": 0.1, "broadcast": 1.0}
+
+
+@pytest.mark.parametrize("value", ["search=abc", "search", "=0.5", "search=2", "search=-0.1"])
+def test_bad_sample_rates_raise_a_clear_error(state, value):
+    main = state
+    with pytest.raises(ValueError, match="LOG_SAMPLE_RATES"):
+        main.parse_sample_rates(value)
+
+
+def test_start_logging_exits_on_bad_sample_rates(state, monkeypatch, capsys):
+    main = state
+    monkeypatch.setattr(main, "_LOG_LISTENER", None)
+    monkeypatch.setenv("LOG_SAMPLE_RATES", "search=lots")
+    with pytest.raises(SystemExit) as exc:
+        main.start_logging()
+    assert exc.value.code == 1
+    assert "LOG_SAMPLE_RATES" in capsys.readouterr().out
+
+
+def test_sampling_drops_records_and_counts_them(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "LOG_SAMPLE_RATES", {"search": 0.5})
+    monkeypatch.setattr(main, "_LOG_SAMPLED_OUT", {})
+    rolls = iter([0.9, 0.7, 0.1])
+    monkeypatch.setattr(main.random, "random", lambda: next(rolls))
+    log_filter = main._LogContextFilter()
+
+    # पहले दो रिकॉर्ड छूटते हैं, तीसरा उनकी गिनती साथ ले जाता है
+    assert not log_filter.filter(_record(category="search"))
+    assert not log_filter.filter(_record(category="search"))
+    kept = _record(category="search")
+    assert log_filter.filter(kept)
+    assert kept.suppressed == 2
+    assert main._LOG_SAMPLED_OUT == {}
+
+    # बिना category वाले रिकॉर्ड कभी sample नहीं होते
+    plain = _record()
+    assert log_filter.filter(plain)
+    assert getattr(plain, "suppressed", 0) == 0
+
+
+def test_text_format_shows_suppressed_count(state):
+    main = state
+    formatter = main._TextFormatter("%(message)s")
+    record = _record()
+    assert formatter.format(record) == "hello"
+    record.suppressed = 5
+    assert formatter.format(record) == "hello (+5 suppressed)"
+
+
+def test_log_file_rotates_by_size(state, tmp_path):
+    main = state
+    path = tmp_path / "bot.log"
+    handler = main._SizeAndTimeRotatingFileHandler(str(path), 200, 3, 0)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    try:
+        for _ in range(10):
+            handler.emit(_record("x" * 50))
+    finally:
+        handler.close()
+    assert (tmp_path / "bot.log.1").exists()
+    assert path.stat().st_size <= 200
+
+
+def test_log_file_rotates_by_time(state, tmp_path, monkeypatch):
+    main = state
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    path = tmp_path / "bot.log"
+    handler = main._SizeAndTimeRotatingFileHandler(str(path), 10 ** 6, 3, 60)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    try:
+        handler.emit(_record("first"))
+        now[0] += 30
+        handler.emit(_record("second"))
+        assert not (tmp_path / "bot.log.1").exists()
+
+        now[0] += 31
+        handler.emit(_record("third"))
+    finally:
+        handler.close()
+    assert (tmp_path / "bot.log.1").read_text(encoding="utf-8") == "first\nsecond\n"
+    assert path.read_text(encoding="utf-8") == "third\n"
@@ -0,0 +1,76 @@
+import asyncio
+import sys
+
+import pytest
+
+
+def test_deep_sizeof_counts_nested_objects_once(state):
+    main = state
+    shared = ["x" * 100]
+    flat = asyncio.run(main.deep_sizeof(shared))
+    nested = {"a": shared, "b": shared}
+
+    # एक ही list दो बार रखने पर दोबारा नहीं गिनी जाती
+    expected = sys.getsizeof(nested) + sys.getsizeof("a") + sys.getsizeof("b") + flat
+    assert asyncio.run(main.deep_sizeof(nested)) == expected
+
+
+def test_compact_removes_expired_unlimited_and_empty_histories(state):
+    main = state
+    now = main.datetime.now().timestamp()
+    main.grant_unlimited(1, now - 10)
+    main.grant_unlimited(2, now + 3600)
+    main.grant_unlimited(3, "forever")
+    history = main.search_history()
+    history[10] = []
+    history[11] = [{"number": str(n)} for n in range(5)]
+
+    result = asyncio.run(main.compact_state())
+
+    assert result["expired_unlimited"] == 1
+    assert result["histories_trimmed"] == 1
+    assert set(main.UNLIMITED_USERS) == {2, 3}
+    assert sorted(uid for _, uid in main.UNLIMITED_INDEX.page(None, 10, False)[0]) == [2, 3]
+    # history_limit न दिया हो तो हिस्ट्री पूरी रहती है
+    assert history == {11: [{"number": str(n)} for n in range(5)]}
+
+
+def test_compact_trims_history_only_with_a_limit(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "COMPACT_CHUNK_SIZE", 2)
+    history = main.search_history()
+    for uid in range(5):
+        history[uid] = [{"number": str(n)} for n in range(uid + 1)]
+
+    result = asyncio.run(main.compact_state(history_limit=2))
+
+    assert result["histories_trimmed"] == 3
+    assert [len(history[uid]) for uid in range(5)] == [1, 2, 2, 2, 2]
+    assert history[4] == [{"number": "3"}, {"number": "4"}]
+
+
+def test_watchdog_backs_off_when_compaction_frees_nothing(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "MEMORY_SOFT_LIMIT_MB", 1)
+    monkeypatch.setattr(main, "MEMORY_CHECK_INTERVAL", 60)
+    monkeypatch.setattr(main, "MEMORY_CHECK_MAX_INTERVAL", 300)
+    monkeypatch.setattr(main, "ADMIN_ID", None)
+    rss = iter([10 << 20] * 10 + [0] + [10 << 20] * 10)
+    monkeypatch.setattr(main, "get_rss_bytes", lambda: next(rss))
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        if delay:
+            sleeps.append(delay)
+            if len(sleeps) > 7:
+                raise asyncio.CancelledError
+        await real_sleep(0)
+
+    monkeypatch.setattr(main.asyncio, "sleep", fake_sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(main.memory_watchdog(None))
+
+    # हर बेकार compaction पर इंतज़ार दोगुना (max तक); limit से नीचे आते ही फिर सामान्य
+    assert sleeps == [60, 120, 240, 300, 300, 300, 60, 120]
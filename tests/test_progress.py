@@ -0,0 +1,89 @@
+import asyncio
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _reporter(main, monkeypatch, sink, interval=3.0):
+    clock = _Clock()
+    monkeypatch.setattr(main.time, "monotonic", clock)
+    reporter = main.ProgressReporter("Job", 100, sink, labels={"sent": "Sent"}, interval=interval)
+    return reporter, clock
+
+
+def test_updates_inside_the_interval_are_throttled(state, monkeypatch):
+    main = state
+    texts = []
+    reporter, clock = _reporter(main, monkeypatch, texts.append)
+
+    for done in range(1, 10):
+        clock.now += 0.2
+        reporter.update(done, sent=done)
+    assert texts == []
+
+    clock.now += 3
+    reporter.update(10, sent=10)
+    assert len(texts) == 1
+    assert "📊 Progress: 10/100 (10.0%)" in texts[0]
+    assert "Sent: 10" in texts[0]
+
+
+def test_unchanged_progress_is_not_sent_again(state, monkeypatch):
+    main = state
+    texts = []
+    reporter, clock = _reporter(main, monkeypatch, texts.append)
+
+    clock.now += 5
+    reporter.update(5, sent=5)
+    # rate / ETA बदले हैं, पर प्रगति वही: कोई edit नहीं
+    clock.now += 5
+    reporter.update(5, sent=5)
+    assert len(texts) == 1
+
+    clock.now += 5
+    reporter.update(6, sent=6)
+    assert len(texts) == 2
+
+    reporter.close("done")
+    reporter.close("done")  # वही टेक्स्ट दोबारा नहीं
+    assert texts[-1] == "done" and len(texts) == 3
+
+
+def test_async_sink_runs_one_edit_at_a_time_and_sends_the_latest_state(state, monkeypatch):
+    main = state
+    edits = []
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def slow_sink(text):
+            edits.append(text)
+            await gate.wait()
+
+        reporter, clock = _reporter(main, monkeypatch, slow_sink, interval=1.0)
+        clock.now += 2
+        reporter.update(10)
+        await asyncio.sleep(0)
+        # पहला edit अभी चल रहा है: बीच के updates छूटते हैं
+        for done in (20, 30, 40):
+            clock.now += 2
+            reporter.update(done)
+        assert len(edits) == 1
+
+        gate.set()
+        await asyncio.sleep(0)
+        clock.now += 2
+        reporter.update(50)
+        await asyncio.sleep(0)
+        assert len(edits) == 2
+        assert "50/100" in edits[1]
+
+        await reporter.aclose("final")
+        assert edits[-1] == "final"
+
+    asyncio.run(run())
@@ -0,0 +1,233 @@
+import os
+
+import pytest
+
+
+def _populate(main, user_ids):
+    for uid in user_ids:
+        main.USERS.add(uid)
+        main.set_credits(uid, uid % 7)
+        main.update_profile(uid, joined=1_700_000_000 + uid)
+    for uid in user_ids[::10]:
+        main.grant_unlimited(uid, "forever")
+    for uid in user_ids[::25]:
+        main.ban_user(uid, banned_at=1_700_000_000, reason=f"spam {uid}")
+    for referrer, referred in zip(user_ids[::2], user_ids[1::2]):
+        main.referral_tracker().add((referrer, referred))
+    for uid in user_ids[:50]:
+        main.search_history()[uid] = [{"number": "9999999999", "timestamp": "2026-01-01T00:00:00"}]
+
+
+def _fingerprint(main):
+    return {
+        "users": set(main.USERS),
+        "credits": dict(main.USER_CREDITS),
+        "unlimited": dict(main.UNLIMITED_USERS),
+        "banned": set(main.banned_users()),
+        "banned_at": dict(main.ban_times()),
+        "reasons": dict(main.ban_reasons()),
+        "referrals": set(main.referral_tracker()),
+        "history": dict(main.search_history()),
+        "profiles": {uid: profile.to_list() for uid, profile in main.USER_PROFILES.items()},
+    }
+
+
+def _load_all_shards(main, count):
+    main._load_merged_shards(range(count))
+    return _fingerprint(main)
+
+
+USER_IDS = range(1, 20_001)
+
+
+def test_hash_ring_is_deterministic_and_spreads_users(state):
+    main = state
+    ring, again = main.HashRing(range(4)), main.HashRing(range(4))
+
+    owners = [ring.node_for(uid) for uid in USER_IDS]
+
+    assert owners == [again.node_for(uid) for uid in USER_IDS]
+    for shard in range(4):
+        # 64 vnodes पर हर shard को लगभग 1/4 यूजर्स
+        assert 0.15 < owners.count(shard) / len(owners) < 0.35
+
+
+def test_adding_a_shard_moves_only_its_share_to_the_new_shard(state):
+    main = state
+    before, after = main.HashRing(range(4)), main.HashRing(range(5))
+
+    moved = [uid for uid in USER_IDS if before.node_for(uid) != after.node_for(uid)]
+
+    assert all(after.node_for(uid) == 4 for uid in moved)
+    assert 0.1 < len(moved) / len(USER_IDS) < 0.3  # ~1/5, modulo hashing जैसा ~4/5 नहीं
+
+
+def test_removing_a_shard_moves_only_its_users(state):
+    main = state
+    before, after = main.HashRing(range(5)), main.HashRing([0, 1, 2, 4])
+
+    for uid in USER_IDS:
+        if before.node_for(uid) != 3:
+            assert after.node_for(uid) == before.node_for(uid)
+        else:
+            assert after.node_for(uid) != 3
+
+
+def test_legacy_file_is_split_and_retired(state):
+    main = state
+    _populate(main, list(range(1, 501)))
+    expected = _fingerprint(main)
+    main.save_data()
+    main.save_banned_users()
+    main.reset_state()
+
+    main.check_storage_layout(3)
+
+    assert main.snapshot_files(main.DATA_FILE) == []
+    assert main.read_shard_layout(main.DATA_FILE) == {"shards": [0, 1, 2], "layouts": {(3, main.SHARD_VNODES)}}
+    assert _load_all_shards(main, 3) == expected
+    # हर यूजर सिर्फ उस shard में है जो ring उसे देता है
+    ring = main.HashRing(range(3))
+    for shard in range(3):
+        main.reset_state()
+        main.DATA_FILE, data_file = main._shard_path(main.DATA_FILE, shard), main.DATA_FILE
+        main.load_data()
+        main.DATA_FILE = data_file
+        assert all(ring.node_for(uid) == shard for uid in main.USERS)
+
+
+@pytest.mark.parametrize("old_count, new_count", [(4, 2), (2, 3), (3, 1)])
+def test_worker_count_change_requires_reshard_and_keeps_all_users(state, old_count, new_count):
+    main = state
+    _populate(main, list(range(1, 401)))
+    expected = _fingerprint(main)
+    main.save_data()
+    main.save_banned_users()
+    main.reset_state()
+    main.check_storage_layout(old_count)
+
+    with pytest.raises(RuntimeError, match="reshard"):
+        main.check_storage_layout(new_count)
+
+    main.reshard(new_count)
+    main.check_storage_layout(new_count)
+    if new_count == 1:
+        assert main.read_shard_layout(main.DATA_FILE) is None
+        main.load_data()
+        main.load_banned_users()
+        assert _fingerprint(main) == expected
+    else:
+        assert _load_all_shards(main, new_count) == expected
+
+
+def test_interrupted_reshard_resumes_from_staging(state, monkeypatch):
+    main = state
+    _populate(main, list(range(1, 301)))
+    expected = _fingerprint(main)
+    main.save_data()
+    main.save_banned_users()
+    main.reset_state()
+    main.check_storage_layout(2)
+
+    calls = []
+    original = main._keep_owned_state
+
+    def crash_on_second_shard(shard):
+        calls.append(shard)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        original(shard)
+
+    monkeypatch.setattr(main, "_keep_owned_state", crash_on_second_shard)
+    with pytest.raises(OSError):
+        main.reshard(3)
+    monkeypatch.setattr(main, "_keep_owned_state", original)
+
+    assert os.path.exists(main._staging_path(main.DATA_FILE))
+    with pytest.raises(RuntimeError, match="interrupted reshard"):
+        main.check_storage_layout(1)
+    main.check_storage_layout(3)
+    assert not os.path.exists(main._staging_path(main.DATA_FILE))
+    assert _load_all_shards(main, 3) == expected
+
+
+class _StopPolling(Exception):
+    pass
+
+
+def test_router_polling_backs_off_on_error_replies(state, monkeypatch):
+    main = state
+    replies = [
+        {"ok": False, "error_code": 409, "description": "Conflict"},
+        {"ok": False, "error_code": 409, "description": "Conflict"},
+        {"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 7}},
+        {"ok": True, "result": [{"update_id": 5}]},
+        {"ok": False, "error_code": 401, "description": "Unauthorized"},
+    ]
+    offsets, sleeps, dispatched = [], [], []
+
+    def fake_call(session, method, params, timeout=None):
+        if method == "deleteWebhook":
+            return {"ok": True}
+        offsets.append(params["offset"])
+        if not replies:
+            raise _StopPolling
+        return replies.pop(0)
+    monkeypatch.setattr(main, "_bot_api_call", fake_call)
+    monkeypatch.setattr(main.time, "sleep", sleeps.append)
+
+    with pytest.raises(_StopPolling):
+        main._route_polled_updates(dispatched.append)
+
+    # 1, 2 का बढ़ता इंतज़ार, 429 पर retry_after; सफल जवाब के बाद फिर 1 से
+    assert sleeps == [1, 2, 7.0, 1]
+    assert dispatched == [{"update_id": 5}]
+    assert offsets == [0, 0, 0, 0, 6, 6]
+
+
+def test_api_metrics_from_workers_add_up_and_keep_the_max(state):
+    main = state
+    one = {("api", "sendMessage"): {"calls": 3, "errors": 1, "in_flight": 0, "max_in_flight": 4,
+                                    "latency_total": 0.3, "latency_max": 0.2}}
+    two = {("api", "sendMessage"): {"calls": 2, "errors": 0, "in_flight": 1, "max_in_flight": 2,
+                                    "latency_total": 0.1, "latency_max": 0.5},
+           ("api", "getMe"): {"calls": 1, "errors": 0, "in_flight": 0, "max_in_flight": 1,
+                              "latency_total": 0.0, "latency_max": 0.0}}
+
+    merged = main.merge_api_metrics([one, two])
+
+    assert merged[("api", "sendMessage")] == {"calls": 5, "errors": 1, "in_flight": 1, "max_in_flight": 4,
+                                              "latency_total": pytest.approx(0.4), "latency_max": 0.5}
+    assert merged[("api", "getMe")]["calls"] == 1
+
+
+def test_referral_ranking_parts(state):
+    main = state
+    for referred in range(10, 15):
+        main.referral_tracker().add((1, referred))
+    for referred in range(20, 22):
+        main.referral_tracker().add((2, referred))
+    main.referral_tracker().add((3, 30))
+
+    assert main.top_referrers(limit=2) == [(1, 5), (2, 2)]
+    assert main.referrers_above(count=2) == 1
+    assert main.referrers_above(count=0) == 3
+
+
+@pytest.mark.parametrize("journal, role, message", [
+    ("journal.jsonl", "primary", "STATE_JOURNAL_FILE cannot"),
+    ("", "standby", "ROLE=standby cannot"),
+    ("journal.jsonl", "standby", "STATE_JOURNAL_FILE and ROLE=standby"),
+])
+def test_journal_and_standby_are_rejected_with_workers(state, monkeypatch, journal, role, message):
+    main = state
+    monkeypatch.setattr(main, "WORKERS", 2)
+    monkeypatch.setattr(main, "STATE_JOURNAL_FILE", journal)
+    monkeypatch.setattr(main, "ROLE", role)
+    with pytest.raises(RuntimeError, match=message):
+        main.check_sharding_settings()
+
+    # साधारण sharded सेटअप चलता है
+    monkeypatch.setattr(main, "STATE_JOURNAL_FILE", "")
+    monkeypatch.setattr(main, "ROLE", "primary")
+    main.check_sharding_settings()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+def test_write_after_takeover_continues_from_newest_generation_on_disk(state, caplog):
+    main = state
+    path = main.DATA_FILE
+    # standby ने generation 1 पर boot किया, फिर primary (दूसरा process) ने कई snapshots लिखे
+    main.write_snapshot(path, {"owner": "primary", "n": 1})
+    main.load_snapshot(path)
+    subprocess.run(
+        [sys.executable, "-c",
+         "import sys, main\n"
+         "for n in range(2, 5):\n"
+         "    main.write_snapshot(sys.argv[1], {'owner': 'primary', 'n': n})",
+         path],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True,
+    )
+
+    # takeover के बाद standby का पहला write
+    main.write_snapshot(path, {"owner": "standby", "n": 5})
+
+    assert main._snapshot_generation(path) == 5
+    with caplog.at_level(logging.WARNING):
+        assert main.load_snapshot(path) == {"owner": "standby", "n": 5}
+    assert "Recovered" not in caplog.text
+
+
+def test_generation_is_above_rotated_files_when_current_file_is_missing(state):
+    main = state
+    path = main.DATA_FILE
+    for n in range(1, 4):
+        main.write_snapshot(path, {"n": n})
+    # rotation के बाद, temp फाइल के rename से पहले crash: सबसे नई generation .1 में
+    os.replace(f"{path}.1", f"{path}.2")
+    os.replace(path, f"{path}.1")
+
+    main.write_snapshot(path, {"n": 4})
+
+    assert main._snapshot_generation(path) == 4
+    assert main.load_snapshot(path) == {"n": 4}
+
+
+def test_round_trip_keeps_sections_meta_and_lazy_bytes(state):
+    main = state
+    path = main.DATA_FILE
+    sections = {"credits": {"1": 5}, "users": [1, 2], "note": "नमस्ते"}
+
+    main.write_snapshot(path, sections, {"lease_epoch": 3})
+
+    assert main.read_snapshot(path)["sections"] == sections
+    lazy = main.read_snapshot(path, lazy=("users",))["sections"]
+    assert lazy["users"] == b"[1,2]"
+    assert lazy["credits"] == {"1": 5}
+    assert main.snapshot_header(path)["lease_epoch"] == 3
+    # lazy bytes दोबारा लिखने पर वही डेटा
+    main.write_snapshot(path, lazy)
+    assert main.load_snapshot(path) == sections
+
+
+def test_generations_rotate_and_the_newest_valid_one_wins(state, monkeypatch):
+    main = state
+    path = main.DATA_FILE
+    monkeypatch.setattr(main, "SNAPSHOT_GENERATIONS", 3)
+    for n in range(1, 6):
+        main.write_snapshot(path, {"n": n})
+
+    # मौजूदा + .1 + .2
+    assert main.snapshot_files(path) == [path, f"{path}.1", f"{path}.2"]
+    assert [main._snapshot_generation(p) for p in main.snapshot_files(path)] == [5, 4, 3]
+    assert main.load_snapshot(path) == {"n": 5}
+
+
+@pytest.mark.parametrize("damage", ["truncate", "flip"])
+def test_torn_or_corrupted_write_falls_back_to_the_previous_generation(state, caplog, damage):
+    main = state
+    path = main.DATA_FILE
+    main.write_snapshot(path, {"n": 1, "pad": "x" * 100})
+    main.write_snapshot(path, {"n": 2, "pad": "x" * 100})
+    with open(path, "r+b") as f:
+        size = os.path.getsize(path)
+        if damage == "truncate":
+            f.truncate(size - 40)
+        else:
+            f.seek(size - 20)
+            f.write(b"y")
+
+    with pytest.raises(ValueError):
+        main.read_snapshot(path)
+    with caplog.at_level(logging.WARNING):
+        assert main.load_snapshot(path) == {"n": 1, "pad": "x" * 100}
+    assert "Recovered" in caplog.text
+
+
+def test_all_generations_corrupt_refuses_to_start_empty(state):
+    main = state
+    path = main.DATA_FILE
+    main.write_snapshot(path, {"n": 1})
+    main.write_snapshot(path, {"n": 2})
+    for candidate in main.snapshot_files(path):
+        with open(candidate, "ab") as f:
+            f.write(b"garbage")
+
+    with pytest.raises(RuntimeError, match="refusing to start"):
+        main.load_snapshot(path)
+
+
+def test_legacy_single_json_file_still_loads(state):
+    main = state
+    with open(main.DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump({"credits": {"1": 5}, "users": [1]}, f)
+
+    assert main.load_snapshot(main.DATA_FILE) == {"credits": {"1": 5}, "users": [1]}
+    main.write_snapshot(main.DATA_FILE, {"users": [1]})
+    assert main._snapshot_generation(main.DATA_FILE) == 1
+
+
+def test_saves_on_the_event_loop_are_debounced_into_one_write(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "SAVE_DEBOUNCE", 0.05)
+    written = []
+    real_write = main.write_encoded_snapshot
+    monkeypatch.setattr(main, "write_encoded_snapshot",
+                        lambda path, *a, **k: written.append(path) or real_write(path, *a, **k))
+
+    async def burst():
+        for uid in range(1, 51):
+            main.USERS.add(uid)
+            main.save_data()
+        assert written == []  # अभी सिर्फ शेड्यूल हुआ
+        await asyncio.sleep(0.2)
+
+    asyncio.run(burst())
+
+    assert written == [main.DATA_FILE]
+    assert main.load_snapshot(main.DATA_FILE)["users"] == list(range(1, 51))
+
+
+def test_flush_saves_writes_pending_saves_at_shutdown(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "SAVE_DEBOUNCE", 60)
+
+    async def serve():
+        main.set_credits(1, 5)
+        main.save_data()
+        main.ban_user(2, banned_at=100)
+        main.save_banned_users()
+
+    asyncio.run(serve())
+    assert not os.path.exists(main.DATA_FILE)
+
+    main.flush_saves()
+
+    assert main.load_snapshot(main.DATA_FILE)["credits"] == {"1": 5}
+    assert main.load_snapshot(main.BANNED_USERS_FILE)["users"] == [2]
+    assert main._SAVE_TASKS == {}
+
+
+def test_an_older_encode_never_overwrites_a_newer_write(state):
+    main = state
+    path = main.DATA_FILE
+    older = main.encode_snapshot({"n": 1})
+    main.write_snapshot(path, {"n": 2})
+
+    assert main.write_encoded_snapshot(path, older) == 0
+    assert main.load_snapshot(path) == {"n": 2}
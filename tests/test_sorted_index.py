@@ -0,0 +1,141 @@
+import asyncio
+
+
+def _walk(index, size, backwards=False):
+    """cursor से पूरा index पेज-दर-पेज पढ़ें (बटन दबाने जैसा)"""
+    pages = []
+    entries, _ = index.page(None, size, backwards=backwards)
+    while entries:
+        pages.append(entries)
+        cursor = entries[0] if backwards else entries[-1]
+        entries, _ = index.page(cursor, size, backwards=backwards)
+    return pages
+
+
+def test_pages_cover_every_entry_once_at_exact_boundaries(state):
+    index = state.SortedIndex()
+    for uid in range(1, 21):
+        index.add(uid % 4, uid)
+
+    pages = _walk(index, 5)
+
+    assert [len(page) for page in pages] == [5, 5, 5, 5]
+    flat = [entry for page in pages for entry in page]
+    assert flat == sorted(flat)
+    assert len(set(flat)) == 20
+
+
+def test_backward_paging_mirrors_forward_paging(state):
+    index = state.SortedIndex()
+    for uid in range(1, 12):
+        index.add(-uid, uid)
+
+    forward = [entry for page in _walk(index, 4) for entry in page]
+    backward = [entry for page in reversed(_walk(index, 4, backwards=True)) for entry in page]
+
+    assert backward == forward
+    # आखिरी पेज से पीछे जाने पर पहला पेज छोटा (11 = 3 + 4 + 4)
+    assert [len(page) for page in _walk(index, 4, backwards=True)] == [4, 4, 3]
+
+
+def test_duplicate_keys_are_ordered_by_user_id_and_removed_exactly(state):
+    index = state.SortedIndex()
+    for uid in (30, 10, 20):
+        index.add(5, uid)
+    index.add(5, 20)  # वही जोड़ी दोबारा
+
+    assert index.page(None, 10)[0] == [(5, 10), (5, 20), (5, 20), (5, 30)]
+    # cursor किसी duplicate key पर हो तो भी अगला पेज उसी key के अगले user से शुरू हो
+    assert index.page((5, 10), 2)[0] == [(5, 20), (5, 20)]
+
+    index.remove(5, 20)
+    index.remove(5, 99)  # जो है ही नहीं, उसे हटाने से कुछ नहीं बदलता
+    assert index.page(None, 10)[0] == [(5, 10), (5, 20), (5, 30)]
+
+
+def test_cursor_of_a_removed_entry_still_pages_forward(state):
+    index = state.SortedIndex()
+    for uid in range(1, 7):
+        index.add(uid * 10, uid)
+    first, _ = index.page(None, 3)
+
+    index.remove(*first[-1])
+
+    assert index.page(first[-1], 3)[0] == [(40, 4), (50, 5), (60, 6)]
+
+
+def test_unlimited_index_tracks_expiry_and_revocation(state):
+    main = state
+    main.grant_unlimited(1, 2_000)
+    main.grant_unlimited(2, "forever")
+    main.grant_unlimited(3, 1_000)
+    main.grant_unlimited(1, 3_000)  # renew: पुरानी expiry की एंट्री हटनी चाहिए
+
+    assert main.UNLIMITED_INDEX.page(None, 10)[0] == [(1_000, 3), (3_000, 1), (main.FOREVER_KEY, 2)]
+
+    main.revoke_unlimited(3)
+    assert main.UNLIMITED_INDEX.page(None, 10)[0] == [(3_000, 1), (main.FOREVER_KEY, 2)]
+
+    main.rebuild_indexes()
+    assert main.UNLIMITED_INDEX.page(None, 10)[0] == [(3_000, 1), (main.FOREVER_KEY, 2)]
+
+
+def test_compaction_drops_expired_unlimited_from_the_index(state):
+    main = state
+    main.grant_unlimited(1, 1_000)  # बहुत पहले expire हो चुका
+    main.grant_unlimited(2, "forever")
+
+    result = asyncio.run(main.compact_state())
+
+    assert result["expired_unlimited"] == 1
+    assert main.UNLIMITED_INDEX.page(None, 10)[0] == [(main.FOREVER_KEY, 2)]
+
+
+def test_merged_shard_pages_match_a_single_index(state):
+    main = state
+    whole = main.SortedIndex()
+    shards = [main.SortedIndex() for _ in range(3)]
+    for uid in range(1, 48):
+        key = (uid * 7) % 5
+        whole.add(key, uid)
+        shards[uid % 3].add(key, uid)
+    # एक shard खाली भी हो सकता है
+    shards.append(main.SortedIndex())
+
+    def merged_page(cursor, backwards):
+        parts = [(*shard.page(cursor, 6, backwards=backwards), len(shard)) for shard in shards]
+        return main.merge_index_pages(parts, 6, backwards)
+
+    cursor = None
+    while True:
+        entries, start, total = merged_page(cursor, False)
+        assert (entries, start) == whole.page(cursor, 6)
+        assert total == 47
+        if not entries:
+            break
+        cursor = entries[-1]
+
+    cursor = None
+    while True:
+        entries, start, _ = merged_page(cursor, True)
+        expected, expected_start = whole.page(cursor, 6, backwards=True)
+        assert entries == expected
+        if not entries:
+            break
+        assert start == expected_start
+        cursor = entries[0]
+
+
+def test_admin_page_renders_counts_and_cursor_buttons(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "ADMIN_PAGE_SIZE", 2)
+    for uid in range(1, 6):
+        main.set_credits(uid, uid)
+
+    text, markup = asyncio.run(main.render_admin_page(None, 'c'))
+    assert "📄 1-2 / 5" in text
+    assert [b.callback_data for b in markup.inline_keyboard[0]] == ["pg|c|n|-4|4"]
+
+    text, markup = asyncio.run(main.render_admin_page(None, 'c', (-4, 4)))
+    assert "📄 3-4 / 5" in text
+    assert [b.callback_data for b in markup.inline_keyboard[0]] == ["pg|c|p|-3|3", "pg|c|n|-2|2"]
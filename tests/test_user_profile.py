@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+
+class _Recorder:
+    """async मेथड जो हर कॉल के args / kwargs याद रखे"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+def _bot():
+    return SimpleNamespace(username="numinfo_bot", send_message=_Recorder())
+
+
+def _press(main, user_id, data):
+    query = SimpleNamespace(
+        data=data,
+        from_user=SimpleNamespace(id=user_id, first_name="Tester"),
+        answer=_Recorder(),
+        edit_message_text=_Recorder(),
+        message=SimpleNamespace(reply_text=_Recorder()),
+    )
+    update = SimpleNamespace(callback_query=query, effective_user=query.from_user)
+    context = SimpleNamespace(bot=_bot(), args=[])
+    asyncio.run(main.button_handler(update, context))
+    return query, context.bot
+
+
+def test_describe_user_reports_missing_credits_and_unknown_users(state):
+    main = state
+    assert main.describe_user(None, 42) is None
+
+    main.save_user(42)
+    info = main.describe_user(None, 42)
+    assert info["credits"] is None
+    assert not info["banned"]
+    assert "कोई रिकॉर्ड नहीं" in main.render_user_profile(info)[0]
+
+    main.ban_user(42, banned_at=1_700_000_000, reason="spam")
+    info = main.describe_user(None, 42)
+    assert (info["banned"], info["banned_at"], info["ban_reason"]) == (True, 1_700_000_000, "spam")
+
+
+def test_profile_button_runs_the_action_and_refreshes(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "ADMIN_ID", 1)
+    main.save_user(42)
+    main.set_credits(42, 3)
+
+    query, bot = _press(main, 1, "ua|c5|42")
+
+    assert main.USER_CREDITS[42] == 8
+    # यूजर को सूचना, और एडमिन का मैसेज नए प्रोफाइल और नोट के साथ
+    assert [kwargs["chat_id"] for _, kwargs in bot.send_message.calls] == [42]
+    (text,), kwargs = query.edit_message_text.calls[0]
+    assert "5 credits जोड़े गए (Total: 8)" in text
+    assert "**Credits:** 8" in text
+    buttons = [button.callback_data for row in kwargs["reply_markup"].inline_keyboard for button in row]
+    assert "ua|ban|42" in buttons and "ua|r|42" in buttons
+
+
+def test_refresh_and_ban_toggle_buttons(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "ADMIN_ID", 1)
+    main.save_user(42)
+
+    _, bot = _press(main, 1, "ua|ban|42")
+    assert main.is_banned(42)
+    query, bot = _press(main, 1, "ua|r|42")
+    # refresh कुछ नहीं बदलता, बस बैन होने पर unban बटन दिखाता है
+    assert bot.send_message.calls == []
+    _, kwargs = query.edit_message_text.calls[0]
+    buttons = [button.callback_data for row in kwargs["reply_markup"].inline_keyboard for button in row]
+    assert "ua|unban|42" in buttons and "ua|ban|42" not in buttons
+
+
+def test_profile_buttons_are_ignored_for_non_admins(state, monkeypatch):
+    main = state
+    monkeypatch.setattr(main, "ADMIN_ID", 1)
+
+    async def is_member(user_id, context):
+        return True
+
+    monkeypatch.setattr(main, "check_channel_membership", is_member)
+    main.save_user(42)
+    main.set_credits(42, 3)
+
+    query, bot = _press(main, 7, "ua|c20|42")
+
+    assert main.USER_CREDITS[42] == 3
+    assert query.edit_message_text.calls == []
+    assert bot.send_message.calls == []